@@ -0,0 +1,9 @@
+"""
+    Benchmarks of the package hot paths, not shipped in the distribution
+
+    run from the repository root with `python -m benchmarks.<module>`, uses an in memory sqlite database by default,
+    set `BENCH_DATABASE=postgres` (and the libpq `PG*` environment variables) to run against a local postgres
+
+    `python -m benchmarks.run` runs all of them and stores the results as JSON, `--compare` with the JSON of another
+    version reports the regressions
+"""
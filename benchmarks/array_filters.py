@@ -0,0 +1,107 @@
+"""
+    `ArrayMultipleChoiceFilter` modes (`contains`, `overlap`, `contained_by`) with and without the GIN index of
+    `gin_index`, and the previous `DISTINCT` of the filter, with the EXPLAIN of the queries (postgres only)
+
+    BENCH_DATABASE=postgres python -m benchmarks.array_filters [rows]
+"""
+from random import Random
+from sys import argv
+
+from .base import create_tables, measure, report, setup
+
+setup(apps=['django_filters'])
+
+from django.db import connection  # noqa: E402
+
+import django_filters  # noqa: E402
+
+from musa_django_utils.django.operations import gin_index  # noqa: E402
+from musa_django_utils.django_filters.filters import ArrayMultipleChoiceFilter  # noqa: E402
+
+from .models import TaggedBook  # noqa: E402
+
+TAGS = [f'tag{i}' for i in range(200)]
+CHOICES = [(tag, tag) for tag in TAGS]
+MODES = ('contains', 'overlap', 'contained_by')
+QUERIES = {
+    'contains': ['tag1', 'tag2'],
+    'overlap': ['tag3', 'tag4'],
+    'contained_by': ['tag5', 'tag6', 'tag7'],
+}
+
+
+class TaggedBookFilter(django_filters.FilterSet):
+    contains = ArrayMultipleChoiceFilter(field_name='tags', choices=CHOICES)
+    overlap = ArrayMultipleChoiceFilter(field_name='tags', choices=CHOICES, lookup_expr='overlap')
+    contained_by = ArrayMultipleChoiceFilter(field_name='tags', choices=CHOICES, lookup_expr='contained_by')
+
+    class Meta:
+        model = TaggedBook
+        fields = []
+
+
+def populate(rows):
+    create_tables(TaggedBook)
+    random = Random(0)
+    # skewed tags, the first ones are frequent
+    weights = [1 / (i + 1) for i in range(len(TAGS))]
+    TaggedBook.objects.bulk_create(
+        (
+            TaggedBook(title=f'book {i}', tags=sorted(set(random.choices(TAGS, weights, k=random.randint(1, 4)))))
+            for i in range(rows)
+        ),
+        batch_size=5000,
+    )
+    analyze()
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {TaggedBook._meta.db_table}')
+
+
+def filtered(mode, distinct=False):
+    queryset = TaggedBookFilter({mode: QUERIES[mode]}, queryset=TaggedBook.objects.order_by('id')).qs
+    # the filter added DISTINCT to every lookup before
+    return queryset.distinct() if distinct else queryset
+
+
+def fetch(queryset):
+    return lambda: list(queryset.values_list('id', 'title'))
+
+
+def explain(title, queryset):
+    print(f'\n{title}\n{queryset.explain()}')
+
+
+def run(label):
+    rows = []
+    for mode in MODES:
+        queryset = filtered(mode)
+        assert 'DISTINCT' not in str(queryset.query)
+        explain(f'{mode} ({label})', queryset)
+        rows.append((f'{mode}', measure(fetch(queryset), repeat=5)))
+        rows.append((f'{mode} + DISTINCT', measure(fetch(filtered(mode, distinct=True)), repeat=5)))
+
+    return rows
+
+
+def main(rows):
+    if connection.vendor != 'postgresql':
+        raise SystemExit('array lookups require BENCH_DATABASE=postgres')
+
+    populate(rows)
+    without_index = run('without index')
+
+    operation = gin_index('taggedbook', 'tags')
+    with connection.schema_editor() as editor:
+        editor.add_index(TaggedBook, operation.index)
+    analyze()
+    with_index = run(f'{operation.index.name}')
+
+    report(f'Matched rows of each mode ({rows} rows), without index', without_index)
+    report(f'Matched rows of each mode ({rows} rows), with GIN index', with_index)
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 200000)
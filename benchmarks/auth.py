@@ -0,0 +1,122 @@
+"""
+    Cost per request of `OldDjangoCookieSessionAuthentication` (`salted_hmac` for each cookie, precomputed HMAC key,
+    and the LRU of validated cookies), and token requests of `KeyCloakAppAuth` when many threads find the token
+    expired, with a stub keycloak
+
+    python -m benchmarks.auth [requests] [threads]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from sys import argv
+from threading import Lock
+from time import sleep
+from zlib import compress
+
+from .base import measure, report, setup
+
+setup(AUTH_CONFIG={
+    'cookie': {},
+    'cookie-cached': {'COOKIE_CACHE_SIZE': 1024},
+})
+
+from django.conf import settings  # noqa: E402
+from django.core.signing import JSONSerializer, TimestampSigner  # noqa: E402
+from django.utils.crypto import salted_hmac  # noqa: E402
+
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from musa_django_utils.drf.authentication.old_django import (  # noqa: E402
+    BaseDecodeToken, OldDjangoCookieSessionAuthentication,
+)
+from musa_django_utils.utils.keycloak import KeyCloakAppAuth, KeyCloakTokenProvider  # noqa: E402
+
+SALT = 'django.contrib.sessions.backends.signed_cookies'
+
+
+class CookieAuthentication(OldDjangoCookieSessionAuthentication):
+    config_name = 'cookie'
+
+    def get_user(self, request, session_data):
+        return session_data['_auth_user_id']
+
+
+class CachedCookieAuthentication(CookieAuthentication):
+    config_name = 'cookie-cached'
+
+
+class SaltedHmacCookieAuthentication(CookieAuthentication):
+    """
+        signature with the key derived by `salted_hmac` for each cookie
+    """
+
+    def base64_hmac(self, salt, value, key):
+        return self.b64_encode(salted_hmac(salt, value, key).digest()).decode()
+
+
+def session_cookie():
+    """
+        cookie of the `signed_cookies` backend of django 2.2 (sha1 signature, compressed payload)
+    """
+    session = {'_auth_user_id': '42', '_auth_user_backend': 'django.contrib.auth.backends.ModelBackend',
+               '_auth_user_hash': 'a' * 40, 'cart': list(range(50))}
+    payload = '.' + BaseDecodeToken().b64_encode(compress(JSONSerializer().dumps(session))).decode()
+    return TimestampSigner(settings.SECRET_KEY, salt=SALT, algorithm='sha1').sign(payload)
+
+
+def authenticate(authentication, request, count):
+    def run():
+        for _ in range(count):
+            authentication.authenticate(request)
+
+    return run
+
+
+class StubKeyCloak:
+    """
+        token endpoint stand-in, each request sleeps `latency` seconds
+    """
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.lock = Lock()
+        self.requests = 0
+
+    def __call__(self):
+        sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+        return {'access_token': f'token-{self.requests}', 'expires_in': 300}
+
+
+def token_requests(threads):
+    stub = StubKeyCloak()
+    auth = KeyCloakAppAuth(keycloak_base_url='http://keycloak', realm='bench', client_id='bench', client_secret='s')
+    auth.provider.request_token = stub
+
+    with ThreadPoolExecutor(threads) as executor:
+        tokens = set(executor.map(lambda _: auth.token, range(threads * 10)))
+
+    assert len(tokens) == 1
+    return {'threads': threads, 'token_requests': stub.requests}
+
+
+def main(count, threads):
+    request = APIRequestFactory().get('/', HTTP_COOKIE=f'{settings.SESSION_COOKIE_NAME}={session_cookie()}')
+
+    authentications = (
+        ('salted_hmac per cookie', SaltedHmacCookieAuthentication()),
+        ('precomputed HMAC key', CookieAuthentication()),
+        ('precomputed HMAC key + COOKIE_CACHE_SIZE', CachedCookieAuthentication()),
+    )
+    for _, authentication in authentications:
+        assert authentication.authenticate(request) == ('42', None)
+
+    report(f'{count} cookie authentications', [
+        (name, measure(authenticate(authentication, request, count))) for name, authentication in authentications
+    ])
+    report('KeyCloakAppAuth.token with the token expired', [
+        (KeyCloakTokenProvider.__name__, token_requests(threads)),
+    ])
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 1000, int(argv[2]) if len(argv) > 2 else 32)
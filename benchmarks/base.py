@@ -0,0 +1,68 @@
+from json import dumps
+from os import environ
+from statistics import mean, median
+from time import perf_counter
+
+import django
+from django.conf import settings
+
+
+def setup(apps=(), **extra_settings):
+    if settings.configured:
+        return
+
+    if environ.get('BENCH_DATABASE') == 'postgres':
+        database = {'ENGINE': 'django.db.backends.postgresql', 'NAME': environ.get('PGDATABASE', 'postgres')}
+    else:
+        database = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+
+    settings.configure(**{
+        'DEBUG': False,
+        'SECRET_KEY': 'benchmark',
+        'ALLOWED_HOSTS': ['*'],
+        'USE_TZ': True,
+        'DATABASES': {'default': database},
+        'INSTALLED_APPS': ['django.contrib.contenttypes', 'django.contrib.auth', 'rest_framework', *apps, 'benchmarks'],
+        'DEFAULT_AUTO_FIELD': 'django.db.models.AutoField',
+        **extra_settings,
+    })
+    django.setup()
+
+
+def create_tables(*models):
+    from django.db import connection
+
+    # tables of a previous run are kept in persistent databases
+    existing = set(connection.introspection.table_names())
+    with connection.schema_editor() as editor:
+        for model in reversed(models):
+            if model._meta.db_table in existing:
+                editor.delete_model(model)
+        for model in models:
+            editor.create_model(model)
+
+
+def measure(func, repeat=20, warmup=2):
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        timings.append((perf_counter() - start) * 1000)
+
+    return {'mean_ms': mean(timings), 'median_ms': median(timings), 'min_ms': min(timings), 'max_ms': max(timings)}
+
+
+def report(title, rows):
+    print(f'\n{title}')
+    for name, result in rows:
+        values = ' '.join(f'{key}={value:.3f}' for key, value in result.items())
+        print(f'  {name:<40} {values}')
+
+    # JSON lines of the reports, collected by `benchmarks.run`
+    output = environ.get('BENCH_OUTPUT')
+    if output:
+        with open(output, 'a') as file:
+            file.write(dumps({'title': title, 'rows': dict(rows)}) + '\n')
@@ -0,0 +1,89 @@
+"""
+    Import time of the modules of the package, each imported in a new interpreter after `django.setup()`, with the
+    slowest imports reported by `-X importtime`. Fails when a module loads a dependency that must be deferred
+
+    python -m benchmarks.import_time [runs]
+"""
+import subprocess
+import sys
+from statistics import median
+
+from .base import report
+
+MARKER = '-- import --'
+
+SCRIPT = f'''
+import sys
+from importlib import import_module
+from time import perf_counter
+
+from benchmarks.base import setup
+
+setup(apps=['musa_django_utils.outbox'])
+before = set(sys.modules)
+sys.stderr.write({MARKER!r} + '\\n')
+sys.stderr.flush()
+
+start = perf_counter()
+import_module(sys.argv[1])
+print((perf_counter() - start) * 1000)
+print(' '.join(sorted(set(sys.modules) - before)))
+'''
+
+# dependencies loaded on the first use, not by the import of the module
+DEFERRED = {
+    'musa_django_utils.drf.authentication': ('jwt', 'cryptography', 'drf_spectacular'),
+    'musa_django_utils.drf.authentication.dispatch': ('jwt', 'cryptography'),
+    'musa_django_utils.drf.authentication.old_django': ('jwt', 'cryptography'),
+    'musa_django_utils.drf.authentication.jwt': ('httpx',),
+    'musa_django_utils.utils.keycloak': ('requests', 'httpx'),
+    'musa_django_utils.utils.sns': ('boto3', 'botocore', 'aiobotocore'),
+    'musa_django_utils.utils.sns_buffer': ('boto3', 'botocore'),
+    'musa_django_utils.outbox.relay': ('boto3', 'botocore'),
+    'musa_django_utils.drf.mixins': ('restql',),
+}
+
+
+def run(module):
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT, module], capture_output=True, text=True, check=True,
+    )
+    elapsed, loaded = process.stdout.splitlines()
+    return float(elapsed), set(loaded.split()), external_imports(process.stderr.split(MARKER, 1)[1])
+
+
+def external_imports(importtime):
+    """
+        slowest packages (cumulative time of the top level package) imported with the module
+    """
+    imports = []
+    for line in importtime.splitlines():
+        if line.startswith('import time:') and not line.endswith('| imported package'):
+            _, cumulative, name = line.split('|')
+            name = name.strip()
+            if '.' not in name and name != 'musa_django_utils':
+                imports.append((int(cumulative) / 1000, name))
+
+    return sorted(imports, reverse=True)[:3]
+
+
+def main(runs):
+    rows, failures = [], []
+    for module, deferred in DEFERRED.items():
+        results = [run(module) for _ in range(runs)]
+        loaded, slowest = results[0][1], results[0][2]
+
+        for dependency in deferred:
+            if any(name == dependency or name.startswith(f'{dependency}.') for name in loaded):
+                failures.append(f'{module} imports {dependency}')
+
+        rows.append((module, {'ms': median(elapsed for elapsed, _, _ in results), 'modules': len(loaded)}))
+        print(f'{module}: ' + ', '.join(f'{name} {ms:.1f}ms' for ms, name in slowest))
+
+    report(f'Import time (median of {runs} interpreters)', rows)
+    if failures:
+        raise SystemExit('\n'.join(failures))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,144 @@
+"""
+    Cost per request of `JwtAuthentication.authenticate` (RS256 and ES256 tokens, with and without
+    `TOKEN_CACHE_SIZE`) with the keys of a local JWKS endpoint, and the JWKS requests made when many threads find the
+    keys expired or receive tokens with unknown `kid`
+
+    python -m benchmarks.jwt_auth [requests] [threads]
+"""
+from concurrent.futures import ThreadPoolExecutor
+from json import loads
+from sys import argv
+from time import time
+from uuid import uuid4
+
+from .base import measure, report, setup
+
+setup(AUTH_CONFIG={
+    'jwt': {},
+    'jwt-cached': {'TOKEN_CACHE_SIZE': 1024},
+})
+
+from django.conf import settings  # noqa: E402
+
+from cryptography.hazmat.primitives.asymmetric import ec, rsa  # noqa: E402
+from jwt import encode  # noqa: E402
+from jwt.algorithms import ECAlgorithm, RSAAlgorithm  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from musa_django_utils.drf.authentication.jwt import JwtAuthentication  # noqa: E402
+
+from .stubs import StubJwksServer  # noqa: E402
+
+
+class BenchJwtAuthentication(JwtAuthentication):
+    config_name = 'jwt'
+
+    def get_user(self, request, token_data):
+        return token_data['sub']
+
+
+class CachedJwtAuthentication(BenchJwtAuthentication):
+    config_name = 'jwt-cached'
+
+
+def signing_keys():
+    """
+        private key and public JWK of each algorithm
+    """
+    keys = {}
+    for alg, private_key, algorithm in (
+        ('RS256', rsa.generate_private_key(public_exponent=65537, key_size=2048), RSAAlgorithm),
+        ('ES256', ec.generate_private_key(ec.SECP256R1()), ECAlgorithm),
+    ):
+        jwk = loads(algorithm.to_jwk(private_key.public_key()))
+        jwk.update({'kid': f'bench-{alg.lower()}', 'alg': alg, 'use': 'sig'})
+        keys[alg] = (private_key, jwk)
+
+    return keys
+
+
+def sign(alg, private_key, kid):
+    payload = {'sub': '42', 'exp': int(time()) + 3600, 'scope': 'read write'}
+    return encode(payload, private_key, algorithm=alg, headers={'kid': kid})
+
+
+def configure(jwk_url):
+    for config in settings.AUTH_CONFIG.values():
+        config['JWK_URL'] = jwk_url
+
+
+def bearer_request(token):
+    return APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+def authenticate(authentication, request, count):
+    def run():
+        for _ in range(count):
+            authentication.authenticate(request)
+
+    return run
+
+
+def jwks_requests(stub, tokens, threads):
+    """
+        JWKS requests of `threads * 10` authentications with the keys of a new endpoint (expired)
+    """
+    configure(stub.url(f'/jwks-{uuid4().hex}.json'))
+    authentication = BenchJwtAuthentication()
+    requests = [bearer_request(token) for token in tokens]
+    before = stub.requests
+
+    with ThreadPoolExecutor(threads) as executor:
+        users = set(executor.map(lambda i: authentication.authenticate(requests[i % len(requests)])[0],
+                                 range(threads * 10)))
+
+    assert users == {'42'}
+    return stub.requests - before
+
+
+def unknown_kid_requests(stub, tokens, threads):
+    """
+        JWKS requests made by tokens with unknown `kid`, limited by `JWK_MIN_REFRESH_INTERVAL`
+    """
+    authentication = BenchJwtAuthentication()
+    before = stub.requests
+
+    def run(i):
+        try:
+            authentication.authenticate(bearer_request(tokens[i % len(tokens)]))
+        except Exception:
+            return False
+        return True
+
+    with ThreadPoolExecutor(threads) as executor:
+        assert not any(executor.map(run, range(threads * 10)))
+
+    return stub.requests - before
+
+
+def main(count, threads):
+    keys = signing_keys()
+    stub = StubJwksServer([jwk for _, jwk in keys.values()])
+    configure(stub.url())
+    tokens = {alg: sign(alg, private_key, jwk['kid']) for alg, (private_key, jwk) in keys.items()}
+
+    authentications = (('', BenchJwtAuthentication()), (' + TOKEN_CACHE_SIZE', CachedJwtAuthentication()))
+    rows = []
+    for alg, token in tokens.items():
+        request = bearer_request(token)
+        for name, authentication in authentications:
+            assert authentication.authenticate(request) == ('42', None)
+            rows.append((f'{alg}{name}', measure(authenticate(authentication, request, count))))
+    report(f'{count} JWT authentications, keys of the JWKS endpoint', rows)
+
+    private_key, _ = keys['RS256']
+    unknown = [sign('RS256', private_key, f'unknown-{i}') for i in range(threads)]
+    report(f'JWKS requests of {threads} threads, {threads * 10} authentications', [
+        ('expired keys', {'threads': threads, 'jwks_requests': jwks_requests(stub, list(tokens.values()), threads)}),
+        ('unknown kid', {'threads': threads, 'jwks_requests': unknown_kid_requests(stub, unknown, threads)}),
+    ])
+    stub.close()
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 1000, int(argv[2]) if len(argv) > 2 else 32)
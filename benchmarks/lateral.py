@@ -0,0 +1,84 @@
+"""
+    One correlated subquery per aggregate (`SubqueryCount`, `SubquerySum`, `SubqueryAvg`) against `annotate_lateral`,
+    with the EXPLAIN of both queries (postgres only, sqlite has no LATERAL)
+
+    BENCH_DATABASE=postgres python -m benchmarks.lateral [authors] [books per author]
+"""
+from datetime import timedelta
+from decimal import Decimal
+from sys import argv
+
+from .base import create_tables, measure, report, setup
+
+setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models import OuterRef  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from musa_django_utils.django.expressions import (  # noqa: E402
+    LateralAvg, LateralCount, LateralSum, SubqueryAvg, SubqueryCount, SubquerySum, annotate_lateral,
+)
+
+from .models import Author, Book  # noqa: E402
+
+
+def populate(authors, books):
+    create_tables(Author, Book)
+    Author.objects.bulk_create((Author(name=f'author {i}') for i in range(authors)), batch_size=5000)
+    now = timezone.now()
+    Book.objects.bulk_create(
+        (
+            Book(author_id=author_id, title=f'book {i}', price=Decimal(i % 100), created_at=now - timedelta(hours=i))
+            for author_id in Author.objects.values_list('id', flat=True)
+            for i in range(books)
+        ),
+        batch_size=5000,
+    )
+    with connection.cursor() as cursor:
+        for model in (Author, Book):
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+
+def subqueries():
+    books = Book.objects.filter(author=OuterRef('pk'))
+    return Author.objects.annotate(
+        book_count=SubqueryCount(books.values('id'), field='id'),
+        total=SubquerySum(books.values('price'), min=0),
+        avg_price=SubqueryAvg(books.values('price')),
+    ).order_by('id')
+
+
+def lateral():
+    return annotate_lateral(
+        Author.objects.all(),
+        Book.objects.filter(author=OuterRef('pk')),
+        book_count=LateralCount('id'),
+        total=LateralSum('price', min=0),
+        avg_price=LateralAvg('price'),
+    ).order_by('id')
+
+
+def explain(queryset):
+    print(f'\n{queryset.explain()}')
+
+
+def main(authors, books):
+    if connection.vendor != 'postgresql':
+        raise SystemExit('LEFT JOIN LATERAL requires BENCH_DATABASE=postgres')
+
+    populate(authors, books)
+    fields = ('id', 'book_count', 'total', 'avg_price')
+    assert list(subqueries().values_list(*fields)) == list(lateral().values_list(*fields))
+
+    explain(subqueries())
+    explain(lateral())
+
+    report(f'Authors with 3 aggregates ({authors} authors, {books} books each)', [
+        ('subquery per aggregate', measure(lambda: list(subqueries()), repeat=10)),
+        ('annotate_lateral', measure(lambda: list(lateral()), repeat=10)),
+    ])
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 2000, int(argv[2]) if len(argv) > 2 else 50)
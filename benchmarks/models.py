@@ -0,0 +1,55 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+
+from musa_django_utils.django.models import LiveSoftDeleteModel, SoftDeleteModel
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        app_label = 'benchmarks'
+
+
+class Book(models.Model):
+    author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='books')
+    title = models.CharField(max_length=100)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        app_label = 'benchmarks'
+        indexes = [models.Index(fields=['created_at', 'id'])]
+
+
+class LegacyTicket(SoftDeleteModel):
+    code = models.CharField(max_length=20, db_index=True)
+
+    class Meta:
+        app_label = 'benchmarks'
+
+
+class LiveTicket(LiveSoftDeleteModel):
+    code = models.CharField(max_length=20)
+
+    live_index_fields = ('code',)
+
+    class Meta:
+        app_label = 'benchmarks'
+
+
+class ArchivedTicket(LiveSoftDeleteModel):
+    code = models.CharField(max_length=20, db_index=True)
+
+    archive = True
+
+    class Meta:
+        app_label = 'benchmarks'
+
+
+class TaggedBook(models.Model):
+    title = models.CharField(max_length=100)
+    tags = ArrayField(models.CharField(max_length=20), default=list)
+
+    class Meta:
+        app_label = 'benchmarks'
@@ -0,0 +1,110 @@
+"""
+    Nested collections: `prefetch_related` + nested serializer against `SubqueryJson` (decoded, and as text written
+    by `RawJSONRenderer`), serialized and rendered (postgres only)
+
+    BENCH_DATABASE=postgres python -m benchmarks.nested [authors] [books per author]
+"""
+from datetime import timedelta
+from decimal import Decimal
+from json import loads
+from sys import argv
+
+from .base import create_tables, measure, report, setup
+
+setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models import OuterRef  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from rest_framework import serializers  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from musa_django_utils.django.expressions import SubqueryJson  # noqa: E402
+from musa_django_utils.drf.fields import RawJSONField  # noqa: E402
+from musa_django_utils.drf.renderers import RawJSONRenderer  # noqa: E402
+
+from .models import Author, Book  # noqa: E402
+
+
+def populate(authors, books):
+    create_tables(Author, Book)
+    Author.objects.bulk_create((Author(name=f'author {i}') for i in range(authors)), batch_size=5000)
+    now = timezone.now()
+    Book.objects.bulk_create(
+        (
+            Book(author_id=author_id, title=f'book {i}', price=Decimal(i % 100), created_at=now - timedelta(hours=i))
+            for author_id in Author.objects.values_list('id', flat=True)
+            for i in range(books)
+        ),
+        batch_size=5000,
+    )
+
+
+class BookSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Book
+        fields = ('id', 'title')
+
+
+class PrefetchAuthorSerializer(serializers.ModelSerializer):
+    books = BookSerializer(many=True)
+
+    class Meta:
+        model = Author
+        fields = ('id', 'name', 'books')
+
+
+class JsonAuthorSerializer(serializers.ModelSerializer):
+    books = serializers.JSONField(source='book_list')
+
+    class Meta:
+        model = Author
+        fields = ('id', 'name', 'books')
+
+
+class RawJsonAuthorSerializer(serializers.ModelSerializer):
+    books = RawJSONField(source='book_list')
+
+    class Meta:
+        model = Author
+        fields = ('id', 'name', 'books')
+
+
+def book_list(as_text=False):
+    books = Book.objects.filter(author=OuterRef('pk')).values('id', 'title')
+    return SubqueryJson(books, ordering=('id',), function='json_agg', as_text=as_text)
+
+
+def prefetch():
+    queryset = Author.objects.prefetch_related('books').order_by('id')
+    return JSONRenderer().render(PrefetchAuthorSerializer(queryset, many=True).data)
+
+
+def subquery_json():
+    queryset = Author.objects.annotate(book_list=book_list()).order_by('id')
+    return JSONRenderer().render(JsonAuthorSerializer(queryset, many=True).data)
+
+
+def subquery_raw_json():
+    queryset = Author.objects.annotate(book_list=book_list(as_text=True)).order_by('id')
+    return RawJSONRenderer().render(RawJsonAuthorSerializer(queryset, many=True).data)
+
+
+def main(authors, books):
+    if connection.vendor != 'postgresql':
+        raise SystemExit('json_agg requires BENCH_DATABASE=postgres')
+
+    populate(authors, books)
+    assert loads(prefetch()) == loads(subquery_json()) == loads(subquery_raw_json())
+
+    report(f'Authors with nested books ({authors} authors, {books} books each)', [
+        ('prefetch_related + nested serializer', measure(prefetch, repeat=10)),
+        ('SubqueryJson + JSONField', measure(subquery_json, repeat=10)),
+        ('SubqueryJson(as_text) + RawJSONRenderer', measure(subquery_raw_json, repeat=10)),
+    ])
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 500, int(argv[2]) if len(argv) > 2 else 20)
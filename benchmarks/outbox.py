@@ -0,0 +1,59 @@
+"""
+    Throughput of the SNS outbox relay against publishing inline, with a stub SNS client
+
+    python -m benchmarks.outbox [events] [latency seconds]
+"""
+from sys import argv
+from time import perf_counter
+
+from .base import create_tables, report, setup
+
+setup(apps=['musa_django_utils.outbox'])
+
+from django.db import transaction  # noqa: E402
+
+from musa_django_utils.outbox.models import SnsOutboxEvent  # noqa: E402
+from musa_django_utils.outbox.publisher import OutboxSnsWrapper  # noqa: E402
+from musa_django_utils.outbox.relay import OutboxRelay  # noqa: E402
+from musa_django_utils.utils.sns import SnsWrapper  # noqa: E402
+
+from .stubs import StubSnsClient  # noqa: E402
+
+TOPIC = 'arn:aws:sns:us-east-1:000000000000:benchmark'
+
+
+def timed(func):
+    start = perf_counter()
+    func()
+    return perf_counter() - start
+
+
+def main(events, latency):
+    create_tables(SnsOutboxEvent)
+    messages = [{'message': {'id': i}, 'attributes': {'event': 'created'}} for i in range(events)]
+
+    inline = SnsWrapper(TOPIC, client=StubSnsClient(latency))
+    inline_seconds = timed(lambda: [inline.publish_message(**m) for m in messages[:min(events, 200)]])
+    inline_seconds *= events / min(events, 200)
+
+    outbox = OutboxSnsWrapper(TOPIC)
+
+    def write():
+        with transaction.atomic():
+            for message in messages:
+                outbox.publish_message(**message)
+
+    write_seconds = timed(write)
+    relay = OutboxRelay(SnsWrapper(TOPIC, client=StubSnsClient(latency)), batch_size=500)
+    relay_seconds = timed(relay.relay)
+    assert not SnsOutboxEvent.objects.exists()
+
+    report(f'SNS outbox ({events} events, {latency * 1000:.0f}ms stub latency)', [
+        ('inline publish_message (estimated)', {'seconds': inline_seconds, 'events_per_s': events / inline_seconds}),
+        ('outbox write in transaction', {'seconds': write_seconds, 'events_per_s': events / write_seconds}),
+        ('outbox relay', {'seconds': relay_seconds, 'events_per_s': events / relay_seconds}),
+    ])
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 10000, float(argv[2]) if len(argv) > 2 else 0.02)
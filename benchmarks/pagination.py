@@ -0,0 +1,84 @@
+"""
+    Latency of `StandardPagination` (OFFSET + COUNT) and `KeysetPagination` by page depth
+
+    python -m benchmarks.pagination [rows]
+"""
+from datetime import timedelta
+from decimal import Decimal
+from sys import argv
+
+from .base import create_tables, measure, report, setup
+
+setup()
+
+from django.utils import timezone  # noqa: E402
+
+from rest_framework.pagination import Cursor  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from musa_django_utils.drf.pagination import KeysetPagination, StandardPagination  # noqa: E402
+
+from .models import Author, Book  # noqa: E402
+
+PAGE_SIZE = 25
+
+
+def populate(rows):
+    create_tables(Author, Book)
+    author = Author.objects.create(name='author')
+    now = timezone.now()
+    Book.objects.bulk_create(
+        (
+            Book(author=author, title=f'book {i}', price=Decimal(i % 100), created_at=now - timedelta(seconds=i // 3))
+            for i in range(rows)
+        ),
+        batch_size=5000,
+    )
+
+
+class BookKeysetPagination(KeysetPagination):
+    ordering = ('-created_at',)
+
+
+def standard_page(page):
+    request = Request(APIRequestFactory().get('/books/', {'page': page, 'page_size': PAGE_SIZE}))
+
+    def run():
+        pagination = StandardPagination()
+        queryset = Book.objects.order_by('-created_at')
+        pagination.get_paginated_response(pagination.paginate_queryset(queryset, request))
+
+    return run
+
+
+def keyset_page(page):
+    ordering = BookKeysetPagination.ordering + ('-pk',)
+    params = {}
+    if page > 1:
+        # cursor of the last row in the previous page, built outside the timed function
+        instance = Book.objects.order_by(*ordering)[(page - 1) * PAGE_SIZE - 1]
+        pagination = BookKeysetPagination()
+        pagination.base_url = 'http://testserver/books/'
+        position = pagination._get_position_from_instance(instance, ordering)
+        params['cursor'] = pagination.encode_cursor(Cursor(offset=0, reverse=False, position=position)).split('=')[1]
+
+    request = Request(APIRequestFactory().get('/books/', params))
+
+    def run():
+        pagination = BookKeysetPagination()
+        pagination.get_paginated_response(pagination.paginate_queryset(Book.objects.all(), request))
+
+    return run
+
+
+def main(rows):
+    populate(rows)
+    pages = [page for page in (1, 10, 100, 1000, 10000, 100000) if page * PAGE_SIZE <= rows]
+
+    report(f'StandardPagination ({rows} rows)', [(f'page {page}', measure(standard_page(page))) for page in pages])
+    report(f'KeysetPagination ({rows} rows)', [(f'page {page}', measure(keyset_page(page))) for page in pages])
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 100000)
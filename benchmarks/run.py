@@ -0,0 +1,175 @@
+"""
+    Runs the benchmark modules, each in a new interpreter with fixed sizes, and stores the reports as JSON with the
+    version of the package, to compare the results of two versions (or two databases)
+
+    python -m benchmarks.run [modules] [--output file.json] [--compare baseline.json] [--threshold 0.1]
+
+    `--compare` prints the change of each result present in both files and fails when a result is slower (or has a
+    lower throughput) than the baseline by more than `--threshold`
+"""
+import platform
+import subprocess
+import sys
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from json import dump, load, loads
+from os import environ
+from tempfile import NamedTemporaryFile
+
+import django
+
+from musa_django_utils import __version__
+
+# module => arguments, fixed so the titles (and the results) of two runs match
+SUITE = {
+    'jwt_auth': (1000, 32),
+    'auth': (1000, 32),
+    'serializers': (10000,),
+    'pagination': (100000,),
+    'subqueries': (5000, 20),
+    'sns': (1000, 0.02),
+    'validators': (10000,),
+    'soft_delete': (200000, 0.9),
+    'streaming': (20000,),
+    'outbox': (10000, 0.02),
+    'import_time': (5,),
+    'lateral': (2000, 50),
+    'nested': (500, 20),
+    'array_filters': (200000,),
+}
+POSTGRES_ONLY = ('lateral', 'nested', 'array_filters')
+
+# results where the lower value is the better one, except the throughputs
+HIGHER_IS_BETTER = ('_per_s',)
+IGNORED_KEYS = ('threads',)
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_module(module, args):
+    """
+        reports of the module, by title
+    """
+    with NamedTemporaryFile('r', suffix='.jsonl') as output:
+        process = subprocess.run(
+            [sys.executable, '-m', f'benchmarks.{module}', *map(str, args)],
+            env={**environ, 'BENCH_OUTPUT': output.name},
+        )
+        reports = {}
+        for line in output:
+            report = loads(line)
+            reports[report['title']] = report['rows']
+
+    return process.returncode, reports
+
+
+def compared_keys(result):
+    """
+        the median of timed results, all the other values of counters
+    """
+    if 'median_ms' in result:
+        return ['median_ms'] + [key for key in result if key.endswith(HIGHER_IS_BETTER)]
+
+    return [key for key in result if key not in IGNORED_KEYS]
+
+
+def change(old, new):
+    if old == new:
+        return 0.0
+    if old == 0:
+        return float('inf')
+
+    return (new - old) / abs(old)
+
+
+def compare(baseline, results, threshold):
+    """
+        print the changes against the baseline, returns the regressions
+    """
+    meta = baseline['meta']
+    print(f'\nComparison with {meta["version"]} ({meta["commit"]}, {meta["database"]}), threshold {threshold:.0%}')
+
+    regressions = []
+    for module, reports in results['results'].items():
+        for title, rows in reports.items():
+            old_rows = baseline['results'].get(module, {}).get(title)
+            if old_rows is None:
+                continue
+
+            print(f'\n{module}: {title}')
+            for name, result in rows.items():
+                old_result = old_rows.get(name, {})
+                for key in compared_keys(result):
+                    if key not in old_result:
+                        continue
+
+                    delta = change(old_result[key], result[key])
+                    worse = -delta if key.endswith(HIGHER_IS_BETTER) else delta
+                    flag = ''
+                    if worse > threshold:
+                        flag = '  REGRESSION'
+                        regressions.append(f'{module}: {title}: {name} {key}')
+
+                    print(f'  {name:<40} {key}={old_result[key]:.3f} -> {result[key]:.3f} ({delta:+.1%}){flag}')
+
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(prog='python -m benchmarks.run')
+    parser.add_argument('modules', nargs='*', help=f'modules to run (default: all), of {", ".join(SUITE)}')
+    parser.add_argument('--output', default=f'benchmark-{__version__}.json', help='JSON file of the results')
+    parser.add_argument('--compare', help='JSON file of a previous run')
+    parser.add_argument('--threshold', type=float, default=0.1, help='max change of a result (default: 0.1)')
+    options = parser.parse_args()
+    unknown = set(options.modules) - set(SUITE)
+    if unknown:
+        parser.error(f'unknown modules: {", ".join(sorted(unknown))}')
+
+    database = environ.get('BENCH_DATABASE', 'sqlite')
+    results = {
+        'meta': {
+            'version': __version__,
+            'commit': get_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': database,
+            'failed': [],
+        },
+        'results': {},
+    }
+
+    for module in options.modules or SUITE:
+        if module in POSTGRES_ONLY and database != 'postgres':
+            print(f'\nSkipping {module}, postgres only')
+            continue
+
+        print(f'\n== {module} {" ".join(map(str, SUITE[module]))}', flush=True)
+        returncode, reports = run_module(module, SUITE[module])
+        if returncode:
+            results['meta']['failed'].append(module)
+        results['results'][module] = reports
+
+    with open(options.output, 'w') as file:
+        dump(results, file, indent=2)
+    print(f'\nResults stored in {options.output}')
+
+    regressions = []
+    if options.compare:
+        with open(options.compare) as file:
+            regressions = compare(load(file), results, options.threshold)
+
+    if results['meta']['failed'] or regressions:
+        raise SystemExit('\n'.join([f'{module} failed' for module in results['meta']['failed']] + regressions))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+    Serialization of large lists by `Md5VersionSerializer`, by `hash_algorithm` and with `hash_fields`, against the
+    same serializer without `hash_id`
+
+    python -m benchmarks.serializers [items]
+"""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from sys import argv
+from types import SimpleNamespace
+
+from .base import measure, report, setup
+
+setup()
+
+from rest_framework import serializers  # noqa: E402
+
+from musa_django_utils.drf.serializers import Md5VersionSerializer  # noqa: E402
+
+
+class BookFields(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    created_at = serializers.DateTimeField()
+    updated_at = serializers.DateTimeField()
+    tags = serializers.ListField(child=serializers.CharField())
+    active = serializers.BooleanField()
+
+
+class Md5BookSerializer(BookFields, Md5VersionSerializer):
+    pass
+
+
+class Blake2bBookSerializer(Md5BookSerializer):
+    hash_algorithm = 'blake2b'
+
+
+class XxhashBookSerializer(Md5BookSerializer):
+    hash_algorithm = 'xxhash'
+
+
+class FieldsBookSerializer(Md5BookSerializer):
+    hash_algorithm = 'xxhash'
+    hash_fields = ('id', 'updated_at')
+
+
+SERIALIZERS = (
+    ('without hash_id', BookFields),
+    ('md5', Md5BookSerializer),
+    ('blake2b', Blake2bBookSerializer),
+    ('xxhash', XxhashBookSerializer),
+    ("xxhash, hash_fields=('id', 'updated_at')", FieldsBookSerializer),
+)
+
+
+def books(items):
+    now = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            id=i, title=f'book {i}', price=Decimal(i % 100), created_at=now - timedelta(hours=i), updated_at=now,
+            tags=[f'tag-{i % 7}', f'tag-{i % 11}'], active=bool(i % 2),
+        )
+        for i in range(items)
+    ]
+
+
+def serialize(serializer_class, instances):
+    def run():
+        serializer_class(instances, many=True).data
+
+    return run
+
+
+def main(items):
+    instances = books(items)
+    report(f'{items} items, many=True', [
+        (name, measure(serialize(serializer_class, instances), repeat=10)) for name, serializer_class in SERIALIZERS
+    ])
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 10000)
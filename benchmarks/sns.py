@@ -0,0 +1,63 @@
+"""
+    `SnsWrapper.publish_batch` against one `publish_message` per message, by connection pool size and for FIFO topics
+    (chunks published in sequence), with a stub SNS client
+
+    python -m benchmarks.sns [messages] [latency seconds]
+"""
+from sys import argv
+
+from .base import measure, report, setup
+
+setup()
+
+from musa_django_utils.utils.sns import SnsWrapper  # noqa: E402
+
+from .stubs import StubSnsClient  # noqa: E402
+
+TOPIC = 'arn:aws:sns:us-east-1:000000000000:benchmark'
+
+
+def publish_messages(wrapper, messages):
+    def run():
+        for message in messages:
+            wrapper.publish_message(**message)
+
+    return run
+
+
+def publish_batch(wrapper, messages):
+    def run():
+        result = wrapper.publish_batch(messages)
+        assert len(result['successful']) == len(messages) and not result['failed']
+
+    return run
+
+
+def throughput(func, messages, scale=1):
+    result = measure(func, repeat=3, warmup=0)
+    result = {key: value * scale for key, value in result.items()}
+    return {**result, 'messages_per_s': messages * 1000 / result['median_ms']}
+
+
+def main(count, latency):
+    messages = [{'message': {'id': i}, 'attributes': {'event': 'created'}} for i in range(count)]
+    fifo_messages = [{**message, 'topic': f'{TOPIC}.fifo', 'MessageGroupId': 'bench'} for message in messages]
+    sample = messages[:min(count, 20)]
+
+    rows = [(
+        'publish_message (estimated)',
+        throughput(publish_messages(SnsWrapper(TOPIC, client=StubSnsClient(latency)), sample), count,
+                   count / len(sample)),
+    )]
+    for pool in (1, 10, 50):
+        wrapper = SnsWrapper(TOPIC, client=StubSnsClient(latency), max_pool_connections=pool)
+        rows.append((f'publish_batch, pool of {pool}', throughput(publish_batch(wrapper, messages), count)))
+
+    wrapper = SnsWrapper(TOPIC, client=StubSnsClient(latency))
+    rows.append(('publish_batch, FIFO topic', throughput(publish_batch(wrapper, fifo_messages), count)))
+
+    report(f'SNS publishing ({count} messages, {latency * 1000:.0f}ms stub latency)', rows)
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 1000, float(argv[2]) if len(argv) > 2 else 0.02)
@@ -0,0 +1,113 @@
+"""
+    `SoftDeleteModel` (full indexes) against `LiveSoftDeleteModel` (partial indexes, and archive table) in tables with
+    many deleted rows
+
+    python -m benchmarks.soft_delete [rows] [deleted ratio]
+"""
+from itertools import cycle
+from random import Random
+from sys import argv
+
+from .base import create_tables, measure, report, setup
+
+setup()
+
+from django.db import connection  # noqa: E402
+
+from .models import ArchivedTicket, LegacyTicket, LiveTicket  # noqa: E402
+
+MODELS = (LegacyTicket, LiveTicket, ArchivedTicket)
+
+
+def populate(rows, deleted_ratio):
+    create_tables(LegacyTicket, LiveTicket, ArchivedTicket, ArchivedTicket.archive_model)
+    deleted_rows = int(rows * deleted_ratio)
+
+    for model in (LegacyTicket, LiveTicket):
+        model.objects.bulk_create(
+            (model(code=f'code-{i}', deleted=i < deleted_rows) for i in range(rows)), batch_size=5000
+        )
+
+    ArchivedTicket.archive_model.objects.bulk_create(
+        (ArchivedTicket.archive_model(code=f'code-{i}', deleted=True) for i in range(deleted_rows)), batch_size=5000
+    )
+    ArchivedTicket.objects.bulk_create(
+        (ArchivedTicket(id=i + 1, code=f'code-{i}') for i in range(deleted_rows, rows)), batch_size=5000
+    )
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for model in MODELS + (ArchivedTicket.archive_model,):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+
+def live_codes(rows, deleted_ratio, size=100):
+    random = Random(0)
+    return [f'code-{random.randrange(int(rows * deleted_ratio), rows)}' for _ in range(size)]
+
+
+def lookups(model, codes):
+    def run():
+        for code in codes:
+            model.objects.filter(code=code).first()
+
+    return run
+
+
+def first_page(model):
+    def run():
+        list(model.objects.filter().order_by('-id')[:25])
+
+    return run
+
+
+def delete_batch_size(rows, deleted_ratio, runs=12):
+    """
+        rows soft deleted by each of the `runs` (warmup and repeat of `measure`), up to 100, of the live rows
+    """
+    return max(1, min(100, (rows - int(rows * deleted_ratio)) // runs))
+
+
+def soft_delete(model, rows, deleted_ratio):
+    start = int(rows * deleted_ratio)
+    size = delete_batch_size(rows, deleted_ratio)
+    # with fewer live rows than the runs, the batches are deleted again
+    batches = cycle(range(start, rows, size))
+
+    def run():
+        offset = next(batches)
+        model.objects.filter(code__in=[f'code-{i}' for i in range(offset, offset + size)]).soft_delete()
+
+    return run
+
+
+def index_sizes():
+    if connection.vendor != 'postgresql':
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexrelname, pg_relation_size(indexrelid) FROM pg_stat_user_indexes "
+            "WHERE relname LIKE 'benchmarks\\_%%ticket%%' ORDER BY indexrelname"
+        )
+        return [(name, {'kb': size / 1024}) for name, size in cursor.fetchall()]
+
+
+def main(rows, deleted_ratio):
+    populate(rows, deleted_ratio)
+    codes = live_codes(rows, deleted_ratio)
+
+    title = f'({rows} rows, {deleted_ratio:.0%} deleted)'
+    report(f'100 lookups of live rows {title}', [(model.__name__, measure(lookups(model, codes))) for model in MODELS])
+    report(f'First page of live rows {title}', [(model.__name__, measure(first_page(model))) for model in MODELS])
+    report(f'Soft delete of {delete_batch_size(rows, deleted_ratio)} rows {title}', [
+        (model.__name__, measure(soft_delete(model, rows, deleted_ratio), repeat=10)) for model in MODELS
+    ])
+
+    sizes = index_sizes()
+    if sizes:
+        report('Index sizes', sizes)
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 200000, float(argv[2]) if len(argv) > 2 else 0.9)
@@ -0,0 +1,121 @@
+"""
+    Peak memory (tracemalloc) and time to first byte of `StandardPagination` pages rendered by DRF against
+    `StreamingListMixin` (`?stream=json`), and of an NDJSON export of the whole table
+
+    python -m benchmarks.streaming [rows]
+"""
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from json import loads
+from sys import argv
+from time import perf_counter
+
+from .base import create_tables, report, setup
+
+setup()
+
+from django.utils import timezone  # noqa: E402
+
+from rest_framework import generics, serializers  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from musa_django_utils.drf.mixins import StreamingListMixin  # noqa: E402
+from musa_django_utils.drf.pagination import StandardPagination  # noqa: E402
+
+from .models import Author, Book  # noqa: E402
+
+
+def populate(rows):
+    create_tables(Author, Book)
+    Author.objects.bulk_create(Author(name=f'author {i}') for i in range(100))
+    authors = list(Author.objects.all())
+    now = timezone.now()
+    Book.objects.bulk_create(
+        (
+            Book(author=authors[i % 100], title=f'book {i}', price=Decimal(i % 100), created_at=now - timedelta(i))
+            for i in range(rows)
+        ),
+        batch_size=5000,
+    )
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Author
+        fields = ('id', 'name')
+
+
+class BookSerializer(serializers.ModelSerializer):
+    author = AuthorSerializer()
+
+    class Meta:
+        model = Book
+        fields = ('id', 'title', 'price', 'created_at', 'author')
+
+
+class BookList(StreamingListMixin, generics.ListAPIView):
+    queryset = Book.objects.prefetch_related('author').order_by('id')
+    serializer_class = BookSerializer
+    pagination_class = StandardPagination
+    stream_formats = ('json', 'ndjson')
+    authentication_classes = []
+    permission_classes = []
+
+
+def run(params, keep_body=True):
+    """
+        return the time to the first byte, total time and the body (or its size)
+    """
+    request = APIRequestFactory().get('/books/', params)
+    start = perf_counter()
+    response = BookList.as_view()(request)
+
+    if response.streaming:
+        content = iter(response.streaming_content)
+        first = next(content)
+        first_byte = perf_counter() - start
+        body = first + b''.join(content) if keep_body else len(first) + sum(len(part) for part in content)
+    else:
+        body = response.render().content
+        first_byte = perf_counter() - start
+
+    return first_byte * 1000, (perf_counter() - start) * 1000, body
+
+
+def measure_run(params, repeat=5):
+    timings = [run(params)[:2] for _ in range(repeat)]
+
+    # the body of the streamed responses isn't kept, as in a response written to the socket
+    tracemalloc.start()
+    _, _, body = run(params, keep_body=False)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'ttfb_ms': min(first for first, _ in timings),
+        'total_ms': min(total for _, total in timings),
+        'peak_kb': peak / 1024,
+        'body_kb': (body if isinstance(body, int) else len(body)) / 1024,
+    }
+
+
+def main(rows):
+    populate(rows)
+    page_size = min(StandardPagination.max_page_size, rows)
+    page = {'page_size': page_size, 'page': 1}
+    body = loads(run(page)[2])
+    assert len(body['results']) == page_size and body == loads(run({**page, 'stream': 'json'})[2])
+
+    report(f'Page of {page_size} books ({rows} rows)', [
+        ('StandardPagination', measure_run(page)),
+        ('StreamingListMixin ?stream=json', measure_run({**page, 'stream': 'json'})),
+    ])
+    report(f'Export of all books ({rows} rows)', [
+        ('StreamingListMixin ?stream=ndjson', measure_run({'stream': 'ndjson'}, repeat=2)),
+    ])
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 20000)
@@ -0,0 +1,71 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps
+from threading import Lock, Thread
+from time import sleep
+from uuid import uuid4
+
+
+class StubSnsClient:
+    """
+        boto3 SNS client stand-in, each call sleeps `latency` seconds simulating the network round trip
+    """
+
+    def __init__(self, latency=0.02):
+        self.latency = latency
+        self.lock = Lock()
+        self.calls = 0
+        self.messages = 0
+
+    def _call(self, messages):
+        sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+            self.messages += messages
+
+    def publish(self, **kwargs):
+        self._call(1)
+        return {'MessageId': str(uuid4())}
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        self._call(len(PublishBatchRequestEntries))
+        return {'Successful': [{'Id': entry['Id'], 'MessageId': str(uuid4())} for entry in PublishBatchRequestEntries]}
+
+
+class StubJwksServer:
+    """
+        local JWKS endpoint, serves `keys` with `Cache-Control: max-age` in a thread, counting the requests
+    """
+
+    def __init__(self, keys, max_age=300, latency=0.0):
+        self.body = dumps({'keys': keys}).encode()
+        self.max_age = max_age
+        self.latency = latency
+        self.lock = Lock()
+        self.requests = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                sleep(stub.latency)
+                with stub.lock:
+                    stub.requests += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Cache-Control', f'max-age={stub.max_age}')
+                self.send_header('Content-Length', str(len(stub.body)))
+                self.end_headers()
+                self.wfile.write(stub.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        Thread(target=self.server.serve_forever, name='stub-jwks', daemon=True).start()
+
+    def url(self, path='/jwks.json'):
+        return f'http://127.0.0.1:{self.server.server_port}{path}'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
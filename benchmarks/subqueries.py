@@ -0,0 +1,107 @@
+"""
+    SQL generated by the `Subquery*` expressions: time to compile the queries, and their execution against the
+    `GROUP BY` aggregates of the ORM, on the benchmark database (sqlite by default, `SubqueryList` and `SubqueryJson`
+    only with postgres). The SQL of each query is printed
+
+    python -m benchmarks.subqueries [authors] [books per author]
+"""
+from datetime import timedelta
+from decimal import Decimal
+from sys import argv
+
+from .base import create_tables, measure, report, setup
+
+setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models import Avg, BooleanField, Count, OuterRef, Sum  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from musa_django_utils.django.expressions import (  # noqa: E402
+    ExistsMoreThan, SubqueryAvg, SubqueryCount, SubqueryJson, SubqueryList, SubquerySum,
+)
+
+from .models import Author, Book  # noqa: E402
+
+
+def populate(authors, books):
+    create_tables(Author, Book)
+    Author.objects.bulk_create((Author(name=f'author {i}') for i in range(authors)), batch_size=5000)
+    now = timezone.now()
+    Book.objects.bulk_create(
+        (
+            Book(author_id=author_id, title=f'book {i}', price=Decimal(i % 100), created_at=now - timedelta(hours=i))
+            for author_id in Author.objects.values_list('id', flat=True)
+            # authors with 0 to `books` books
+            for i in range(author_id % (books + 1))
+        ),
+        batch_size=5000,
+    )
+    with connection.cursor() as cursor:
+        for model in (Author, Book):
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+
+def author_books():
+    return Book.objects.filter(author=OuterRef('pk'))
+
+
+def queries(books):
+    threshold = books // 2
+    yield 'SubqueryCount + SubquerySum + SubqueryAvg', Author.objects.annotate(
+        book_count=SubqueryCount(author_books().values('id'), field='id'),
+        total=SubquerySum(author_books().values('price'), min=0),
+        avg_price=SubqueryAvg(author_books().values('price')),
+    ).order_by('id')
+    yield 'Count + Sum + Avg (GROUP BY)', Author.objects.annotate(
+        book_count=Count('books'), total=Sum('books__price'), avg_price=Avg('books__price'),
+    ).order_by('id')
+    yield f'ExistsMoreThan {threshold} (LIMIT)', Author.objects.annotate(
+        many_books=ExistsMoreThan(
+            author_books().values('id'), field='id', value=threshold, output_field=BooleanField(),
+        ),
+    ).filter(many_books=True).order_by('id')
+    yield f'Count > {threshold} (GROUP BY + HAVING)', Author.objects.annotate(
+        book_count=Count('books'),
+    ).filter(book_count__gt=threshold).order_by('id')
+
+    if connection.vendor == 'postgresql':
+        yield 'SubqueryList of 5 titles', Author.objects.annotate(
+            titles=SubqueryList(author_books().values('title'), ordering=('-created_at',), limit=5),
+        ).order_by('id')
+        yield 'SubqueryJson of 5 books', Author.objects.annotate(
+            books_json=SubqueryJson(author_books().values('id', 'title'), ordering=('-created_at',), limit=5),
+        ).order_by('id')
+
+
+def compile_sql(queryset, count):
+    def run():
+        for _ in range(count):
+            queryset.all().query.sql_with_params()
+
+    return run
+
+
+def execute(queryset):
+    def run():
+        list(queryset.all())
+
+    return run
+
+
+def main(authors, books):
+    populate(authors, books)
+    rows = list(queries(books))
+    for name, queryset in rows:
+        print(f'\n{name}\n  {queryset.query}')
+
+    report(f'Compile 100 queries ({connection.vendor})', [
+        (name, measure(compile_sql(queryset, 100))) for name, queryset in rows
+    ])
+    report(f'Execute ({connection.vendor}, {authors} authors, up to {books} books each)', [
+        (name, measure(execute(queryset), repeat=10)) for name, queryset in rows
+    ])
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 5000, int(argv[2]) if len(argv) > 2 else 20)
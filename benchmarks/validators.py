@@ -0,0 +1,114 @@
+"""
+    Validation of bulk payloads: `DependsAnotherField` and `NoAcceptSpace` per item (`ListSerializer`) against
+    `BatchValidatedListSerializer`, and the previous `DependsAnotherField` check against the frozenset one
+
+    python -m benchmarks.validators [items]
+"""
+from sys import argv
+
+from .base import measure, report, setup
+
+setup()
+
+from rest_framework import serializers  # noqa: E402
+from rest_framework.exceptions import ValidationError  # noqa: E402
+
+from musa_django_utils.drf.serializers import BatchValidatedListSerializer  # noqa: E402
+from musa_django_utils.drf.validators import DependsAnotherField, NoAcceptSpace  # noqa: E402
+
+
+class LegacyDependsAnotherField(DependsAnotherField):
+    """
+        check of the previous version, a dict comprehension over the fields for each item
+    """
+
+    def __call__(self, attrs):
+        missing_items = {
+            field_name: self.message
+            for field_name in self.fields
+            if field_name not in attrs.keys()
+        }
+        if missing_items and len(missing_items.keys()) != len(self.fields):
+            raise ValidationError(missing_items, code='required')
+
+
+class AccountSerializer(serializers.Serializer):
+    username = serializers.CharField(validators=[NoAcceptSpace()])
+    email = serializers.EmailField()
+    password = serializers.CharField(required=False)
+    old_password = serializers.CharField(required=False)
+
+    class Meta:
+        validators = [DependsAnotherField(['password', 'old_password'])]
+
+
+class BatchAccountSerializer(AccountSerializer):
+
+    class Meta:
+        validators = [DependsAnotherField(['password', 'old_password'])]
+        list_serializer_class = BatchValidatedListSerializer
+
+
+def payload(items, invalid_ratio=0.0):
+    invalid = int(1 / invalid_ratio) if invalid_ratio else 0
+    data = []
+    for i in range(items):
+        item = {'username': f'user{i}', 'email': f'user{i}@example.com'}
+        if i % 2:
+            item.update(password='new', old_password='old')
+        if invalid and i % invalid == 0:
+            item['username'] = f'user {i}'
+        elif invalid and i % invalid == 1:
+            item.pop('old_password')
+        data.append(item)
+
+    return data
+
+
+def validate(serializer_class, data):
+    def run():
+        serializer = serializer_class(data=data, many=True)
+        serializer.is_valid()
+        return serializer
+
+    return run
+
+
+def check(validator, items):
+    def run():
+        for attrs in items:
+            try:
+                validator(attrs)
+            except ValidationError:
+                pass
+
+    return run
+
+
+def main(items):
+    valid, invalid = payload(items), payload(items, invalid_ratio=0.1)
+
+    per_item, batch = validate(AccountSerializer, invalid)(), validate(BatchAccountSerializer, invalid)()
+    assert [index for index, errors in enumerate(per_item.errors) if errors] == list(batch.errors)
+    assert all(per_item.errors[index] == errors for index, errors in batch.errors.items())
+
+    report(f'{items} items, valid', [
+        ('ListSerializer', measure(validate(AccountSerializer, valid), repeat=5)),
+        ('BatchValidatedListSerializer', measure(validate(BatchAccountSerializer, valid), repeat=5)),
+    ])
+    report(f'{items} items, 10% invalid', [
+        ('ListSerializer', measure(validate(AccountSerializer, invalid), repeat=5)),
+        ('BatchValidatedListSerializer', measure(validate(BatchAccountSerializer, invalid), repeat=5)),
+    ])
+
+    fields = ['password', 'old_password']
+    for title, data in (('valid', valid), ('10% invalid', invalid)):
+        report(f'DependsAnotherField of {items} items, {title}', [
+            ('dict comprehension per item', measure(check(LegacyDependsAnotherField(fields), data))),
+            ('frozenset per item', measure(check(DependsAnotherField(fields), data))),
+            ('validate_many', measure(lambda: DependsAnotherField(fields).validate_many(data))),
+        ])
+
+
+if __name__ == '__main__':
+    main(int(argv[1]) if len(argv) > 1 else 10000)
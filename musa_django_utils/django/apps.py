@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class DjangoUtilsConfig(AppConfig):
+    name = 'musa_django_utils.django'
+    label = 'musa_django_utils'
+    verbose_name = 'Musa Django Utils'
+
+    def ready(self):
+        config = getattr(settings, 'PAGINATION_CONFIG', {})
+        if 'COUNT_STRATEGY' in config:
+            # connects the signals of the strategy (`CachedCount`) in each process, not on the first count
+            import_string(config['COUNT_STRATEGY'])(**config.get('COUNT_STRATEGY_OPTIONS', {}))
@@ -0,0 +1,121 @@
+from hashlib import md5
+from json import loads
+from uuid import uuid4
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+
+
+class ExactCount:
+    """
+        default django behavior, a `COUNT(*)` of the queryset
+    """
+
+    def count(self, queryset):
+        """
+            return a tuple with the count and a flag if it is approximate
+        """
+        return queryset.count(), False
+
+
+class EstimatedCount(ExactCount):
+    """
+        postgres planner estimate, `pg_class.reltuples` for unfiltered querysets and `EXPLAIN` rows for filtered ones
+
+        estimates below the `threshold` (and all counts in other databases) fallback to the exact count
+    """
+
+    def __init__(self, threshold=10000):
+        self.threshold = threshold
+
+    def estimate(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        query = queryset.query
+        # the rows of the table, the groups of `values().annotate()` and distinct rows only have an EXPLAIN estimate
+        unfiltered = (
+            not query.where and not query.distinct and not query.combinator and not query.is_sliced
+            and query.group_by is None
+            and not any(getattr(annotation, 'contains_aggregate', False) for annotation in query.annotations.values())
+        )
+        with connection.cursor() as cursor:
+            if unfiltered:
+                # regclass parses an identifier, unquoted names are lower cased and split by the dots
+                table = connection.ops.quote_name(query.model._meta.db_table)
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+                row = cursor.fetchone()
+                # -1 means that the table has never been analyzed
+                return row[0] if row and row[0] > 0 else None
+
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+
+        plan = loads(plan) if isinstance(plan, str) else plan
+        return plan[0]['Plan']['Plan Rows']
+
+    def count(self, queryset):
+        estimate = self.estimate(queryset)
+        if estimate is None or estimate < self.threshold:
+            return super().count(queryset)
+
+        return int(estimate), True
+
+
+class CachedCount(ExactCount):
+    """
+        exact count cached by the normalized sql of the queryset
+
+        the cached values of the `models` (classes or labels) are invalidated when an instance is saved or deleted,
+        the signals are connected when the strategy is created, so it must be created at startup in every process:
+        as a view attribute, or by `PAGINATION_CONFIG` (connected by the `musa_django_utils.django` app), ex:
+
+            PAGINATION_CONFIG = {
+                'COUNT_STRATEGY': 'musa_django_utils.django.counts.CachedCount',
+                'COUNT_STRATEGY_OPTIONS': {'models': ['books.Book']},
+            }
+
+        changes not sent by signals only expire by the `timeout`: `QuerySet.update()` (and the `soft_delete` of
+        querysets, an update), `bulk_create`, `bulk_update`, raw sql, other tables used in filters, and the counts of
+        models not registered. `invalidate(model)` can be called after them
+    """
+    cache_prefix = 'musa-count'
+
+    def __init__(self, timeout=60, cache_alias='default', models=()):
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        for model in models:
+            self.connect(model)
+
+    def get_version_key(self, model):
+        return f'{self.cache_prefix}:{model._meta.label_lower}'
+
+    def invalidate(self, sender, **kwargs):
+        caches[self.cache_alias].set(self.get_version_key(sender), uuid4().hex, None)
+
+    def connect(self, model):
+        if isinstance(model, str):
+            model = apps.get_model(model)
+
+        uid = f'{self.cache_prefix}:{self.cache_alias}:{model._meta.label_lower}'
+        post_save.connect(self.invalidate, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(self.invalidate, sender=model, weak=False, dispatch_uid=uid)
+
+    def count(self, queryset):
+        cache = caches[self.cache_alias]
+
+        # ordering don't change the count, removing it normalize the sql of querysets with different orders
+        sql, params = queryset.order_by().query.sql_with_params()
+        version = cache.get(self.get_version_key(queryset.model), '')
+        key = md5(f'{queryset.db}:{version}:{sql}:{params!r}'.encode()).hexdigest()
+
+        count = cache.get(f'{self.cache_prefix}:{key}')
+        if count is None:
+            count = queryset.count()
+            cache.set(f'{self.cache_prefix}:{key}', count, self.timeout)
+
+        return count, False
@@ -1,8 +1,14 @@
+from copy import copy
+from json import loads
+
 from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.fields.jsonb import JSONField
-from django.db.models import Count, Subquery
-from django.db.models.expressions import Func
-from django.db.models.fields import IntegerField
+from django.db.models import Avg, Count, Subquery, Sum, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.expressions import Expression, Func
+from django.db.models.fields import IntegerField, TextField
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.db.models.sql.constants import LOUTER
 
 
 class NoGroupMixin:
@@ -67,14 +73,110 @@ class SubqueryArray(SubqueryLazy):
         super().__init__(*args, **kwargs)
 
 
+class OrderedSubqueryMixin:
+    """
+        apply `ordering` and `limit` to the subquery, the ordering is kept when the subquery isn't sliced (django drops
+        it when the subquery is resolved)
+    """
+
+    def __init__(self, queryset, ordering=None, limit=None, **kwargs):
+        self.ordering = tuple(ordering or ())
+        if self.ordering:
+            queryset = queryset.order_by(*self.ordering)
+        if limit:
+            queryset = queryset[:limit]
+        super().__init__(queryset, **kwargs)
+
+    def resolve_expression(self, *args, **kwargs):
+        clone = super().resolve_expression(*args, **kwargs)
+        if self.ordering and not clone.query.order_by:
+            clone.query.add_ordering(*self.ordering)
+        return clone
+
+
+class SubqueryList(OrderedSubqueryMixin, SubqueryLazy):
+    """
+        ARRAY of the single column of the subquery, with the type of the column, ex:
+        SubqueryList(Book.objects.filter(author=OuterRef('pk')).values('title'), ordering=('-created_at',), limit=5)
+    """
+    template = 'ARRAY(%(subquery)s)'
+
+    def _resolve_output_field(self):
+        return ArrayField(self.query.output_field)
+
+
+class JsonAggField(JSONField):
+    """
+        output of `json_agg`, psycopg2 already decodes the `json` type
+    """
+
+    def from_db_value(self, value, expression, connection):
+        return loads(value) if isinstance(value, str) else value
+
+
+class SubqueryJson(OrderedSubqueryMixin, SubqueryLazy):
+    """
+        JSON array with the rows of the subquery as objects (keys are the selected db columns), ex:
+        SubqueryJson(Book.objects.filter(author=OuterRef('pk')).values('id', 'title'), ordering=('-id',), limit=10)
+
+        - `function`: `jsonb_agg` (default) or `json_agg` (without the jsonb conversion, keeps the keys order)
+        - `as_text`: return the JSON text without decoding it, written as is by `RawJSONField` + `RawJSONRenderer`
+
+        an ordering by selected columns is also applied inside the aggregate
+    """
+    template = "(SELECT COALESCE(%(function)s(_json%(aggregate_ordering)s), '[]')%(cast)s FROM (%(subquery)s) _json)"
+    functions = ('json_agg', 'jsonb_agg')
+
+    def __init__(self, queryset, ordering=None, limit=None, function='jsonb_agg', as_text=False, **extra):
+        if function not in self.functions:
+            raise Exception(f'function must be one of {self.functions}')
+
+        extra['output_field'] = TextField() if as_text else JsonAggField()
+        super().__init__(queryset, ordering, limit, function=function, cast='::text' if as_text else '', **extra)
+
+    def get_column(self, name):
+        if name in self.query.annotation_select:
+            return name
+        if name in self.query.values_select and LOOKUP_SEP not in name:
+            return self.query.model._meta.get_field(name).column
+        return None
+
+    def get_aggregate_ordering(self, connection):
+        ordering = []
+        for name in self.ordering:
+            column = self.get_column(name.lstrip('-')) if isinstance(name, str) else None
+            if column is None:
+                # the aggregate uses the order of the subquery
+                return ''
+            ordering.append(f'_json.{connection.ops.quote_name(column)} {"DESC" if name.startswith("-") else "ASC"}')
+
+        return ' ORDER BY ' + ', '.join(ordering) if ordering else ''
+
+    def as_sql(self, compiler, connection, template=None, **extra_context):
+        extra_context['aggregate_ordering'] = self.get_aggregate_ordering(connection)
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+
 class ExistsMoreThan(SubqueryLazy):
-    template = '(SELECT COUNT(DISTINCT %(field)s) FROM (%(subquery)s) _count) %(operator)s %(value)s'
+    """
+        compare the number of distinct `field` of the subquery with `value`
+
+        with an integer `value` and the `>`, `>=`, `<` or `<=` operator, at most `value + 1` distinct rows are read
+        (LIMIT). other operators and values use the `COUNT(DISTINCT)` template, the value is a SQL parameter in both
+    """
+    template = '(SELECT COUNT(DISTINCT %(field)s) FROM (%(subquery)s) _count) %(operator)s %%s'
+    limit_template = (
+        '(SELECT COUNT(*) FROM (SELECT DISTINCT %(field)s FROM (%(subquery)s) _s LIMIT %%s) _count) %(operator)s %%s'
+    )
+    limit_operators = ('>', '>=', '<', '<=')
+    operators = (*limit_operators, '=', '!=', '<>')
 
     def as_sql(self, compiler, connection, template=None, **extra_context):
         if 'field' not in extra_context and 'field' not in self.extra:
-            if len(self.queryset._fields) > 1:
+            # `Subquery` keeps the query, not the queryset
+            if len(self.query.values_select) != 1:
                 raise Exception('You must provide the field name, or have a single column')
-            extra_context['field'] = self.queryset._fields[0]
+            extra_context['field'] = self.query.values_select[0]
 
         if 'operator' not in extra_context and 'operator' not in self.extra:
             extra_context['operator'] = '>'
@@ -82,7 +184,20 @@ class ExistsMoreThan(SubqueryLazy):
         if 'value' not in extra_context and 'value' not in self.extra:
             raise Exception('You must provide the value for comparison')
 
-        return super().as_sql(compiler, connection, template=template, **extra_context)
+        operator = extra_context.get('operator', self.extra.get('operator'))
+        value = extra_context.get('value', self.extra.get('value'))
+        if operator not in self.operators:
+            raise Exception(f'operator must be one of {self.operators}')
+
+        if template is not None:
+            return super().as_sql(compiler, connection, template=template, **extra_context)
+
+        if operator in self.limit_operators and type(value) is int and value >= 0:
+            sql, params = super().as_sql(compiler, connection, template=self.limit_template, **extra_context)
+            return sql, (*params, value + 1, value)
+
+        sql, params = super().as_sql(compiler, connection, **extra_context)
+        return sql, (*params, value)
 
 
 class Array(Func):
@@ -102,3 +217,136 @@ class FuncLazy(NoGroupMixin, Func):
 
 class CountLazy(NoGroupMixin, Count):
     pass
+
+
+class LateralAggregate:
+    """
+        aggregate of `annotate_lateral`, with the `min`/`max`/`default` of `SubqueryMinMaxMixin`
+    """
+    function = None
+
+    def __init__(self, field, min=None, max=None, default=0):
+        self.field = field
+        self.min = min
+        self.max = max
+        self.default = default
+
+    def get_aggregate(self):
+        return self.function(self.field)
+
+    def resolve(self, query):
+        aggregate = self.get_aggregate().resolve_expression(query)
+        output_field = aggregate.output_field
+
+        expression = Coalesce(aggregate, Value(self.default, output_field=output_field), output_field=output_field)
+        if self.min is not None:
+            expression = Greatest(expression, Value(self.min, output_field=output_field), output_field=output_field)
+        if self.max is not None:
+            expression = Least(expression, Value(self.max, output_field=output_field), output_field=output_field)
+
+        return expression
+
+
+class LateralSum(LateralAggregate):
+    function = Sum
+
+
+class LateralCount(LateralAggregate):
+
+    def get_aggregate(self):
+        return Count(self.field, distinct=True)
+
+
+class LateralAvg(LateralAggregate):
+    function = Avg
+
+
+class LateralJoin:
+    """
+        `LEFT JOIN LATERAL (subquery) alias ON TRUE` in the `alias_map` of a query
+    """
+    join_type = LOUTER
+    nullable = True
+    filtered_relation = None
+
+    def __init__(self, query, parent_alias, table_name='_lateral'):
+        self.query = query
+        self.parent_alias = parent_alias
+        self.table_name = table_name
+        self.table_alias = None
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.query)
+        return f'{self.join_type} LATERAL {sql} {compiler.quote_name_unless_alias(self.table_alias)} ON TRUE', params
+
+    def relabeled_clone(self, change_map):
+        clone = copy(self)
+        clone.query = self.query.relabeled_clone(change_map)
+        clone.parent_alias = change_map.get(self.parent_alias, self.parent_alias)
+        clone.table_alias = change_map.get(self.table_alias, self.table_alias)
+        return clone
+
+    @property
+    def identity(self):
+        return self.__class__, self.table_name, self.parent_alias, id(self.query)
+
+    def equals(self, other, *args, **kwargs):
+        # never reused by other joins
+        return False
+
+    def demote(self):
+        return self
+
+    def promote(self):
+        return self
+
+
+class LateralRef(Expression):
+    """
+        column of a `LateralJoin`
+    """
+
+    def __init__(self, alias, column, output_field):
+        super().__init__(output_field)
+        self.alias = alias
+        self.column = column
+
+    def as_sql(self, compiler, connection):
+        return f'{compiler.quote_name_unless_alias(self.alias)}.{connection.ops.quote_name(self.column)}', []
+
+    def relabeled_clone(self, change_map):
+        clone = copy(self)
+        clone.alias = change_map.get(self.alias, self.alias)
+        return clone
+
+
+def annotate_lateral(queryset, subquery, **aggregates):
+    """
+        annotate many aggregates of the same related rows, computed by one `LEFT JOIN LATERAL`, instead of one
+        correlated subquery for each `SubquerySum`/`SubqueryCount`/`SubqueryAvg`, ex:
+
+        annotate_lateral(
+            Author.objects.all(),
+            Book.objects.filter(author=OuterRef('pk')),
+            books=LateralCount('id'),
+            total=LateralSum('price', min=0),
+            avg_price=LateralAvg('price', max=100),
+        )
+
+        the aggregates (without GROUP BY) always return one row, the join doesn't change the rows of the queryset
+    """
+    queryset = queryset._chain()
+    outer_query = queryset.query
+
+    inner_query = subquery.order_by().query.chain()
+    inner_query.clear_select_clause()
+    inner_query.group_by = None
+    for name, aggregate in aggregates.items():
+        inner_query.add_annotation(aggregate.resolve(inner_query), name)
+
+    inner_query = inner_query.resolve_expression(outer_query)
+    alias = outer_query.join(LateralJoin(inner_query, outer_query.get_initial_alias()))
+
+    return queryset.annotate(**{
+        name: LateralRef(alias, name, inner_query.annotations[name].output_field) for name in aggregates
+    })
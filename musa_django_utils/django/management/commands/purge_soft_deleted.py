@@ -0,0 +1,67 @@
+from datetime import timedelta
+from time import sleep
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from ...models import SoftDeleteModel
+
+
+class Command(BaseCommand):
+    help = 'Hard deletes the rows soft deleted before `--older-than` days, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='`app_label.Model`, all `SoftDeleteModel` by default')
+        parser.add_argument('--older-than', type=int, default=30, help='days since the soft delete')
+        parser.add_argument('--batch-size', type=int, default=1000, help='rows deleted per transaction')
+        parser.add_argument('--sleep', type=float, default=0.5, help='seconds between batches')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--dry-run', action='store_true', help='only count the rows')
+
+    def get_models(self, labels):
+        if not labels:
+            models = [model for model in apps.get_models() if issubclass(model, SoftDeleteModel)]
+            return models + [model.archive_model for model in models if getattr(model, 'archive', False)]
+
+        models = []
+        for label in labels:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+            if not any(field.name == 'deleted' for field in model._meta.concrete_fields):
+                raise CommandError(f'{label} has no `deleted` field')
+            models.append(model)
+
+        return models
+
+    def handle(self, *args, **options):
+        using = options['database']
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+
+        for model in self.get_models(options['models']):
+            # `_base_manager` doesn't hide the deleted rows
+            manager = model._base_manager.db_manager(using)
+            queryset = manager.filter(deleted=True, updated_at__lt=cutoff)
+
+            if options['dry_run']:
+                self.stdout.write(f'{model._meta.label}: {queryset.count()} rows to purge')
+                continue
+
+            purged = 0
+            while True:
+                pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+                if not pks:
+                    break
+
+                with transaction.atomic(using=using):
+                    manager.filter(pk__in=pks).delete()
+                purged += len(pks)
+
+                if len(pks) < options['batch_size']:
+                    break
+                sleep(options['sleep'])
+
+            self.stdout.write(f'{model._meta.label}: {purged} rows purged')
@@ -1,20 +1,281 @@
-from django.db.models import Model, QuerySet
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import CASCADE, DO_NOTHING, Index, Manager, Model, Q, QuerySet
 from django.db.models.fields import BooleanField, DateTimeField
+from django.db.models.signals import class_prepared
+from django.dispatch import receiver
 from django.utils import timezone
 
 
-class BaseDeletedQueryset(QuerySet):
+def soft_delete_values(model, deleted, now):
+    values = {'deleted': deleted}
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        values['updated_at'] = now
+    return values
 
-    def all(self):
-        return self.filter(deleted=False)
+
+def unvisited_pks(model, pks, visited):
+    """
+        the primary keys of `pks` not seen yet for `model`, marked as seen (protects the walks of self referencing or
+        cyclic relations)
+    """
+    if isinstance(pks, QuerySet):
+        pks = pks.values_list('pk', flat=True)
+
+    seen = visited.setdefault(model, set())
+    pks = [pk for pk in pks if pk not in seen]
+    seen.update(pks)
+    return pks
+
+
+def cascade_soft_delete(model, pks, deleted=True, now=None):
+    """
+        set `deleted` in the rows related by `CASCADE` foreign keys (recursively) to the rows of `pks` (a list or a
+        `values('pk')` queryset), with one `UPDATE` per related model and level instead of walking the instances
+
+        related models without a `deleted` field are skipped, the walk stops at the levels without rows and at the rows
+        already visited (trees and cycles of self referencing models)
+    """
+    now = now or timezone.now()
+    visited = {}
+    levels = [(model, pks)]
+    while levels:
+        model, pks = levels.pop()
+        pks = unvisited_pks(model, pks, visited)
+        if not pks:
+            continue
+
+        for relation in model._meta.related_objects:
+            related_model = relation.related_model
+            if relation.many_to_many or relation.on_delete is not CASCADE:
+                continue
+            if not any(field.name == 'deleted' for field in related_model._meta.concrete_fields):
+                continue
+
+            related = related_model._base_manager.filter(**{f'{relation.field.name}__in': pks, 'deleted': not deleted})
+            related_pks = list(related.values_list('pk', flat=True))
+            if related_pks:
+                related_model._base_manager.filter(pk__in=related_pks).update(
+                    **soft_delete_values(related_model, deleted, now)
+                )
+                levels.append((related_model, related_pks))
+
+
+def move_rows(source, target, pks, using=DEFAULT_DB_ALIAS, **values):
+    """
+        copy the rows of `pks` from the table of `source` to the table of `target` with one `INSERT ... SELECT` (the
+        columns of `target`, `values` overwrite columns by field name) and delete them from `source`
+
+        the rows are deleted with a raw `DELETE`, without the `on_delete` of the foreign keys and the delete signals
+        (the related rows are moved by `archive_rows`). return the number of moved rows
+    """
+    pks = list(pks)
+    if not pks:
+        return 0
+
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    source_columns = {field.attname: field.column for field in source._meta.concrete_fields}
+    columns, selects, params = [], [], []
+    for field in target._meta.concrete_fields:
+        columns.append(qn(field.column))
+        if field.name in values:
+            selects.append('%s')
+            params.append(field.get_db_prep_save(values[field.name], connection))
+        else:
+            selects.append(qn(source_columns[field.attname]))
+
+    pk_field = source._meta.pk
+    where = '{} IN ({})'.format(qn(pk_field.column), ', '.join(['%s'] * len(pks)))
+    pk_params = [pk_field.get_db_prep_value(pk, connection) for pk in pks]
+    sql = 'INSERT INTO {} ({}) SELECT {} FROM {} WHERE {}'.format(
+        qn(target._meta.db_table), ', '.join(columns), ', '.join(selects), qn(source._meta.db_table), where,
+    )
+
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + pk_params)
+            moved = cursor.rowcount
+            cursor.execute('DELETE FROM {} WHERE {}'.format(qn(source._meta.db_table), where), pk_params)
+
+    return moved
+
+
+def archive_relations(model):
+    """
+        relations to the rows of the archived `model`, the `CASCADE` foreign keys of archived models
+
+        other relations would lose the related rows (or their references) when the rows are archived and raise an
+        exception, except `DO_NOTHING` foreign keys and the foreign keys of archive tables
+    """
+    relations = []
+    for relation in model._meta.get_fields(include_hidden=True):
+        if not relation.auto_created or relation.concrete or relation.many_to_many:
+            continue
+
+        related_model = relation.related_model
+        if relation.on_delete is DO_NOTHING or hasattr(related_model, 'live_model'):
+            continue
+        if relation.on_delete is not CASCADE or not getattr(related_model, 'archive', False):
+            raise Exception(
+                f'`{model.__name__}` rows can not be archived, they are referenced by '
+                f'`{related_model.__name__}.{relation.field.name}`, only `CASCADE` foreign keys of models with '
+                f'`archive = True` (or `DO_NOTHING` foreign keys) are supported'
+            )
+        relations.append(relation)
+
+    return relations
+
+
+def archive_rows(model, pks, using=DEFAULT_DB_ALIAS, restore=False):
+    """
+        move the rows of `pks` to the archive table of `model` (or back from it with `restore`), with the rows related
+        by `CASCADE` foreign keys of archived models (recursively), in one transaction
+
+        return the number of moved rows of `model`
+    """
+    now = timezone.now()
+    visited = {}
+    moved = []
+    levels = [(model, pks)]
+    with transaction.atomic(using=using):
+        while levels:
+            level_model, level_pks = levels.pop()
+            level_pks = unvisited_pks(level_model, level_pks, visited)
+            if not level_pks:
+                continue
+
+            relations = archive_relations(level_model)
+            source, target = level_model, level_model.archive_model
+            if restore:
+                source, target = target, source
+            values = soft_delete_values(level_model, not restore, now)
+            moved.append(move_rows(source, target, level_pks, using, **values))
+
+            for relation in relations:
+                related_model = relation.related_model
+                related = (related_model.archive_model if restore else related_model)._base_manager.db_manager(using)
+                related_pks = related.filter(**{f'{relation.field.name}__in': level_pks}).values_list('pk', flat=True)
+                levels.append((related_model, list(related_pks)))
+
+    return moved[0] if moved else 0
+
+
+class SoftDeleteQuerySet(QuerySet):
+    """
+        bulk soft delete/restore, without the `deleted=False` predicate (applied by the manager)
+    """
 
     def delete(self):
-        self.update(deleted=True, updated_at=timezone.now())
+        return self.soft_delete()
+
+    def pk_chunks(self, chunk_size):
+        """
+            yield lists of primary keys of the queryset, paginated by primary key
+        """
+        queryset = self.order_by('pk').values_list('pk', flat=True)
+        last_pk = None
+        while True:
+            chunk = list((queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset)[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1]
+
+    def _set_deleted(self, deleted, chunk_size=None, cascade=False):
+        now = timezone.now()
+        values = soft_delete_values(self.model, deleted, now)
+
+        if deleted and getattr(self.model, 'archive', False):
+            return sum(archive_rows(self.model, pks, self.db) for pks in self.pk_chunks(chunk_size or 1000))
+
+        if not chunk_size:
+            with transaction.atomic(using=self.db):
+                if cascade:
+                    cascade_soft_delete(self.model, self.values('pk'), deleted, now)
+                return QuerySet.update(self, **values)
+
+        total = 0
+        base_manager = self.model._base_manager.db_manager(self.db)
+        for pks in self.pk_chunks(chunk_size):
+            with transaction.atomic(using=self.db):
+                if cascade:
+                    cascade_soft_delete(self.model, pks, deleted, now)
+                total += base_manager.filter(pk__in=pks).update(**values)
+
+        return total
+
+    def soft_delete(self, chunk_size=None, cascade=False):
+        """
+            update only `deleted`/`updated_at`, in chunks of `chunk_size` rows (one transaction per chunk), return
+            the number of updated rows. `cascade` soft deletes the rows related by `CASCADE` foreign keys
+
+            models with `archive = True` move the rows to the archive table instead (in chunks of 1000 rows by
+            default), always with the rows of archived models related by `CASCADE` (see `archive_rows`)
+        """
+        return self._set_deleted(True, chunk_size, cascade)
+
+    def restore(self, chunk_size=None, cascade=False):
+        """
+            same of `soft_delete`, but restore the rows (`cascade` restore all deleted related rows)
+        """
+        return self._set_deleted(False, chunk_size, cascade)
+
+    def hard_delete(self):
+        return QuerySet.delete(self)
+
+
+class BaseDeletedQueryset(SoftDeleteQuerySet):
+    """
+        queryset of soft deleted models, `filter` and `all` return only not deleted rows
+
+        use `Model.objects.with_deleted()` (before other filters) to query deleted rows, ex:
+        `Model.objects.with_deleted().filter(deleted=True, ...).restore()`
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._include_deleted = False
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._include_deleted = self._include_deleted
+        return clone
+
+    def all(self):
+        return self.filter(deleted=False) if not self._include_deleted else super().all()
 
     def filter(self, *args, **kwargs):
-        kwargs['deleted'] = False
+        if not self._include_deleted:
+            kwargs['deleted'] = False
         return super().filter(*args, **kwargs)
 
+    def with_deleted(self):
+        clone = self._chain()
+        clone._include_deleted = True
+        return clone
+
+
+class ArchiveQuerySet(QuerySet):
+
+    def restore(self, chunk_size=1000):
+        """
+            move the rows back to the table of the live model, with the archived rows related by `CASCADE`
+        """
+        live_model = self.model.live_model
+        return sum(
+            archive_rows(live_model, pks, self.db, restore=True)
+            for pks in SoftDeleteQuerySet.pk_chunks(self, chunk_size)
+        )
+
+
+class LiveManager(Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+        manager of the not deleted rows, the predicate is added once by `get_queryset`
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted=False)
+
 
 class BaseEnabledQueryset(QuerySet):
 
@@ -34,12 +295,99 @@ class SoftDeleteModel(Model):
     objects = BaseDeletedQueryset.as_manager()
 
     def delete(self, *args, **kwargs):
-        if 'hard_delete' in kwargs:
-            super().delete(*args, **kwargs)
+        if kwargs.pop('hard_delete', False):
+            return super().delete(*args, **kwargs)
 
-        self.deleted = True
+        self._set_deleted(True, kwargs.pop('cascade', False))
+
+    def restore(self, cascade=False):
+        self._set_deleted(False, cascade)
+
+    def _set_deleted(self, deleted, cascade):
+        self.deleted = deleted
         self.updated_at = timezone.now()
-        self.save()
+        with transaction.atomic(using=self._state.db):
+            if cascade:
+                cascade_soft_delete(type(self), [self.pk], deleted, self.updated_at)
+            self.save(update_fields=['deleted', 'updated_at'])
 
     class Meta:
         abstract = True
+
+
+class LiveSoftDeleteModel(SoftDeleteModel):
+    """
+        soft delete model with partial indexes of the live rows
+
+        - `live_index_fields`: field names (or tuples of field names) indexed with `WHERE NOT deleted`, smaller than
+          full indexes on tables with many deleted rows
+        - `objects` returns the live rows (`deleted=False` added once), `all_objects` all rows
+        - `archive = True` moves the deleted rows to the sibling model `<Model>Archive` (table `<table>_archive`), the
+          hot table only has live rows, `<Model>Archive.objects.filter(...).restore()` moves them back. the models with
+          `CASCADE` foreign keys to an archived model must be archived too, their rows are moved with the parent rows
+    """
+    deleted = BooleanField(default=False)
+
+    objects = LiveManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    live_index_fields = ()
+    archive = False
+
+    def _set_deleted(self, deleted, cascade):
+        if not deleted or not self.archive:
+            return super()._set_deleted(deleted, cascade)
+
+        self.deleted = deleted
+        self.updated_at = timezone.now()
+        archive_rows(type(self), [self.pk], self._state.db or DEFAULT_DB_ALIAS)
+
+    class Meta:
+        abstract = True
+
+
+def live_index(model, fields):
+    index = Index(fields=list(fields), name='live', condition=Q(deleted=False))
+    # same name of django generated indexes, with the `liv` suffix
+    index.suffix = 'liv'
+    index.set_name_with_model(model)
+    return index
+
+
+def create_archive_model(model):
+    attrs = {
+        '__module__': model.__module__,
+        'Meta': type('Meta', (), {'app_label': model._meta.app_label, 'db_table': f'{model._meta.db_table}_archive'}),
+        'objects': ArchiveQuerySet.as_manager(),
+        'live_model': model,
+    }
+    for field in model._meta.concrete_fields:
+        if field.is_relation:
+            # the swappable lookup of `deconstruct` needs the app registry ready, `to` is kept as the model label
+            swappable, field.swappable = field.swappable, False
+            try:
+                name, path, args, kwargs = field.deconstruct()
+            finally:
+                field.swappable = swappable
+        else:
+            name, path, args, kwargs = field.deconstruct()
+        # deleted rows can repeat unique values, and reference deleted rows
+        if kwargs.pop('unique', False):
+            kwargs['db_index'] = True
+        if field.is_relation:
+            kwargs.update(related_name='+', db_constraint=False)
+        attrs[name] = field.__class__(*args, **kwargs)
+
+    return type(f'{model.__name__}Archive', (Model,), attrs)
+
+
+@receiver(class_prepared)
+def prepare_live_model(sender, **kwargs):
+    if not issubclass(sender, LiveSoftDeleteModel):
+        return
+
+    for fields in sender.live_index_fields:
+        sender._meta.indexes.append(live_index(sender, (fields,) if isinstance(fields, str) else fields))
+
+    if sender.archive:
+        sender.archive_model = create_archive_model(sender)
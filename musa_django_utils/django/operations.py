@@ -0,0 +1,66 @@
+from hashlib import md5
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db.migrations import AddIndex, RemoveIndex, RunPython
+
+from .models import move_rows
+
+
+def concurrently(*operations):
+    """
+        replace the `AddIndex`/`RemoveIndex` of `operations` (ex: the partial indexes of `LiveSoftDeleteModel`
+        generated by `makemigrations`) by `AddIndexConcurrently`/`RemoveIndexConcurrently`, that don't lock the
+        table writes on postgres. the migration must have `atomic = False`
+    """
+    replaced = []
+    for operation in operations:
+        if type(operation) is AddIndex:
+            operation = AddIndexConcurrently(operation.model_name, operation.index)
+        elif type(operation) is RemoveIndex:
+            operation = RemoveIndexConcurrently(operation.model_name, operation.name)
+        replaced.append(operation)
+
+    return replaced
+
+
+def gin_index(model_name, *fields, name=None, opclasses=()):
+    """
+        `AddIndex` of a GIN index of the array (or jsonb) `fields`, used by the `contains`, `overlap` and
+        `contained_by` lookups (ex: the filters of `ArrayMixin`), ex:
+
+        operations = concurrently(gin_index('book', 'tags'))
+    """
+    if name is None:
+        # same limit of 30 chars of the names generated by django
+        columns = '_'.join(fields)
+        suffix = md5(f'{model_name}:{columns}'.encode()).hexdigest()[:5]
+        name = f'{model_name.lower()[:10]}_{columns[:9]}_{suffix}_gin'
+
+    return AddIndex(model_name.lower(), GinIndex(fields=list(fields), name=name, opclasses=list(opclasses)))
+
+
+def archive_soft_deleted(model, archive_model=None, batch_size=1000):
+    """
+        `RunPython` moving the deleted rows of `model` (`app_label.Model`) to the archive model (by default
+        `app_label.ModelArchive`), in batches, used when `archive = True` is enabled in a model with deleted rows.
+        the reverse operation moves them back. the rows are deleted without the `on_delete` of the foreign keys, move
+        the deleted rows of the models referencing `model` first
+    """
+    archive_model = archive_model or f'{model}Archive'
+
+    def move(apps, schema_editor, source, target, deleted):
+        source, target = apps.get_model(source), apps.get_model(target)
+        using = schema_editor.connection.alias
+        queryset = source._base_manager.db_manager(using).filter(deleted=deleted).order_by('pk')
+        while True:
+            pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            move_rows(source, target, pks, using)
+
+    return RunPython(
+        lambda apps, schema_editor: move(apps, schema_editor, model, archive_model, True),
+        lambda apps, schema_editor: move(apps, schema_editor, archive_model, model, True),
+        elidable=True,
+    )
@@ -0,0 +1,221 @@
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from logging import getLogger
+from random import random
+from re import compile as re_compile
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+logger = getLogger('queries')
+
+DEFAULT_CONFIG = {
+    'ENABLED': True,
+    # X-Query-* response headers
+    'HEADERS': True,
+    # rate of the requests logged with the query stats, requests with a N+1 or over the budget are always logged
+    'LOG_SAMPLE_RATE': 0.0,
+    # max queries per request, overridden by the `query_budget` of the views
+    'BUDGET': None,
+    # `log` or `raise` (ex: in the tests settings) when a request exceeds the budget
+    'BUDGET_ACTION': 'log',
+    # executions of the same SQL with different parameters reported as N+1
+    'N_PLUS_ONE_THRESHOLD': 5,
+    # database aliases, all by default
+    'DATABASES': None,
+}
+
+_strings = re_compile(r"'(?:[^']|'')*'")
+_numbers = re_compile(r'\b\d+(?:\.\d+)?\b')
+_lists = re_compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_spaces = re_compile(r'\s+')
+
+
+def get_config(key):
+    return getattr(settings, 'QUERY_INSTRUMENTATION', {}).get(key, DEFAULT_CONFIG[key])
+
+
+def normalize_sql(sql):
+    """
+        shape of the SQL, without literals and with the `IN (%s, ...)` lists of any size collapsed
+    """
+    sql = _numbers.sub('%s', _strings.sub('%s', sql))
+    return _spaces.sub(' ', _lists.sub('(%s...)', sql)).strip()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder:
+    """
+        records the queries executed by the current thread while active, ex:
+
+        with QueryRecorder() as recorder:
+            ...
+        recorder.count, recorder.duration_ms, recorder.n_plus_one()
+    """
+
+    def __init__(self, using=None):
+        self.using = using
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, params, (perf_counter() - start) * 1000))
+
+    def __enter__(self):
+        aliases = self.using or get_config('DATABASES') or connections
+        if isinstance(aliases, str):
+            aliases = [aliases]
+
+        self._stack = ExitStack()
+        for alias in aliases:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration_ms(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    @property
+    def duplicates(self):
+        """
+            queries repeated with the same SQL and parameters
+        """
+        executions = Counter((sql, repr(params)) for sql, params, _ in self.queries)
+        return sum(count - 1 for count in executions.values())
+
+    def n_plus_one(self, threshold=None):
+        """
+            list of (normalized SQL, executions) of the SQL executed at least `threshold` times with different
+            parameters
+        """
+        threshold = threshold or get_config('N_PLUS_ONE_THRESHOLD')
+        shapes = defaultdict(set)
+        for sql, params, _ in self.queries:
+            shapes[normalize_sql(sql)].add(repr(params))
+
+        return [(sql, len(params)) for sql, params in shapes.items() if len(params) >= threshold]
+
+    def summary(self):
+        return {
+            'queries': self.count,
+            'duplicates': self.duplicates,
+            'duration_ms': round(self.duration_ms, 3),
+            'n_plus_one': self.n_plus_one(),
+        }
+
+
+def report_queries(request, response, recorder, budget=None):
+    """
+        add the X-Query-* headers, log the stats (sampled) and check the budget of the request
+    """
+    summary = recorder.summary()
+    label = f'{request.method} {request.path}'
+    budget = budget if budget is not None else get_config('BUDGET')
+    exceeded = budget is not None and summary['queries'] > budget
+
+    if get_config('HEADERS'):
+        response['X-Query-Count'] = str(summary['queries'])
+        response['X-Query-Duplicates'] = str(summary['duplicates'])
+        response['X-Query-Time-Ms'] = f"{summary['duration_ms']:.3f}"
+        response['X-Query-N-Plus-One'] = str(len(summary['n_plus_one']))
+
+    if summary['n_plus_one'] or exceeded:
+        logger.warning('Queries of %s: %s', label, summary, extra={'query_stats': summary, 'query_budget': budget})
+    elif random() < get_config('LOG_SAMPLE_RATE'):
+        logger.info('Queries of %s: %s', label, summary, extra={'query_stats': summary, 'query_budget': budget})
+
+    if exceeded and get_config('BUDGET_ACTION') == 'raise':
+        raise QueryBudgetExceeded(f'{label} executed {summary["queries"]} queries, the budget is {budget}')
+
+    return response
+
+
+class QueryBudgetMiddleware:
+    """
+        records the queries of each request, see `QUERY_INSTRUMENTATION` (`DEFAULT_CONFIG`), the budget of a view is
+        its `query_budget` attribute
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_config('ENABLED'):
+            return self.get_response(request)
+
+        with QueryRecorder() as recorder:
+            request.query_recorder = recorder
+            response = self.get_response(request)
+
+        return report_queries(request, response, recorder, getattr(request, 'query_budget', None))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None) or view_func
+        request.query_budget = getattr(view, 'query_budget', None)
+
+
+class QueryBudgetMixin:
+    """
+        `query_budget` of a view, the queries are recorded by the view when `QueryBudgetMiddleware` isn't installed
+    """
+    query_budget = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if getattr(request, 'query_recorder', None) is not None or not get_config('ENABLED'):
+            return super().dispatch(request, *args, **kwargs)
+
+        with QueryRecorder() as recorder:
+            request.query_recorder = recorder
+            response = super().dispatch(request, *args, **kwargs)
+
+        return report_queries(request, response, recorder, self.query_budget)
+
+
+def format_queries(queries):
+    return '\n'.join(f'{index}. {sql} {params!r}' for index, (sql, params, _) in enumerate(queries, 1))
+
+
+@contextmanager
+def assert_max_queries(max_queries, using=None):
+    """
+        fail when the block executes more than `max_queries` queries, ex:
+
+        with assert_max_queries(3):
+            client.get('/books/')
+    """
+    with QueryRecorder(using) as recorder:
+        yield recorder
+
+    if recorder.count > max_queries:
+        raise AssertionError(
+            f'{recorder.count} queries executed, expected at most {max_queries}:\n{format_queries(recorder.queries)}'
+        )
+
+
+@contextmanager
+def assert_no_n_plus_one(threshold=None, using=None):
+    """
+        fail when the block executes the same SQL at least `threshold` times with different parameters
+    """
+    with QueryRecorder(using) as recorder:
+        yield recorder
+
+    repeated = recorder.n_plus_one(threshold)
+    if repeated:
+        details = '\n'.join(f'{count}x {sql}' for sql, count in repeated)
+        raise AssertionError(f'N+1 queries detected:\n{details}')
@@ -1,12 +1,41 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.constants import LOOKUP_SEP
+
 from django_filters.filters import ChoiceFilter, MultipleChoiceFilter
 
 
 class ArrayMixin:
+    """
+        Filter of an `ArrayField` by the chosen values, the `lookup_expr` is the mode:
+
+        - `contains` (default): arrays with all the values, `@>`
+        - `overlap`: arrays with any of the values, `&&`
+        - `contained_by`: arrays with only the values, `<@`
+
+        all of them can use a GIN index of the column (see `django.operations.gin_index`). `distinct` is only applied
+        when the lookup crosses a many-valued relation, a lookup on a column of the model never duplicates rows
+    """
 
     def __init__(self, *args, **kwargs):
         kwargs.setdefault('lookup_expr', 'contains')
         super().__init__(*args, **kwargs)
 
+    def needs_distinct(self, model):
+        opts = model._meta
+        for name in self.field_name.split(LOOKUP_SEP)[:-1]:
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                return True
+
+            if field.many_to_many or field.one_to_many:
+                return True
+            if field.related_model is None:
+                return False
+            opts = field.related_model._meta
+
+        return False
+
     def filter(self, qs, value):
         if not value:  # Even though not a noop, no point filtering if empty.
             return qs
@@ -16,7 +45,7 @@ class ArrayMixin:
 
         value = value if isinstance(value, list) else [value]
         qs = self.get_method(qs)(**self.get_filter_predicate(value))
-        return qs.distinct() if self.distinct else qs
+        return qs.distinct() if self.distinct and self.needs_distinct(qs.model) else qs
 
 
 class ArrayChoiceFilter(ArrayMixin, ChoiceFilter):
@@ -1,2 +1,34 @@
-from .jwt import *  # noqa
-from .old_django import *  # noqa
+from importlib import import_module
+
+# the authenticators are imported on first use (PEP 562), importing the package doesn't load `jwt` (and
+# `cryptography`) or read the settings
+_attributes = {
+    'MultiProviderMixin': 'base',
+    'ProviderDispatchAuthentication': 'dispatch',
+    'JwksCache': 'jwks',
+    'JwtAuthentication': 'jwt',
+    'BaseDecodeToken': 'old_django',
+    'OldDjangoCookieSessionAuthentication': 'old_django',
+}
+
+__all__ = list(_attributes)
+
+# the package used to star import these modules (the last one wins), the other public names of them (ex: the
+# drf-spectacular extensions) are still found, importing the modules
+_star_modules = ('old_django', 'jwt', 'dispatch')
+
+
+def __getattr__(name):
+    module = _attributes.get(name)
+    if module is None and not name.startswith('_'):
+        module = next((star for star in _star_modules if hasattr(import_module(f'.{star}', __name__), name)), None)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_attributes})
@@ -1,8 +1,40 @@
+from copy import copy
+from time import time
+
 from django.conf import settings
+from django.core.cache import caches
+
+from ...utils.cache import get_lru_cache
+
+
+class LazySetting:
+    """
+        class attribute read from the settings on each access, the class can be created before the settings are
+        configured, ex: `authentication_field = LazySetting('SESSION_COOKIE_NAME')`
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        return getattr(settings, self.name)
 
 
 class MultiProviderMixin:
+    """
+        Base of authenticators configured by `settings.AUTH_CONFIG[config_name]`
+
+        users resolved by `get_user` can be cached by identity (token `sub` or session `_auth_user_id`), options:
+
+        - `USER_CACHE_TTL`: seconds to keep an user, limited by the token `exp` (default: 0, disabled)
+        - `USER_CACHE_SIZE`: size of the local LRU of users (default: 1024)
+        - `USER_CACHE_ALIAS`: django cache shared by the workers (default: None)
+        - `USER_CACHE_LOCAL_TTL`: max seconds in the local LRU when using a shared cache, local entries are not
+          removed by `invalidate_user` of other workers (default: 30)
+    """
     config_name = None
+    routed = False
+    user_cache_prefix = 'musa-auth-user'
     provider_header = 'Authorization-Provider'
     authentication_in = 'headers'
     authentication_field = 'Authorization'
@@ -25,6 +57,9 @@ class MultiProviderMixin:
         return self.config.get(key, default)
 
     def validate_provider(self, request):
+        if self.routed:  # provider already validated by `ProviderDispatchAuthentication`
+            return True
+
         provider_value = self.get_config('PROVIDER_HEADER_VALUE')
         if provider_value:
             provider = self.get_config('PROVIDER_HEADER', self.provider_header)
@@ -36,3 +71,59 @@ class MultiProviderMixin:
         find_in = self.get_config('AUTHENTICATION_IN', self.authentication_in)
         field_name = self.get_config('AUTHENTICATION_FIELD', self.authentication_field)
         return getattr(request, find_in, {}).get(field_name, '')
+
+    def get_user_cache_identity(self, data):
+        return data.get('sub') or data.get('_auth_user_id')
+
+    def get_user_cache_key(self, identity):
+        return f'{self.user_cache_prefix}:{self.config_name}:{identity}'
+
+    def get_user_caches(self):
+        local = get_lru_cache(f'{self.user_cache_prefix}:{self.config_name}', self.get_config('USER_CACHE_SIZE', 1024))
+        alias = self.get_config('USER_CACHE_ALIAS')
+        return local, caches[alias] if alias else None
+
+    def resolve_user(self, request, data):
+        """
+            `get_user` with the cache of users, returns a copy of the cached user
+        """
+        timeout = self.get_config('USER_CACHE_TTL', 0)
+        identity = self.get_user_cache_identity(data) if timeout else None
+        if identity is None:
+            return self.get_user(request, data)
+
+        if 'exp' in data:
+            timeout = min(timeout, data['exp'] - time())
+
+        key = self.get_user_cache_key(identity)
+        local, shared = self.get_user_caches()
+        local_timeout = min(timeout, self.get_config('USER_CACHE_LOCAL_TTL', 30)) if shared else timeout
+
+        user = local.get(key)
+        if user is None and shared is not None:
+            user = shared.get(key)
+            if user is not None:
+                local.set(key, user, local_timeout)
+
+        if user is None:
+            user = self.get_user(request, data)
+            if user is None:
+                return user
+
+            local.set(key, user, local_timeout)
+            if shared is not None and timeout > 0:
+                shared.set(key, user, timeout)
+
+        return copy(user)
+
+    @classmethod
+    def invalidate_user(cls, identity):
+        """
+            remove an user from the caches, ex: in a `post_save` receiver of the user model
+        """
+        authenticator = cls()
+        key = authenticator.get_user_cache_key(identity)
+        local, shared = authenticator.get_user_caches()
+        local.delete(key)
+        if shared is not None:
+            shared.delete(key)
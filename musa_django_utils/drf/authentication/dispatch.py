@@ -0,0 +1,120 @@
+from threading import Lock
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from asgiref.sync import sync_to_async
+from rest_framework.authentication import BaseAuthentication
+
+_routings = {}
+_routings_lock = Lock()
+
+
+class ProviderDispatchAuthentication(BaseAuthentication):
+    """
+        Route each request to one `MultiProviderMixin` authenticator by the provider header value
+
+        replaces many authenticators in `DEFAULT_AUTHENTICATION_CLASSES`, the authenticators of
+        `authentication_classes` (or of the setting `AUTH_DISPATCH_CLASSES`) are created once per process, with the
+        config already mounted, in an immutable routing table of provider header value => authenticator.
+        authenticators without `PROVIDER_HEADER_VALUE` are fallbacks, tried in order when the routed one returns None
+
+        the table is built by the first request, call `get_routing()` in an `AppConfig.ready` to build it at startup.
+        `aauthenticate` uses the `aauthenticate` of the authenticators, or runs their `authenticate` in a thread
+    """
+    authentication_classes = None
+
+    @classmethod
+    def get_authentication_classes(cls):
+        classes = cls.authentication_classes
+        if classes is None:
+            classes = getattr(settings, 'AUTH_DISPATCH_CLASSES', [])
+
+        return [import_string(auth_class) if isinstance(auth_class, str) else auth_class for auth_class in classes]
+
+    @classmethod
+    def build_routing(cls):
+        routes, fallbacks = {}, []
+        for auth_class in cls.get_authentication_classes():
+            authenticator = auth_class()
+            authenticator.routed = True
+
+            provider_value = authenticator.get_config('PROVIDER_HEADER_VALUE')
+            if provider_value:
+                header = authenticator.get_config('PROVIDER_HEADER', authenticator.provider_header)
+                routes.setdefault(header, {}).setdefault(provider_value, authenticator)
+            else:
+                fallbacks.append(authenticator)
+
+        routes = MappingProxyType({header: MappingProxyType(values) for header, values in routes.items()})
+        return routes, tuple(fallbacks)
+
+    @classmethod
+    def get_routing(cls):
+        routing = _routings.get(cls)
+        if routing is None:
+            with _routings_lock:
+                routing = _routings.get(cls) or _routings.setdefault(cls, cls.build_routing())
+
+        return routing
+
+    def authenticate(self, request):
+        routes, fallbacks = self.get_routing()
+
+        for header, authenticators in routes.items():
+            authenticator = authenticators.get(request.headers.get(header))
+            if authenticator is not None:
+                result = authenticator.authenticate(request)
+                if result is not None:
+                    return result
+                break
+
+        for authenticator in fallbacks:
+            result = authenticator.authenticate(request)
+            if result is not None:
+                return result
+
+        return None
+
+    async def aauthenticate(self, request):
+        routes, fallbacks = self.get_routing()
+
+        for header, authenticators in routes.items():
+            authenticator = authenticators.get(request.headers.get(header))
+            if authenticator is not None:
+                result = await self.run_authenticator(authenticator, request)
+                if result is not None:
+                    return result
+                break
+
+        for authenticator in fallbacks:
+            result = await self.run_authenticator(authenticator, request)
+            if result is not None:
+                return result
+
+        return None
+
+    @staticmethod
+    async def run_authenticator(authenticator, request):
+        if hasattr(authenticator, 'aauthenticate'):
+            return await authenticator.aauthenticate(request)
+
+        return await sync_to_async(authenticator.authenticate)(request)
+
+    def authenticate_header(self, request):
+        routes, fallbacks = self.get_routing()
+        for authenticator in (*[auth for values in routes.values() for auth in values.values()], *fallbacks):
+            header = authenticator.authenticate_header(request)
+            if header:
+                return header
+
+        return None
+
+
+@receiver(setting_changed)
+def reset_routing(setting, **kwargs):
+    if setting in ('AUTH_CONFIG', 'AUTH_DISPATCH_CLASSES'):
+        _routings.clear()
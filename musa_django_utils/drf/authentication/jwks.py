@@ -0,0 +1,194 @@
+from asyncio import Lock as AsyncLock, get_running_loop
+from hashlib import md5
+from logging import getLogger
+from threading import Lock, Thread
+from time import time
+from weakref import WeakKeyDictionary
+
+from django.core.cache import caches
+
+from asgiref.sync import sync_to_async
+
+from .utils import afetch_well_know_keys, fetch_well_know_keys
+
+logger = getLogger('jwks')
+
+
+class JwksCache:
+    """
+        Process wide cache of a JWKS, with the keys indexed by `kid`
+
+        - keys expire by the `Cache-Control` max-age of the JWKS response, or by the `ttl`
+        - an unknown `kid` forces a refresh (single flight), limited to one each `min_refresh_interval` seconds to
+          protect the provider against floods of tokens with random `kid`
+        - with `background_refresh` expired keys are served while a thread refreshes them
+        - with `cache_alias` the keys are shared by the workers through the django cache
+
+        `public_keys` keeps the parsed keys by `kid`, with the JWK used to parse it (replaced keys are parsed again)
+
+        `aget_key` is the `get_key` of the event loop, fetching the keys with the shared async client
+    """
+    _instances = {}
+    _instances_lock = Lock()
+    cache_prefix = 'musa-jwks'
+
+    def __init__(self, jwk_url=None, keys=None, ttl=3600, min_refresh_interval=30, background_refresh=False,
+                 cache_alias=None):
+        self.jwk_url = jwk_url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.background_refresh = background_refresh
+        self.cache_alias = cache_alias
+
+        self.keys = self.index(keys or [])
+        self.public_keys = {}
+        self.expires_at = float('inf') if jwk_url is None else 0
+        self.fetched_at = float('-inf')
+        self.lock = Lock()
+        # an `asyncio.Lock` belongs to one event loop
+        self.async_locks = WeakKeyDictionary()
+        self.refreshing = False
+
+    @classmethod
+    def get_instance(cls, name, **kwargs):
+        """
+            return the cache registered with `name`, the first call creates it with the `kwargs`
+        """
+        instance = cls._instances.get(name)
+        if instance is None:
+            with cls._instances_lock:
+                instance = cls._instances.setdefault(name, cls(**kwargs))
+
+        return instance
+
+    @staticmethod
+    def index(keys):
+        return {key['kid']: key for key in keys}
+
+    @property
+    def cache_key(self):
+        return f'{self.cache_prefix}:{md5(self.jwk_url.encode()).hexdigest()}'
+
+    def get_key(self, kid):
+        if self.expires_at <= time():
+            self.expired()
+
+        key = self.keys.get(kid)
+        if key is None and self.jwk_url and self.fetched_at + self.min_refresh_interval <= time():
+            self.refresh(kid)
+            key = self.keys.get(kid)
+
+        return key
+
+    def expired(self):
+        if not self.background_refresh or not self.keys:
+            return self.refresh()
+
+        self.refresh_in_background()
+
+    def refresh_in_background(self, blocking=True):
+        # the event loop doesn't wait the lock, held by the refresh in progress
+        if not self.lock.acquire(blocking):
+            return
+        try:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        finally:
+            self.lock.release()
+
+        Thread(target=self.refresh, name='jwks-refresh', daemon=True).start()
+
+    async def aget_key(self, kid):
+        if self.expires_at <= time():
+            if self.background_refresh and self.keys:
+                self.refresh_in_background(blocking=False)
+            else:
+                await self.arefresh()
+
+        key = self.keys.get(kid)
+        if key is None and self.jwk_url and self.fetched_at + self.min_refresh_interval <= time():
+            await self.arefresh(kid)
+            key = self.keys.get(kid)
+
+        return key
+
+    def must_refresh(self, kid=None):
+        if kid is None:
+            return self.expires_at <= time()
+
+        return kid not in self.keys and self.fetched_at + self.min_refresh_interval <= time()
+
+    def refresh(self, kid=None):
+        with self.lock:
+            try:
+                # single flight, other thread can refresh the keys while this one is waiting the lock
+                if self.must_refresh(kid):
+                    self.keys, self.expires_at = self.load(kid)
+            except Exception:
+                if not self.keys:
+                    raise
+                logger.exception('Cannot refresh the keys of %s, using the stale keys', self.jwk_url)
+                self.expires_at = time() + self.min_refresh_interval
+            finally:
+                self.refreshing = False
+
+    def get_async_lock(self):
+        loop = get_running_loop()
+        lock = self.async_locks.get(loop)
+        if lock is None:
+            lock = self.async_locks[loop] = AsyncLock()
+
+        return lock
+
+    async def arefresh(self, kid=None):
+        async with self.get_async_lock():
+            try:
+                if self.must_refresh(kid):
+                    self.keys, self.expires_at = await self.aload(kid)
+            except Exception:
+                if not self.keys:
+                    raise
+                logger.exception('Cannot refresh the keys of %s, using the stale keys', self.jwk_url)
+                self.expires_at = time() + self.min_refresh_interval
+
+    def get_cache(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def from_cache(self, data, kid=None):
+        if data and data['expires_at'] > time() and (kid is None or kid in data['keys']):
+            return data['keys'], data['expires_at']
+
+        return None
+
+    def fetched(self, keys, max_age):
+        self.fetched_at = time()
+        # `no-cache` responses are refreshed at most once per `min_refresh_interval`
+        ttl = self.ttl if max_age is None else max(min(max_age, self.ttl), self.min_refresh_interval)
+        return {'keys': self.index(keys), 'expires_at': self.fetched_at + ttl}, ttl
+
+    def load(self, kid=None):
+        cache = self.get_cache()
+        if cache is not None:
+            cached = self.from_cache(cache.get(self.cache_key), kid)
+            if cached is not None:
+                return cached
+
+        data, ttl = self.fetched(*fetch_well_know_keys(self.jwk_url))
+        if cache is not None:
+            cache.set(self.cache_key, data, ttl)
+
+        return data['keys'], data['expires_at']
+
+    async def aload(self, kid=None):
+        cache = self.get_cache()
+        if cache is not None:
+            cached = self.from_cache(await sync_to_async(cache.get, thread_sensitive=False)(self.cache_key), kid)
+            if cached is not None:
+                return cached
+
+        data, ttl = self.fetched(*await afetch_well_know_keys(self.jwk_url))
+        if cache is not None:
+            await sync_to_async(cache.set, thread_sensitive=False)(self.cache_key, data, ttl)
+
+        return data['keys'], data['expires_at']
@@ -1,14 +1,18 @@
+from hashlib import sha256
 from json import dumps
+from time import time
 
 from django.utils.translation import gettext_lazy as _
 
+from asgiref.sync import sync_to_async
 from jwt import decode, get_unverified_header
 from jwt.algorithms import ECAlgorithm, RSAAlgorithm
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from ...utils.cache import get_lru_cache
 from .base import MultiProviderMixin
-from .utils import get_well_know_keys
+from .jwks import JwksCache
 
 try:
     from .drf_spetacular import *  # noqa this don`t broke app`s without drf-spectacular
@@ -17,21 +21,116 @@ except ModuleNotFoundError:
 
 
 class JwtAuthentication(MultiProviderMixin, BaseAuthentication):
+    """
+        JWT authentication with the keys of `KEYS` or fetched from `JWK_URL` (cached by `JwksCache`), options:
+
+        - `JWK_CACHE_TTL`: max seconds to keep the keys (default: 3600, limited by the response `Cache-Control`)
+        - `JWK_MIN_REFRESH_INTERVAL`: min seconds between refreshes forced by an unknown `kid` (default: 30)
+        - `JWK_BACKGROUND_REFRESH`: refresh expired keys in a thread, serving the stale keys (default: False)
+        - `JWK_CACHE_ALIAS`: django cache used to share the keys between workers (default: None)
+        - `TOKEN_CACHE_SIZE`: size of the LRU of verified tokens, skipping the signature check of repeated tokens
+          (default: 0, disabled)
+        - `TOKEN_CACHE_TTL`: max seconds to keep a verified token, always limited by the token `exp` (default: 300)
+
+        `aauthenticate` is the `authenticate` of async views, the keys are fetched without blocking the event loop and
+        `get_user` runs in a thread
+    """
+
+    def get_jwks(self):
+        if 'KEYS' in self.config:
+            return JwksCache.get_instance(f'{self.config_name}:KEYS', keys=self.config['KEYS'])
 
-    def get_well_know_key(self, kid):
         jwk_url = self.get_config('JWK_URL')
-        if 'KEYS' not in self.config and not jwk_url:
+        if not jwk_url:
             raise Exception(f'`JWK_URL` is not present in `{self.config_name}`')
 
-        elif 'KEYS' not in self.config:
-            self.config['KEYS'] = get_well_know_keys(self.get_config('JWK_URL'))
+        return JwksCache.get_instance(
+            jwk_url,
+            jwk_url=jwk_url,
+            ttl=self.get_config('JWK_CACHE_TTL', 3600),
+            min_refresh_interval=self.get_config('JWK_MIN_REFRESH_INTERVAL', 30),
+            background_refresh=self.get_config('JWK_BACKGROUND_REFRESH', False),
+            cache_alias=self.get_config('JWK_CACHE_ALIAS'),
+        )
+
+    def check_key(self, kid, key):
+        if key is None:
+            raise Exception(f'`{kid}` is not a valid key in `{self.config_name}`')
+
+        return key
+
+    def get_well_know_key(self, kid):
+        return self.check_key(kid, self.get_jwks().get_key(kid))
+
+    async def aget_well_know_key(self, kid):
+        return self.check_key(kid, await self.get_jwks().aget_key(kid))
+
+    def parse_public_key(self, kid, key):
+        public_keys = self.get_jwks().public_keys
+        if kid in public_keys and public_keys[kid][0] is key:
+            return public_keys[kid][1]
+
+        if key['alg'].startswith('RS'):
+            public_key = RSAAlgorithm.from_jwk(dumps(key))
+        elif key['alg'].startswith('ES'):
+            public_key = ECAlgorithm.from_jwk(dumps(key))
+        else:
+            raise Exception(f'`{key["alg"]}` is not a supported algorithm')
+
+        public_keys[kid] = (key, public_key)
+        return public_key
+
+    def get_public_key(self, kid):
+        return self.parse_public_key(kid, self.get_well_know_key(kid))
+
+    async def aget_public_key(self, kid):
+        return self.parse_public_key(kid, await self.aget_well_know_key(kid))
+
+    def get_token_cache(self):
+        size = self.get_config('TOKEN_CACHE_SIZE', 0)
+        return get_lru_cache(f'jwt-tokens:{self.config_name}', size) if size else None
+
+    def get_cached_token(self, token):
+        """
+            return the data of a verified token (None when absent) and the key of the token in the cache
+        """
+        cache = self.get_token_cache()
+        if cache is None:
+            return None, None
+
+        token_hash = sha256(token.encode()).digest()
+        data = cache.get(token_hash)
+        return (dict(data) if data is not None else None), token_hash
+
+    def verify_token(self, token, public_key, token_hash=None):
+        data = decode(token, public_key, algorithms=['RS256', 'ES256'], options={'verify_aud': False})
+
+        if token_hash is not None and 'exp' in data:
+            ttl = min(data['exp'] - time(), self.get_config('TOKEN_CACHE_TTL', 300))
+            self.get_token_cache().set(token_hash, dict(data), ttl)
 
-        return [key for key in self.config['KEYS'] if key['kid'] == kid][0]
+        return data
+
+    def decode_token(self, token):
+        data, token_hash = self.get_cached_token(token)
+        if data is not None:
+            return data
+
+        public_key = self.get_public_key(get_unverified_header(token)['kid'])
+        return self.verify_token(token, public_key, token_hash)
+
+    async def adecode_token(self, token):
+        data, token_hash = self.get_cached_token(token)
+        if data is not None:
+            return data
+
+        public_key = await self.aget_public_key(get_unverified_header(token)['kid'])
+        return self.verify_token(token, public_key, token_hash)
 
     def get_user(self, request, token_data):
         raise NotImplementedError('You need to create `get_user`')
 
-    def authenticate(self, request):
+    def get_bearer_token(self, request):
         token = self.get_token(request).split()
         if not token or not self.validate_provider(request):
             return None
@@ -39,19 +138,31 @@ class JwtAuthentication(MultiProviderMixin, BaseAuthentication):
         if len(token) != 2 or token[0] != self.get_config('KEYWORD', 'Bearer'):
             raise AuthenticationFailed(_('Invalid token header'))
 
+        return token[1]
+
+    def authenticate(self, request):
+        token = self.get_bearer_token(request)
+        if token is None:
+            return None
+
+        try:
+            data = self.decode_token(token)
+            user = self.resolve_user(request, data)
+        except NotImplementedError as err:
+            raise err
+        except Exception:
+            raise AuthenticationFailed(_('invalid or expired token'))
+
+        return (user, None)
+
+    async def aauthenticate(self, request):
+        token = self.get_bearer_token(request)
+        if token is None:
+            return None
+
         try:
-            header = get_unverified_header(token[1])
-            key = self.get_well_know_key(header['kid'])
-
-            if key['alg'].startswith('RS'):
-                public_key = RSAAlgorithm.from_jwk(dumps(key))
-            elif key['alg'].startswith('ES'):
-                public_key = ECAlgorithm.from_jwk(dumps(key))
-            else:
-                raise Exception()
-
-            data = decode(token[1], public_key, algorithms=['RS256', 'ES256'], options={'verify_aud': False})
-            user = self.get_user(request, data)
+            data = await self.adecode_token(token)
+            user = await sync_to_async(self.resolve_user)(request, data)
         except NotImplementedError as err:
             raise err
         except Exception:
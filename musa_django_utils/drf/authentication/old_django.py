@@ -1,16 +1,21 @@
+import hmac
 from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import lru_cache
+from hashlib import sha1, sha256
 from time import time
 from zlib import decompress
 
 from django.conf import settings
 from django.core.signing import JSONSerializer
-from django.utils.baseconv import base64
-from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.baseconv import base62
+from django.utils.crypto import constant_time_compare
+from django.utils.encoding import force_bytes
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import authentication, exceptions
 
-from .base import MultiProviderMixin
+from ...utils.cache import get_lru_cache
+from .base import LazySetting, MultiProviderMixin
 
 try:
     from .drf_spetacular import *  # noqa this don`t broke app`s without drf-spectacular
@@ -30,8 +35,18 @@ class BaseDecodeToken:
     def b64_encode(self, value):
         return urlsafe_b64encode(value).strip(b'=')
 
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def get_hmac(key_salt, secret):
+        """
+            hmac with the key derived by `salted_hmac`, copied for each value instead of deriving the key again
+        """
+        return hmac.new(sha1(force_bytes(key_salt + secret)).digest(), digestmod=sha1)
+
     def base64_hmac(self, salt, value, key):
-        return self.b64_encode(salted_hmac(salt, value, key).digest()).decode()
+        mac = self.get_hmac(salt, key).copy()
+        mac.update(force_bytes(value))
+        return self.b64_encode(mac.digest()).decode()
 
     def signature(self, value, secret):
         salt = 'django.contrib.sessions.backends.signed_cookies'
@@ -46,26 +61,55 @@ class BaseDecodeToken:
 
 
 class OldDjangoCookieSessionAuthentication(MultiProviderMixin, authentication.BaseAuthentication, BaseDecodeToken):
+    """
+        session of the signed cookies of django 2.2, options:
+
+        - `COOKIE_AGE`: max age of the cookie in seconds (default: `settings.SESSION_COOKIE_AGE`)
+        - `SECRET_KEY`: key of the signature (default: `settings.SECRET_KEY`)
+        - `COOKIE_CACHE_SIZE`: size of the LRU of validated cookies, each cookie is verified and parsed once per worker
+          until its age (default: 0, disabled)
+    """
     authentication_in = 'COOKIES'
-    authentication_field = settings.SESSION_COOKIE_NAME
+    authentication_field = LazySetting('SESSION_COOKIE_NAME')
 
     def get_user(self, request, session_data):
         raise NotImplementedError('You need to create your `get_user`')
 
+    def get_session_cache(self):
+        size = self.get_config('COOKIE_CACHE_SIZE', 0)
+        return get_lru_cache(f'cookie-sessions:{self.config_name}', size) if size else None
+
+    def decode_session(self, token):
+        cache = self.get_session_cache()
+        if cache is not None:
+            token_hash = sha256(token.encode()).digest()
+            session_data = cache.get(token_hash)
+            if session_data is not None:
+                return dict(session_data)
+
+        # `payload:timestamp:signature`, the signature covers `payload:timestamp`
+        value, signature = token.rsplit(':', 1)
+        payload, timestamp = value.rsplit(':', 1)
+        expires_at = base62.decode(timestamp) + self.get_config('COOKIE_AGE', settings.SESSION_COOKIE_AGE)
+        assert time() <= expires_at
+
+        secret = self.get_config('SECRET_KEY', settings.SECRET_KEY)
+        assert constant_time_compare(signature, self.signature(value, secret))
+
+        session_data = JSONSerializer().loads(self.decode_key(payload))
+        if cache is not None:
+            cache.set(token_hash, dict(session_data), expires_at - time())
+
+        return session_data
+
     def authenticate(self, request):
         token = self.get_token(request)
         if not token or not self.validate_provider(request):
             return None
 
         try:
-            value, timestamp = token.rsplit(':', 1)
-            assert time() - base64.decode(timestamp) <= self.get_config('COOKIE_AGE', settings.SESSION_COOKIE_AGE)
-
-            secret = self.get_config('SECRET_KEY', settings.SECRET_KEY)
-            assert constant_time_compare(timestamp, self.signature(value, secret))
-
-            session_data = JSONSerializer().loads(self.decode_key(value))
-            user = self.get_user(request, session_data)
+            session_data = self.decode_session(token)
+            user = self.resolve_user(request, session_data)
         except Exception:
             raise exceptions.AuthenticationFailed(_('invalid or expired session'))
 
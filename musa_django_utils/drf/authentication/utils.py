@@ -1,10 +1,48 @@
 from json import loads
+from re import search
 from urllib.request import urlopen
 
+from ...utils.http import get_async_client
 
-def get_well_know_keys(jwk_url):
+
+def parse_max_age(cache_control):
+    """
+        return the `max-age` of a `Cache-Control` header, 0 when the response must not be cached and None when absent
+    """
+    cache_control = (cache_control or '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+
+    match = search(r'max-age=(\d+)', cache_control)
+    return int(match.group(1)) if match else None
+
+
+def fetch_well_know_keys(jwk_url, timeout=10):
+    """
+        return the keys and the `max-age` of the response `Cache-Control` header
+    """
     try:
-        data = urlopen(jwk_url).read()
-        return loads(data)['keys']
+        with urlopen(jwk_url, timeout=timeout) as response:
+            return loads(response.read())['keys'], parse_max_age(response.headers.get('Cache-Control'))
     except Exception as err:
         raise Exception('Cannot get well-know, check config and `JWK_URL` url') from err
+
+
+async def afetch_well_know_keys(jwk_url, timeout=10):
+    """
+        `fetch_well_know_keys` with the shared async client
+    """
+    try:
+        response = await get_async_client().get(jwk_url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()['keys'], parse_max_age(response.headers.get('Cache-Control'))
+    except Exception as err:
+        raise Exception('Cannot get well-know, check config and `JWK_URL` url') from err
+
+
+def get_well_know_keys(jwk_url):
+    return fetch_well_know_keys(jwk_url)[0]
+
+
+async def aget_well_know_keys(jwk_url):
+    return (await afetch_well_know_keys(jwk_url))[0]
@@ -0,0 +1,14 @@
+from rest_framework.fields import ReadOnlyField
+
+from .renderers import RawJSON
+
+
+class RawJSONField(ReadOnlyField):
+    """
+        read only field of a JSON text (ex: `SubqueryJson(..., as_text=True)`), written as is by `RawJSONRenderer`
+    """
+
+    def to_representation(self, value):
+        if isinstance(value, (str, bytes)):
+            return RawJSON(value)
+        return value
@@ -1,6 +1,21 @@
+from hashlib import blake2b
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet, Subquery
+from django.db.models.constants import LOOKUP_SEP
 from django.db.models.query import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, urlencode
 
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .serializers import canonical_encoder
 
 
 class KeepRelatedMixin:
@@ -8,7 +23,35 @@ class KeepRelatedMixin:
     Update a model instance.
 
     Copied from https://github.com/encode/django-rest-framework/pull/8043/files
+
+    Only the prefetched relations written by the serializer (the `validated_data` keys) are prefetched again, with
+    `refetch_after_update` the instance is fetched again by the view queryset (select/prefetch related) instead. Both
+    use the filtered queryset (`filter_queryset`), as the lookup of the instance.
     """
+    refetch_after_update = False
+
+    def get_written_relations(self, serializer):
+        return set(serializer.validated_data)
+
+    def get_prefetch_lookups(self, written):
+        lookups = []
+        for lookup in self.filter_queryset(self.get_queryset())._prefetch_related_lookups:
+            path = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+            if path.split(LOOKUP_SEP)[0] in written:
+                lookups.append(lookup)
+
+        return lookups
+
+    @staticmethod
+    def get_prefetch_cache_name(instance, lookup):
+        name = (lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup).split(LOOKUP_SEP)[0]
+        # to-one relations are kept in the fields cache, updated by the serializer
+        if not hasattr(getattr(type(instance), name, None), 'related_manager_cls'):
+            return None
+
+        manager = getattr(instance, name)
+        return getattr(manager, 'prefetch_cache_name', None) or manager.field.remote_field.get_cache_name()
+
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -16,12 +59,331 @@ class KeepRelatedMixin:
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
 
-        queryset = self.filter_queryset(self.get_queryset())
-        if queryset._prefetch_related_lookups:
+        if self.refetch_after_update:
+            serializer.instance = self.filter_queryset(self.get_queryset()).get(pk=instance.pk)
+            return Response(serializer.data)
+
+        lookups = self.get_prefetch_lookups(self.get_written_relations(serializer))
+        if lookups:
             # If 'prefetch_related' has been applied to a queryset, we need to
-            # forcibly invalidate the prefetch cache on the instance,
-            # and then re-prefetch related objects
-            instance._prefetched_objects_cache = {}
-            prefetch_related_objects([instance], *queryset._prefetch_related_lookups)
+            # forcibly invalidate the prefetch cache of the written relations,
+            # and then re-prefetch them
+            prefetched = getattr(instance, '_prefetched_objects_cache', {})
+            for lookup in lookups:
+                cache_name = self.get_prefetch_cache_name(instance, lookup)
+                if cache_name:
+                    prefetched.pop(cache_name, None)
+            prefetch_related_objects([instance], *lookups)
 
         return Response(serializer.data)
+
+
+class CollectionETagMixin:
+    """
+    List with an ETag of the collection, built with the `hash_id` of the items (see `Md5VersionSerializer`), items
+    without `hash_id` are hashed by the view.
+
+    `If-None-Match` is answered with 304, when the serializer has `hash_fields` the ETag is built before the
+    serialization (skipping it), otherwise only the response body is saved.
+
+    The query params (ex: `?fields=`, restql queries) and the negotiated renderer change the body but not the hashes,
+    they are part of the ETag, and the response varies by `Accept`.
+    """
+    etag_vary_headers = ('Accept',)
+
+    def get_etag_extra(self):
+        # the count and page number are part of the paginated response
+        page = getattr(self.paginator, 'page', None)
+        paginator = getattr(page, 'paginator', None)
+        params = urlencode(sorted(self.request.query_params.lists()), doseq=True)
+        media_type = getattr(self.request, 'accepted_media_type', '')
+        return f'{getattr(page, "number", "")}:{getattr(paginator, "count", "")}:{media_type}:{params}'
+
+    @staticmethod
+    def get_item_hash(item):
+        return blake2b(canonical_encoder.encode(item).encode(), digest_size=16).hexdigest()
+
+    def get_collection_etag(self, hashes):
+        value = blake2b(digest_size=16)
+        value.update(self.get_etag_extra().encode())
+        for item_hash in hashes:
+            value.update(item_hash.encode())
+        return f'"{value.hexdigest()}"'
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = page if page is not None else queryset
+
+        data = None
+        serializer_class = self.get_serializer_class()
+        if getattr(serializer_class, 'hash_fields', None):
+            hashes = [serializer_class.hash_instance(instance) for instance in objects]
+        else:
+            data = self.get_serializer(objects, many=True).data
+            hashes = [item['hash_id'] if 'hash_id' in item else self.get_item_hash(item) for item in data]
+
+        etag = self.get_collection_etag(hashes)
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+            patch_vary_headers(response, self.etag_vary_headers)
+            return response
+
+        if data is None:
+            data = self.get_serializer(objects, many=True).data
+
+        response = self.get_paginated_response(data) if page is not None else Response(data)
+        response['ETag'] = etag
+        patch_vary_headers(response, self.etag_vary_headers)
+        return response
+
+
+class FieldsPruningMixin:
+    """
+    Prune the queryset by the django-restql `fields` query of the request (only in safe methods).
+
+    - `.only()` of the requested columns, when all requested fields are model fields, relations or annotations
+    - `select_related`/`prefetch_related` of relations not requested are removed, nested ones are truncated
+    - `Subquery` annotations not requested are removed from the SELECT
+
+    fields with `source='*'` (ex: `SerializerMethodField`) can use anything, the relations under them are kept.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+
+        requested = self.get_requested_paths()
+        if requested is None:
+            return queryset
+
+        return self.prune_queryset(queryset, *requested)
+
+    def get_requested_paths(self):
+        """
+            return the lookup paths of the requested fields and the paths of fields with unknown needs, or None when
+            there is no (valid) query
+        """
+        from django_restql.exceptions import QueryFormatError
+        from django_restql.parser import QueryParser
+        from django_restql.settings import restql_settings
+
+        raw_query = self.request.query_params.get(restql_settings.QUERY_PARAM_NAME)
+        if not raw_query:
+            return None
+
+        try:
+            query = QueryParser().parse(raw_query)
+        except (SyntaxError, QueryFormatError):
+            # the serializer returns the error
+            return None
+
+        paths, opaque = set(), set()
+        self.collect_paths(self.get_serializer_class()(), query, '', paths, opaque)
+        return paths, opaque
+
+    def collect_paths(self, serializer, query, prefix, paths, opaque):
+        fields = serializer.fields
+        included = {field if isinstance(field, str) else field.field_name: field for field in query.included_fields}
+        if not included or '*' in included:
+            names = [name for name in fields if name not in query.excluded_fields]
+        else:
+            names = [name for name in included if name in fields]
+
+        for name in names:
+            field = fields[name]
+            if field.source == '*':
+                opaque.add(prefix[:-len(LOOKUP_SEP)] if prefix else '')
+                continue
+
+            path = prefix + LOOKUP_SEP.join(field.source_attrs)
+            paths.add(path)
+
+            child = getattr(field, 'child', field)
+            if isinstance(child, BaseSerializer):
+                nested_query = included.get(name)
+                if isinstance(nested_query, str) or nested_query is None:
+                    nested_query = query._replace(field_name=name, included_fields=['*'], excluded_fields=[])
+                self.collect_paths(child, nested_query, path + LOOKUP_SEP, paths, opaque)
+
+    @staticmethod
+    def prune_lookup(path, needed):
+        """
+            longest prefix of the lookup `path` in `needed`
+        """
+        kept = []
+        for part in path.split(LOOKUP_SEP):
+            if LOOKUP_SEP.join((*kept, part)) not in needed:
+                break
+            kept.append(part)
+
+        return LOOKUP_SEP.join(kept)
+
+    @staticmethod
+    def flatten_select_related(select_related, prefix=''):
+        for name, nested in select_related.items():
+            if nested:
+                yield from FieldsPruningMixin.flatten_select_related(nested, f'{prefix}{name}{LOOKUP_SEP}')
+            else:
+                yield f'{prefix}{name}'
+
+    def get_only_fields(self, queryset, needed, select_related):
+        opts = queryset.model._meta
+        only = set(path.split(LOOKUP_SEP)[0] for path in select_related)
+        # the pk and the `hash_fields` of `Md5VersionSerializer` are read even when not requested, deferred they are
+        # loaded by one query per instance
+        hash_fields = getattr(self.get_serializer_class(), 'hash_fields', None) or ()
+        for name in {path.split(LOOKUP_SEP)[0] for path in needed} | {'pk', *hash_fields}:
+            if name in queryset.query.annotations:
+                continue
+            try:
+                field = opts.pk if name == 'pk' else opts.get_field(name)
+            except FieldDoesNotExist:
+                # properties and methods can use any column
+                return None
+            if field.concrete:
+                only.add(field.name)
+
+        return only
+
+    def prune_queryset(self, queryset, paths, opaque):
+        if '' in opaque:
+            return queryset
+
+        needed = {prefix for path in (*paths, *opaque) for prefix in self.get_prefixes(path)}
+        queryset = queryset._chain()
+        query = queryset.query
+
+        select_related = []
+        if isinstance(query.select_related, dict):
+            for path in self.flatten_select_related(query.select_related):
+                kept = path if self.is_opaque(path, opaque) else self.prune_lookup(path, needed)
+                if kept and kept not in select_related:
+                    select_related.append(kept)
+            queryset = queryset.select_related(None)
+            if select_related:
+                queryset = queryset.select_related(*select_related)
+
+        prefetch_related = []
+        for lookup in queryset._prefetch_related_lookups:
+            path = lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+            if self.is_opaque(path, opaque):
+                kept = lookup
+            elif isinstance(lookup, Prefetch):
+                kept = lookup if path.split(LOOKUP_SEP)[0] in needed else None
+            else:
+                kept = self.prune_lookup(path, needed)
+            if kept and kept not in prefetch_related:
+                prefetch_related.append(kept)
+        queryset = queryset.prefetch_related(None).prefetch_related(*prefetch_related)
+
+        pruned = {
+            name for name, annotation in query.annotations.items()
+            if isinstance(annotation, Subquery) and name not in needed
+        }
+        if pruned:
+            queryset.query.set_annotation_mask(set(queryset.query.annotation_select) - pruned)
+
+        only = self.get_only_fields(queryset, needed, select_related)
+        if only is not None and queryset.query.deferred_loading == (frozenset(), True):
+            queryset = queryset.only(*only)
+
+        return queryset
+
+    @staticmethod
+    def get_prefixes(path):
+        parts = path.split(LOOKUP_SEP)
+        return [LOOKUP_SEP.join(parts[:index]) for index in range(1, len(parts) + 1)]
+
+    @staticmethod
+    def is_opaque(path, opaque):
+        return any(path == prefix or path.startswith(prefix + LOOKUP_SEP) for prefix in opaque)
+
+
+class StreamingListMixin:
+    """
+    Opt-in streaming of `list`, the rows are read by `.iterator()` (the prefetches are done by chunk), serialized and
+    written one by one:
+
+    - `?stream=json`: same response of `list`, with the `StandardPagination` envelope (the page is streamed), other
+      paginators fall back to `list`
+    - `?stream=ndjson`: one object per line of the whole queryset, without pagination, for exports. Enabled by adding
+      `ndjson` to `stream_formats`
+
+    the response is written after the view returns, outside of `ATOMIC_REQUESTS` transactions.
+    """
+    stream_query_param = 'stream'
+    stream_formats = ('json',)
+    stream_chunk_size = 500
+    stream_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def list(self, request, *args, **kwargs):
+        stream = request.query_params.get(self.stream_query_param)
+        if stream not in self.stream_formats:
+            return super().list(request, *args, **kwargs)
+
+        # only `paginate_queryset_lazy` streams the page, other paginators would stream the whole queryset
+        if stream == 'json' and self.paginator is not None and not hasattr(self.paginator, 'paginate_queryset_lazy'):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if stream == 'ndjson':
+            return StreamingHttpResponse(self.stream_ndjson(queryset), content_type='application/x-ndjson')
+
+        pagination = None
+        if self.paginator is not None:
+            page = self.paginator.paginate_queryset_lazy(queryset, request, view=self)
+            if page is not None:
+                queryset, pagination = page, self.paginator.get_pagination_data()
+
+        return StreamingHttpResponse(self.stream_json(queryset, pagination), content_type='application/json')
+
+    def iterate_queryset(self, queryset):
+        if not isinstance(queryset, QuerySet):
+            yield from queryset
+            return
+
+        # `iterator()` ignores `prefetch_related`
+        lookups = queryset._prefetch_related_lookups
+        iterator = queryset.prefetch_related(None).iterator(chunk_size=self.stream_chunk_size)
+        while True:
+            chunk = list(islice(iterator, self.stream_chunk_size))
+            if not chunk:
+                return
+            if lookups:
+                prefetch_related_objects(chunk, *lookups)
+            yield from chunk
+
+    def iterate_encoded(self, queryset):
+        """
+            yield lists with the encoded rows of each chunk
+        """
+        serializer = self.get_serializer(many=True).child
+        encode = self.stream_encoder.encode
+        chunk = []
+        for instance in self.iterate_queryset(queryset):
+            chunk.append(encode(serializer.to_representation(instance)))
+            if len(chunk) >= self.stream_chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def stream_json(self, queryset, pagination=None):
+        if pagination is not None:
+            yield f'{{"pagination":{self.stream_encoder.encode(pagination)},"results":['
+        else:
+            yield '['
+
+        separator = ''
+        for chunk in self.iterate_encoded(queryset):
+            yield separator + ','.join(chunk)
+            separator = ','
+
+        yield ']}' if pagination is not None else ']'
+
+    def stream_ndjson(self, queryset):
+        for chunk in self.iterate_encoded(queryset):
+            yield '\n'.join(chunk) + '\n'
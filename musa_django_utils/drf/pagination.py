@@ -1,24 +1,171 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import partial
+from json import dumps, loads
+from uuid import UUID
+
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import EmptyPage, InvalidPage, Paginator
+from django.db.models import Q, QuerySet
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
 from django.utils.translation import gettext_lazy as _
 
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination, _reverse_ordering
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from ..django.counts import ExactCount
+
+
+class FieldsFilterSchemaMixin:
+    """
+        mixin used to document the django-restql `fields` filter in paginated endpoints
+    """
+
+    @staticmethod
+    def get_filter_desc():
+        return _("""Use to filter fields in response (for fast response and low data consumption).
+
+You can specify fields to show using his name ex: `?fields={fieldName}` and `?fields={fieldName, field2Name}`, to
+exclude some fields, you can put `-` before a name, ex: `?fields={-fieldName}` and `?fields={-fieldName, -field2Name}`,
+works in nested data: `?fields={fieldNested{id}}`
+""")
+
+    def get_schema_operation_parameters(self, view):
+        from django_restql.mixins import DynamicFieldsMixin
+        parameters = super().get_schema_operation_parameters(view)
+
+        if view.serializer_class and issubclass(view.serializer_class, DynamicFieldsMixin):
+            # add fields filter to documentation
+            parameters.append(
+                {
+                    'name': settings.RESTQL['QUERY_PARAM_NAME'],
+                    'required': False,
+                    'in': 'query',
+                    'description': self.get_filter_desc(),
+                    'schema': {
+                        'type': 'string',
+                    },
+                },
+            )
+
+        return parameters
+
 
+class CountStrategyPaginator(Paginator):
+    """
+        django paginator with the count resolved by a count strategy (see `musa_django_utils.django.counts`)
 
-class StandardPagination(PageNumberPagination):
+        when the count is approximate the page number is not limited by the `num_pages`, pages are validated by
+        the content
+    """
+
+    def __init__(self, *args, count_strategy=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_strategy = count_strategy or ExactCount()
+        self.approximate = False
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+
+        count, self.approximate = self.count_strategy.count(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if not self.approximate or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.approximate:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page])
+        if not object_list and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+
+        return self._get_page(object_list, number, self)
+
+
+class StandardPagination(FieldsFilterSchemaMixin, PageNumberPagination):
+    """
+        Page number pagination, the count strategy can be set by the `count_strategy` attribute of the view or
+        pagination class, or by the `PAGINATION_CONFIG` setting, ex:
+
+            PAGINATION_CONFIG = {
+                'COUNT_STRATEGY': 'musa_django_utils.django.counts.EstimatedCount',
+                'COUNT_STRATEGY_OPTIONS': {'threshold': 100000},
+            }
+    """
     page_size = 25
     page_size_query_param = 'page_size'
     max_page_size = 999
     page_query_param = 'page'
+    django_paginator_class = CountStrategyPaginator
+    count_strategy = None
+
+    def get_count_strategy(self, view):
+        strategy = getattr(view, 'count_strategy', None) or self.count_strategy
+        if strategy is not None:
+            return strategy
+
+        config = getattr(settings, 'PAGINATION_CONFIG', {})
+        if 'COUNT_STRATEGY' in config:
+            return import_string(config['COUNT_STRATEGY'])(**config.get('COUNT_STRATEGY_OPTIONS', {}))
+
+        return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            type(self).django_paginator_class, count_strategy=self.get_count_strategy(view)
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_queryset_lazy(self, queryset, request, view=None):
+        """
+            same of `paginate_queryset`, but returns the page not evaluated (the sliced queryset), used to stream it
+        """
+        self.django_paginator_class = partial(
+            type(self).django_paginator_class, count_strategy=self.get_count_strategy(view)
+        )
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        self.request = request
+        return self.page.object_list
+
+    def get_pagination_data(self):
+        return {
+            'page': self.page.number,
+            'last_page': self.page.paginator.num_pages,
+            'page_size': self.page.paginator.per_page,
+            'count': self.page.paginator.count,
+            'approximate_count': self.page.paginator.approximate,
+        }
 
     def get_paginated_response(self, data):
         return Response({
-            'pagination': {
-                'page': self.page.number,
-                'last_page': self.page.paginator.num_pages,
-                'page_size': self.page.paginator.per_page,
-                'count': self.page.paginator.count,
-            },
+            'pagination': self.get_pagination_data(),
             'results': data
         })
 
@@ -33,23 +180,14 @@ class StandardPagination(PageNumberPagination):
                         'last_page': {'type': 'integer', 'example': 5},
                         'page_size': {'type': 'integer', 'example': 25},
                         'count': {'type': 'integer', 'example': 123},
+                        'approximate_count': {'type': 'boolean', 'example': False},
                     }
                 },
                 'results': schema,
             },
         }
 
-    @staticmethod
-    def get_filter_desc():
-        return _("""Use to filter fields in response (for fast response and low data consumption).
-
-You can specify fields to show using his name ex: `?fields={fieldName}` and `?fields={fieldName, field2Name}`, to
-exclude some fields, you can put `-` before a name, ex: `?fields={-fieldName}` and `?fields={-fieldName, -field2Name}`,
-works in nested data: `?fields={fieldNested{id}}`
-""")
-
     def get_schema_operation_parameters(self, view):
-        from django_restql.mixins import DynamicFieldsMixin
         parameters = super().get_schema_operation_parameters(view)
 
         # add default page_size to documentation
@@ -57,18 +195,182 @@ works in nested data: `?fields={fieldNested{id}}`
         if len(result) > 0:
             result[0]['schema']['default'] = self.page_size
 
-        if view.serializer_class and issubclass(view.serializer_class, DynamicFieldsMixin):
-            # add fields filter to documentation
-            parameters.append(
-                {
-                    'name': settings.RESTQL['QUERY_PARAM_NAME'],
-                    'required': False,
-                    'in': 'query',
-                    'description': self.get_filter_desc(),
-                    'schema': {
-                        'type': 'string',
-                    },
-                },
-            )
-
         return parameters
+
+
+def _position_encoder(value):
+    # full precision iso format, `DjangoJSONEncoder` truncate microseconds and break the keyset comparison
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f'Object of type {value.__class__.__name__} is not a valid cursor position')
+
+
+class KeysetPagination(FieldsFilterSchemaMixin, CursorPagination):
+    """
+        Keyset (seek) pagination, uses the same response envelope of `StandardPagination`
+
+        never runs `COUNT(*)` and the cost don't grow with the page depth, the cursor is an opaque value built with
+        the ordering columns (multiple columns and descending orders are supported), the primary key is appended in
+        the ordering as tie breaker, ordering columns must be not null. a foreign key is ordered by its column (the
+        cursor keeps the related pk, not the ordering of the related model)
+    """
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 999
+    ordering = ('-pk',)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not {'pk', queryset.model._meta.pk.name} & {field.lstrip('-') for field in ordering}:
+            ordering += ('-pk' if ordering[-1].startswith('-') else 'pk',)
+
+        columns = []
+        for order, field in zip(ordering, self.get_ordering_fields(queryset.model, ordering)):
+            if field is not None and field.is_relation and field.concrete:
+                parts = order.lstrip('-').split(LOOKUP_SEP)
+                order = ('-' if order.startswith('-') else '') + LOOKUP_SEP.join((*parts[:-1], field.attname))
+            columns.append(order)
+
+        return tuple(columns)
+
+    def get_keyset_filter(self, ordering, position):
+        """
+            expand the row comparison `(a, b) > (x, y)` to `a > x OR (a = x AND b > y)`, respecting the direction
+            of each column, the redundant bound on the first column allow the database to use an index range scan
+        """
+        condition, equals = Q(), {}
+        for order, value in zip(ordering, position):
+            field_name = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            condition |= Q(**equals, **{f'{field_name}__{lookup}': value})
+            equals[field_name] = value
+
+        first_field = ordering[0].lstrip('-')
+        return Q(**{f'{first_field}__{"lte" if ordering[0].startswith("-") else "gte"}': position[0]}) & condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.ordering_fields = self.get_ordering_fields(queryset.model, self.ordering)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = (self.cursor.reverse, self.cursor.position) if self.cursor else (False, None)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+
+        # fetch an extra item to know if exists a page following on from this one
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_following
+        else:
+            self.has_next, self.has_previous = has_following, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    @staticmethod
+    def get_ordering_fields(model, ordering):
+        """
+            model field of each ordering column, None for the annotations
+        """
+        fields = []
+        for order in ordering:
+            field, opts = None, model._meta
+            try:
+                for name in order.lstrip('-').split(LOOKUP_SEP):
+                    field = opts.pk if name == 'pk' else opts.get_field(name)
+                    if field.is_relation:
+                        opts = field.related_model._meta
+            except FieldDoesNotExist:
+                field = None
+            fields.append(field)
+
+        return fields
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            data = loads(urlsafe_b64decode(encoded.encode('ascii') + b'=' * (-len(encoded) % 4)))
+            reverse, position = bool(data['r']), data['p']
+            assert isinstance(position, list) and len(position) == len(self.ordering)
+            # invalid values (`ValidationError` of the fields) would be database errors in the filter
+            position = [
+                value if field is None else field.to_python(value)
+                for field, value in zip(self.ordering_fields, position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        data = dumps({'r': int(cursor.reverse), 'p': cursor.position}, default=_position_encoder, separators=(',', ':'))
+        encoded = urlsafe_b64encode(data.encode()).strip(b'=').decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for order in ordering:
+            value = instance
+            for attr in order.lstrip('-').split('__'):
+                value = value[attr] if isinstance(value, dict) else getattr(value, attr)
+            position.append(value)
+
+        return position
+
+    def get_paginated_response(self, data):
+        return Response({
+            'pagination': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'page_size': self.page_size,
+            },
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'pagination': {
+                    'type': 'object',
+                    'properties': {
+                        'next': {'type': 'string', 'nullable': True, 'example': 'https://api.example.org/?cursor=eyJy'},
+                        'previous': {'type': 'string', 'nullable': True, 'example': None},
+                        'page_size': {'type': 'integer', 'example': 25},
+                    }
+                },
+                'results': schema,
+            },
+        }
@@ -0,0 +1,61 @@
+from functools import partial
+from json import loads
+from re import compile as re_compile
+from secrets import token_hex
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class RawJSON:
+    """
+        JSON text written as is by `RawJSONRenderer`, ex: the `as_text` output of `SubqueryJson`
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def tolist(self):
+        # used by the DRF `JSONEncoder` of the other renderers
+        return loads(self.value)
+
+
+class RawJSONEncoder(JSONEncoder):
+    """
+        encode `RawJSON` as placeholders, replaced by the raw text after the encoding
+    """
+
+    def __init__(self, *args, raw_values=None, nonce='', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.raw_values = raw_values
+        self.nonce = nonce
+
+    def default(self, obj):
+        if isinstance(obj, RawJSON) and self.raw_values is not None:
+            value = obj.value
+            self.raw_values.append(value.encode() if isinstance(value, str) else value)
+            return f'@raw-json:{self.nonce}:{len(self.raw_values) - 1}@'
+
+        return super().default(obj)
+
+
+class RawJSONRenderer(JSONRenderer):
+    """
+        `JSONRenderer` that writes the `RawJSON` values (ex: of `RawJSONField`) without decoding/encoding them
+    """
+    encoder_class = RawJSONEncoder
+    placeholder = re_compile(rb'"@raw-json:([0-9a-f]+):(\d+)@"')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        raw_values, nonce = [], token_hex(8)
+        # renderers are created for each request
+        self.encoder_class = partial(type(self).encoder_class, raw_values=raw_values, nonce=nonce)
+        rendered = super().render(data, accepted_media_type, renderer_context)
+        if not raw_values:
+            return rendered
+
+        nonce = nonce.encode()
+        return self.placeholder.sub(
+            lambda match: raw_values[int(match[2])] if match[1] == nonce else match[0], rendered
+        )
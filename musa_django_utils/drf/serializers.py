@@ -1,19 +1,175 @@
-from hashlib import md5
-from json import dumps
+from hashlib import blake2b, md5
 
 from django.core.serializers.json import DjangoJSONEncoder
 
-from rest_framework.fields import CharField
-from rest_framework.serializers import Serializer
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import CharField, SkipField, empty
+from rest_framework.serializers import ListSerializer, Serializer
+from rest_framework.settings import api_settings
+from rest_framework.utils import html
+
+try:
+    from xxhash import xxh3_128_hexdigest
+except ModuleNotFoundError:  # pragma: no cover
+    xxh3_128_hexdigest = None
+
+# encoders are created once, `legacy` has the same output of `dumps(data, cls=DjangoJSONEncoder)`
+legacy_encoder = DjangoJSONEncoder()
+canonical_encoder = DjangoJSONEncoder(sort_keys=True, separators=(',', ':'))
+
+HASH_FUNCTIONS = {
+    'md5': lambda value: md5(value).hexdigest(),
+    'blake2b': lambda value: blake2b(value, digest_size=16).hexdigest(),
+    'xxhash': xxh3_128_hexdigest or (lambda value: blake2b(value, digest_size=16).hexdigest()),
+}
 
 
 class Md5VersionSerializer(Serializer):
+    """
+        Add `hash_id`, a hash of the object used as version
+
+        - `hash_algorithm`: `md5` (default, hash of the legacy JSON encoding), `blake2b` or `xxhash` (fallback to
+          blake2b when `xxhash` is not installed), both with a canonical JSON encoding (sorted keys, compact)
+        - `hash_fields`: instance attributes hashed instead of the serialized data, ex: `('pk', 'updated_at')`,
+          allows `CollectionETagMixin` to build the ETag without serializing
+    """
     hash_id = CharField(required=False, read_only=True)
+    hash_algorithm = 'md5'
+    hash_fields = None
+
+    @classmethod
+    def get_hash(cls, value):
+        encoder = legacy_encoder if cls.hash_algorithm == 'md5' else canonical_encoder
+        return HASH_FUNCTIONS[cls.hash_algorithm](encoder.encode(value).encode())
+
+    @classmethod
+    def hash_instance(cls, instance):
+        return cls.get_hash([getattr(instance, field_name) for field_name in cls.hash_fields])
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data['hash_id'] = md5(dumps(data, cls=DjangoJSONEncoder).encode()).hexdigest()
+        data['hash_id'] = self.hash_instance(instance) if self.hash_fields else self.get_hash(data)
         return data
 
     class Meta:
         abstract = True
+
+
+class BatchValidatedListSerializer(ListSerializer):
+    """
+        `ListSerializer` for bulk payloads, use as `list_serializer_class` in the `Meta` of the child serializer
+
+        - validators with `validate_many` (ex: `DependsAnotherField`, `NoAcceptSpace`), of the child or of its fields,
+          run once for the whole payload after the validation of the items (and after their `validate`)
+        - the errors are a dict of index => errors of the item, with the errors of all items
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_validators = self.split_batch_validators(self.child)
+        self.batch_field_validators = {}
+        for field in self.child.fields.values():
+            if not field.read_only and len(field.source_attrs) == 1:
+                validators = self.split_batch_validators(field)
+                if validators:
+                    self.batch_field_validators[field] = validators
+
+    @staticmethod
+    def split_batch_validators(field):
+        """
+            remove the validators with `validate_many` of the field (or serializer), returns them
+        """
+        batch = [validator for validator in field.validators if hasattr(validator, 'validate_many')]
+        if batch:
+            field.validators = [validator for validator in field.validators if validator not in batch]
+
+        return batch
+
+    def check_list(self, data):
+        """
+            the checks of `ListSerializer.to_internal_value` before the items
+        """
+        if not isinstance(data, list):
+            message = self.error_messages['not_a_list'].format(input_type=type(data).__name__)
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='not_a_list')
+
+        if not self.allow_empty and len(data) == 0:
+            message = self.error_messages['empty']
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='empty')
+
+        if self.max_length is not None and len(data) > self.max_length:
+            message = self.error_messages['max_length'].format(max_length=self.max_length)
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='max_length')
+
+        if self.min_length is not None and len(data) < self.min_length:
+            message = self.error_messages['min_length'].format(min_length=self.min_length)
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='min_length')
+
+    def run_batch_validators(self, items):
+        """
+            errors by index (of `items`) of the batch validators, as in `Serializer.run_validation` the validators of
+            the child only run for the items without errors in the fields
+        """
+        errors = {}
+        for field, validators in self.batch_field_validators.items():
+            attr = field.source_attrs[0]
+            values = [item.get(attr) for item in items]
+            for validator in validators:
+                for index, error in validator.validate_many(values).items():
+                    errors.setdefault(index, {}).setdefault(field.field_name, []).extend(error)
+
+        if self.batch_validators:
+            indexes = [index for index in range(len(items)) if index not in errors]
+            valid_items = [items[index] for index in indexes]
+            for validator in self.batch_validators:
+                for position, error in validator.validate_many(valid_items).items():
+                    item_errors = errors.setdefault(indexes[position], {})
+                    for field_name, messages in error.items():
+                        item_errors.setdefault(field_name, []).extend(messages)
+
+        return errors
+
+    def validate_failed_item(self, data, item_errors):
+        """
+            batch validators of the fields without errors of an item that failed the validation, as the validators of
+            each field run in `Serializer.to_internal_value`
+        """
+        if not isinstance(item_errors, dict) or not hasattr(data, 'get'):
+            return
+
+        for field, validators in self.batch_field_validators.items():
+            primitive = field.get_value(data)
+            if field.field_name in item_errors or primitive is empty:
+                continue
+
+            try:
+                value = field.run_validation(primitive)
+            except (SkipField, ValidationError):
+                continue
+
+            for validator in validators:
+                for error in validator.validate_many([value]).values():
+                    item_errors.setdefault(field.field_name, []).extend(error)
+
+    def to_internal_value(self, data):
+        if html.is_html_input(data):
+            data = html.parse_html_list(data, default=[])
+
+        self.check_list(data)
+
+        indexes, items, errors = [], [], {}
+        for index, item in enumerate(data):
+            try:
+                items.append(self.child.run_validation(item))
+                indexes.append(index)
+            except ValidationError as exc:
+                errors[index] = exc.detail
+                self.validate_failed_item(item, exc.detail)
+
+        for position, item_errors in self.run_batch_validators(items).items():
+            errors[indexes[position]] = item_errors
+
+        if errors:
+            raise ValidationError(dict(sorted(errors.items())))
+
+        return items
@@ -1,14 +1,27 @@
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
 from rest_framework.utils.representation import smart_repr
 
 
 class NoAcceptSpace:
+    message = _('This field cannot contain spaces')
 
     def __call__(self, value):
         if ' ' in value:
-            raise ValidationError(_('This field cannot contain spaces'))
+            raise ValidationError(self.message)
+
+    def validate_many(self, values):
+        """
+            validate the values of many items, returns the errors by index (the items share the same error)
+        """
+        invalid = [index for index, value in enumerate(values) if isinstance(value, str) and ' ' in value]
+        if not invalid:
+            return {}
+
+        error = ValidationError(self.message).detail
+        return dict.fromkeys(invalid, error)
 
 
 class DependsAnotherField:
@@ -20,21 +33,41 @@ class DependsAnotherField:
             - password and old_password is not required
             - but if password is present, old_password is required
             - and if old_password is present, password is required
+
+        `validate_many` validates the attrs of many items (ex: `BatchValidatedListSerializer`)
     """
     message = _('This field is required.')
 
     def __init__(self, fields, message=None):
         self.fields = fields
+        self.field_set = frozenset(fields)
         self.message = message or self.message
 
+    def get_missing_items(self, present):
+        return {field_name: self.message for field_name in self.fields if field_name not in present}
+
     def __call__(self, attrs):
-        missing_items = {
-            field_name: self.message
-            for field_name in self.fields
-            if field_name not in attrs.keys()
-        }
-        if missing_items and len(missing_items.keys()) != len(self.fields):
-            raise ValidationError(missing_items, code='required')
+        present = attrs.keys() & self.field_set
+        if present and len(present) != len(self.field_set):
+            raise ValidationError(self.get_missing_items(present), code='required')
+
+    def validate_many(self, items):
+        """
+            validate the attrs of many items, returns the errors by index (items missing the same fields share the
+            same error)
+        """
+        errors, details = {}, {}
+        field_set, size = self.field_set, len(self.field_set)
+        for index, attrs in enumerate(items):
+            present = attrs.keys() & field_set
+            if present and len(present) != size:
+                present = frozenset(present)
+                if present not in details:
+                    error = ValidationError(self.get_missing_items(present), code='required')
+                    details[present] = as_serializer_error(error)
+                errors[index] = details[present]
+
+        return errors
 
     def __repr__(self):
         return f'<{self.__class__.__name__}(fields={smart_repr(self.fields)})>'
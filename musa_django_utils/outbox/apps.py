@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class OutboxConfig(AppConfig):
+    name = 'musa_django_utils.outbox'
+    label = 'musa_outbox'
+    verbose_name = 'SNS Outbox'
+    default_auto_field = 'django.db.models.BigAutoField'
@@ -0,0 +1,51 @@
+from logging import getLogger
+from time import sleep
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, close_old_connections
+
+from ...relay import OutboxRelay
+
+logger = getLogger('sns-outbox')
+
+
+class Command(BaseCommand):
+    help = 'Publishes the SNS outbox events, many relays can run in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='events locked and published per batch')
+        parser.add_argument('--max-attempts', type=int, default=10, help='attempts before an event is skipped')
+        parser.add_argument('--loop', action='store_true', help='keep polling the outbox')
+        parser.add_argument('--interval', type=float, default=1.0, help='seconds between polls, with `--loop`')
+        parser.add_argument('--max-backoff', type=float, default=60.0,
+                            help='max seconds between polls after errors, with `--loop`')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        relay = OutboxRelay(
+            batch_size=options['batch_size'], max_attempts=options['max_attempts'], using=options['database']
+        )
+
+        errors = 0
+        while True:
+            try:
+                published, failed = relay.relay()
+            except Exception:
+                if not options['loop']:
+                    raise
+
+                # ex: the database or the network is down, the interval is doubled on each consecutive error
+                errors += 1
+                delay = min(options['interval'] * 2 ** errors, options['max_backoff'])
+                logger.exception('Cannot relay the outbox events, retrying in %.1f seconds', delay)
+                close_old_connections()
+                sleep(delay)
+                continue
+
+            errors = 0
+            if published or failed:
+                self.stdout.write(f'Published {published} events, {failed} failures')
+
+            if not options['loop']:
+                break
+            sleep(options['interval'])
@@ -0,0 +1,21 @@
+from django.db.models import JSONField, Model
+from django.db.models.fields import CharField, DateTimeField, PositiveIntegerField, TextField
+
+
+class SnsOutboxEvent(Model):
+    """
+        SNS message waiting to be published by the `relay_sns_outbox` command
+    """
+    topic_arn = CharField(max_length=256)
+    message = TextField()
+    attributes = JSONField(default=dict, blank=True)
+    options = JSONField(default=dict, blank=True)
+    attempts = PositiveIntegerField(default=0)
+    last_error = TextField(blank=True, default='')
+    created_at = DateTimeField(auto_now_add=True)
+
+    def as_publish_kwargs(self):
+        return {'message': self.message, 'attributes': self.attributes, 'topic': self.topic_arn, **self.options}
+
+    class Meta:
+        ordering = ('id',)
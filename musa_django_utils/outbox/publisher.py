@@ -0,0 +1,53 @@
+from json import dumps
+
+from ..utils.sns import SnsWrapper
+from .models import SnsOutboxEvent
+
+
+class OutboxSnsWrapper:
+    """
+    `SnsWrapper` compatible API that writes the messages in the outbox table, in the current transaction.
+
+    The messages are published by the `relay_sns_outbox` command, a rollback discards them with the transaction.
+    """
+
+    def __init__(self, topic_arn: str = None, using: str = None):
+        """
+        :param topic_arn: A SNS Topic arn.
+        :param using: The database alias of the outbox table.
+        """
+        self.topic_arn = topic_arn
+        self.using = using
+
+    def _event(self, message, attributes=None, **kwargs):
+        assert any([self.topic_arn, *[x in kwargs for x in ['topic', 'TopicArn']]])
+        assert isinstance(attributes, dict) or attributes is None
+        assert isinstance(message, (str, dict))
+
+        return SnsOutboxEvent(
+            topic_arn=kwargs.get('topic') or kwargs.get('TopicArn') or self.topic_arn,
+            message=message if isinstance(message, str) else dumps(message),
+            attributes=kwargs.get('MessageAttributes', attributes) or {},
+            options={key: kwargs[key] for key in SnsWrapper.batch_entry_keys if key in kwargs},
+        )
+
+    def publish_message(self, message, attributes=None, **kwargs):
+        """
+        Writes a message in the outbox, same arguments of `SnsWrapper.publish_message`, attributes values must be
+        JSON serializable.
+
+        :return: The ID of the outbox event.
+        """
+        event = self._event(message, attributes, **kwargs)
+        event.save(using=self.using)
+        return event.pk
+
+    def publish_batch_message(self, batch_message):
+        """
+        Writes the messages in the outbox with a single bulk insert.
+
+        :param batch_message: A list of `publish_message` kwargs.
+        """
+        events = [self._event(**kwargs) for kwargs in batch_message]
+        events = SnsOutboxEvent.objects.using(self.using).bulk_create(events)
+        return [event.pk for event in events]
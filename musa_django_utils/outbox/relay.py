@@ -0,0 +1,88 @@
+from logging import getLogger
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from ..utils.sns import SnsWrapper
+from .models import SnsOutboxEvent
+
+logger = getLogger('sns-outbox')
+
+
+class OutboxRelay:
+    """
+        Publishes the outbox events in batches
+
+        rows are locked with `SELECT ... FOR UPDATE SKIP LOCKED` while they are published, so many relays can run in
+        parallel without publishing the same event twice. published rows are removed with one `DELETE` per batch,
+        failed rows are kept with the `attempts` incremented, up to `max_attempts`, also when the publish raises
+    """
+
+    def __init__(self, wrapper: SnsWrapper = None, batch_size: int = 100, max_attempts: int = 10,
+                 using: str = DEFAULT_DB_ALIAS):
+        self.wrapper = wrapper or SnsWrapper()
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.using = using
+
+    def relay_batch(self):
+        """
+            return a tuple with the number of published and failed events
+        """
+        with transaction.atomic(using=self.using):
+            events = list(
+                SnsOutboxEvent.objects.using(self.using)
+                .select_for_update(skip_locked=True)
+                .filter(attempts__lt=self.max_attempts)
+                .order_by('id')[:self.batch_size]
+            )
+            if not events:
+                return 0, 0
+
+            result = self.publish(events)
+            published = [events[index].pk for index in result['successful']]
+            SnsOutboxEvent.objects.using(self.using).filter(pk__in=published).delete()
+
+            failed = []
+            for index, error in result['failed'].items():
+                event = events[index]
+                event.attempts += 1
+                event.last_error = f'{error.get("Code")}: {error.get("Message")}'
+                failed.append(event)
+            SnsOutboxEvent.objects.using(self.using).bulk_update(failed, ['attempts', 'last_error'])
+
+        return len(published), len(failed)
+
+    def publish(self, events):
+        """
+            `publish_batch` of the events, when it raises each event is published alone, the ones that raise fail
+        """
+        try:
+            return self.wrapper.publish_batch([event.as_publish_kwargs() for event in events])
+        except Exception:
+            logger.exception("Couldn't publish a batch of %s outbox events, publishing them one by one", len(events))
+
+        result = {'successful': {}, 'failed': {}}
+        for index, event in enumerate(events):
+            try:
+                single = self.wrapper.publish_batch([event.as_publish_kwargs()])
+            except Exception as err:
+                logger.exception("Couldn't publish the outbox event %s", event.pk)
+                result['failed'][index] = {'Code': type(err).__name__, 'Message': str(err)}
+                continue
+
+            for key in ('successful', 'failed'):
+                for value in single[key].values():
+                    result[key][index] = value
+        return result
+
+    def relay(self):
+        """
+            publish batches until the outbox is empty or a batch has only failures, return the totals
+        """
+        total_published = total_failed = 0
+        while True:
+            published, failed = self.relay_batch()
+            total_published += published
+            total_failed += failed
+            if not published:
+                return total_published, total_failed
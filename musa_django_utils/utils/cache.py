@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from threading import Lock
+from time import time
+
+
+class LRUCache:
+    """
+        Thread safe bounded LRU, with an expiration time for each entry and hit/miss counters
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None or item[1] <= time():
+                if item is not None:
+                    del self.data[key]
+                self.misses += 1
+                return default
+
+            self.data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, timeout):
+        if timeout <= 0 or self.maxsize <= 0:
+            return
+
+        with self.lock:
+            self.data[key] = (value, time() + timeout)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = 0
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.data), 'maxsize': self.maxsize}
+
+
+_caches = {}
+_caches_lock = Lock()
+
+
+def get_lru_cache(name, maxsize=1024):
+    """
+        return the process wide `LRUCache` registered with `name`, the first call creates it with `maxsize`
+    """
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(name, LRUCache(maxsize))
+
+    return cache
@@ -0,0 +1,52 @@
+from asyncio import get_running_loop
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+
+DEFAULT_CONFIG = {
+    # connections of the pool, and connections kept alive between the requests
+    'MAX_CONNECTIONS': 100,
+    'MAX_KEEPALIVE_CONNECTIONS': 20,
+    'KEEPALIVE_EXPIRY': 30,
+    # default timeout of the requests, in seconds
+    'TIMEOUT': 10,
+}
+
+# the connections of a client belong to the event loop that opened them
+_clients = WeakKeyDictionary()
+
+
+def get_config(key):
+    return getattr(settings, 'ASYNC_HTTP_CLIENT', {}).get(key, DEFAULT_CONFIG[key])
+
+
+def get_async_client():
+    """
+        `httpx.AsyncClient` of the running event loop, shared by the async requests of the package, configured by
+        `settings.ASYNC_HTTP_CLIENT` (`DEFAULT_CONFIG`)
+    """
+    loop = get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        try:
+            import httpx
+        except ModuleNotFoundError:
+            raise Exception('You need to install `httpx` to use the async requests')
+
+        limits = httpx.Limits(
+            max_connections=get_config('MAX_CONNECTIONS'),
+            max_keepalive_connections=get_config('MAX_KEEPALIVE_CONNECTIONS'),
+            keepalive_expiry=get_config('KEEPALIVE_EXPIRY'),
+        )
+        client = _clients[loop] = httpx.AsyncClient(limits=limits, timeout=get_config('TIMEOUT'))
+
+    return client
+
+
+async def aclose_async_client():
+    """
+        close the client of the running event loop, ex: in the `lifespan.shutdown` of the ASGI application
+    """
+    client = _clients.pop(get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
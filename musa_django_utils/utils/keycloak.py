@@ -1,36 +1,278 @@
-from datetime import datetime, timedelta
+from asyncio import Lock as AsyncLock, get_running_loop
+from hashlib import md5
+from logging import getLogger
+from threading import Lock, Thread
+from time import time
+from weakref import WeakKeyDictionary
 
-from requests import post
+from django.core.cache import caches
 
+from asgiref.sync import sync_to_async
 
-class Singleton(type):
+from .http import get_async_client
+
+logger = getLogger('keycloak')
+
+_session = None
+_session_lock = Lock()
+
+
+def get_session(pool_maxsize=10):
+    """
+        process wide `requests.Session`, keeping the connections with keycloak alive between the token requests
+    """
+    global _session
+    if _session is None:
+        from requests import Session
+        from requests.adapters import HTTPAdapter
+
+        with _session_lock:
+            if _session is None:
+                session = Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+
+    return _session
+
+
+class KeyCloakTokenProvider:
+    """
+        Process wide client credentials token of a keycloak client, one instance per (url, realm, client_id)
+
+        - the token is requested by one thread at a time (single flight), the others wait and reuse it
+        - `refresh_ahead` seconds before the expiration the token is refreshed by a thread (`background_refresh`),
+          the current token is served meanwhile
+        - with `cache_alias` the token is shared by the workers through the django cache
+        - `leeway` seconds are removed from the `expires_in` of keycloak, covering the clock skew and the latency
+
+        `aget_token` is the `get_token` of the event loop, requesting the token with the shared async client
+    """
     _instances = {}
+    _instances_lock = Lock()
+    _default = None
+    cache_prefix = 'musa-keycloak-token'
+
+    def __init__(self, keycloak_url, realm, client_id, client_secret, timeout=5, leeway=20, refresh_ahead=60,
+                 background_refresh=True, cache_alias=None):
+        self.keycloak_url = keycloak_url
+        self.realm = realm
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.timeout = timeout
+        self.leeway = leeway
+        self.refresh_ahead = refresh_ahead
+        self.background_refresh = background_refresh
+        self.cache_alias = cache_alias
+
+        self.access_token = None
+        self.expires_at = 0
+        self.refresh_at = 0
+        self.lock = Lock()
+        # an `asyncio.Lock` belongs to one event loop
+        self.async_locks = WeakKeyDictionary()
+        self.refreshing = False
+
+    @classmethod
+    def get_instance(cls, keycloak_url, realm, client_id, **kwargs):
+        """
+            return the provider of the client, the first call creates it with the `kwargs`
+        """
+        key = (keycloak_url, realm, client_id)
+        instance = cls._instances.get(key)
+        if instance is None:
+            with cls._instances_lock:
+                instance = cls._instances.get(key)
+                if instance is None:
+                    instance = cls._instances[key] = cls(keycloak_url, realm, client_id, **kwargs)
+                    if cls._default is None:
+                        cls._default = instance
+
+        return instance
+
+    @classmethod
+    def from_config(cls, **config):
+        """
+            provider of a config with the keys of `KeyCloakAppAuth` (lower or upper case), without the client keys
+            returns the first provider created
+        """
+        def get(key, default=None):
+            return config.get(key, config.get(key.upper(), default))
+
+        keycloak_url, realm, client_id = get('keycloak_base_url'), get('realm'), get('client_id')
+        if not (keycloak_url or realm or client_id):
+            if cls._default is None:
+                raise Exception('`keycloak_base_url`, `realm` and `client_id` are required')
+            return cls._default
+
+        return cls.get_instance(
+            keycloak_url,
+            realm,
+            client_id,
+            client_secret=get('client_secret'),
+            timeout=get('timeout', 5),
+            leeway=get('leeway', 20),
+            refresh_ahead=get('refresh_ahead', 60),
+            background_refresh=get('background_refresh', True),
+            cache_alias=get('cache_alias'),
+        )
+
+    @property
+    def token_url(self):
+        return f'{self.keycloak_url}/realms/{self.realm}/protocol/openid-connect/token'
+
+    @property
+    def cache_key(self):
+        key = f'{self.keycloak_url}:{self.realm}:{self.client_id}'
+        return f'{self.cache_prefix}:{md5(key.encode()).hexdigest()}'
+
+    def get_token(self):
+        now = time()
+        if self.expires_at <= now:
+            self.refresh()
+        elif self.refresh_at <= now:
+            self.expiring()
+
+        return self.access_token
+
+    async def aget_token(self):
+        now = time()
+        if self.expires_at <= now or (self.refresh_at <= now and not self.background_refresh):
+            await self.arefresh()
+        elif self.refresh_at <= now:
+            self.refresh_in_background(blocking=False)
 
-    def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
-        return cls._instances[cls]
+        return self.access_token
 
+    def expiring(self):
+        if not self.background_refresh:
+            return self.refresh()
 
-class KeyCloakAppAuth(metaclass=Singleton):
-    _token = None
-    _expires = datetime.min
+        self.refresh_in_background()
+
+    def refresh_in_background(self, blocking=True):
+        # the event loop doesn't wait the lock, held by the refresh in progress
+        if not self.lock.acquire(blocking):
+            return
+        try:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        finally:
+            self.lock.release()
+
+        Thread(target=self.refresh, name='keycloak-token-refresh', daemon=True).start()
+
+    def refresh(self, force=False):
+        with self.lock:
+            try:
+                # single flight, other thread can refresh the token while this one is waiting the lock
+                if not force and self.refresh_at > time():
+                    return
+
+                self.access_token, self.expires_at, self.refresh_at = self.load(force)
+            except Exception:
+                if self.expires_at <= time():
+                    raise
+                logger.exception('Cannot refresh the token of %s, using the current token', self.client_id)
+                self.refresh_at = min(time() + self.leeway, self.expires_at)
+            finally:
+                self.refreshing = False
+
+    def get_async_lock(self):
+        loop = get_running_loop()
+        lock = self.async_locks.get(loop)
+        if lock is None:
+            lock = self.async_locks[loop] = AsyncLock()
+
+        return lock
+
+    async def arefresh(self, force=False):
+        async with self.get_async_lock():
+            try:
+                if not force and self.refresh_at > time():
+                    return
+
+                self.access_token, self.expires_at, self.refresh_at = await self.aload(force)
+            except Exception:
+                if self.expires_at <= time():
+                    raise
+                logger.exception('Cannot refresh the token of %s, using the current token', self.client_id)
+                self.refresh_at = min(time() + self.leeway, self.expires_at)
+
+    def load(self, force=False):
+        cache = caches[self.cache_alias] if self.cache_alias else None
+        if cache is not None and not force:
+            data = cache.get(self.cache_key)
+            if data and data['refresh_at'] > time():
+                return data['access_token'], data['expires_at'], data['refresh_at']
+
+        data = self.parse(self.request_token(), time())
+        if cache is not None:
+            cache.set(self.cache_key, data, data['expires_at'] - time())
+
+        return data['access_token'], data['expires_at'], data['refresh_at']
+
+    async def aload(self, force=False):
+        cache = caches[self.cache_alias] if self.cache_alias else None
+        if cache is not None and not force:
+            data = await sync_to_async(cache.get, thread_sensitive=False)(self.cache_key)
+            if data and data['refresh_at'] > time():
+                return data['access_token'], data['expires_at'], data['refresh_at']
+
+        data = self.parse(await self.arequest_token(), time())
+        if cache is not None:
+            await sync_to_async(cache.set, thread_sensitive=False)(self.cache_key, data, data['expires_at'] - time())
+
+        return data['access_token'], data['expires_at'], data['refresh_at']
+
+    @property
+    def token_data(self):
+        return {'grant_type': 'client_credentials', 'client_id': self.client_id, 'client_secret': self.client_secret}
+
+    def request_token(self):
+        response = get_session().post(self.token_url, data=self.token_data, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def arequest_token(self):
+        response = await get_async_client().post(self.token_url, data=self.token_data, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def parse(self, response, requested_at):
+        lifetime = max(response['expires_in'] - self.leeway, 0)
+        expires_at = requested_at + lifetime
+        return {
+            'access_token': response['access_token'],
+            'expires_at': expires_at,
+            'refresh_at': expires_at - min(self.refresh_ahead, lifetime / 2),
+        }
+
+
+class KeyCloakAppAuth:
+    """
+        client credentials token of a keycloak client, kept by `KeyCloakTokenProvider` (instances of the same client
+        share the token, an instance created without the client keys uses the first client configured)
+
+        keys: `keycloak_base_url`, `realm`, `client_id`, `client_secret` and optional `timeout`, `leeway`,
+        `refresh_ahead`, `background_refresh`, `cache_alias` (lower or upper case)
+    """
 
     def __init__(self, **kwargs) -> None:
-        self.keycloak_url = kwargs.get('keycloak_base_url') or kwargs.get('KEYCLOAK_BASE_URL')
-        self.realm = kwargs.get('realm') or kwargs.get('REALM')
-        self.client_id = kwargs.get('client_id') or kwargs.get('CLIENT_ID')
-        self.client_secret = kwargs.get('client_secret') or kwargs.get('CLIENT_SECRET')
+        self.provider = KeyCloakTokenProvider.from_config(**kwargs)
+        self.keycloak_url = self.provider.keycloak_url
+        self.realm = self.provider.realm
+        self.client_id = self.provider.client_id
+        self.client_secret = self.provider.client_secret
 
     def renew_token(self):
-        url = f'{self.keycloak_url}/realms/{self.realm}/protocol/openid-connect/token'
-        data = {"grant_type":  "client_credentials", "client_id": self.client_id, "client_secret": self.client_secret}
-        res = post(url, data=data, timeout=5).json()
-        self._token = res['access_token']
-        self._expires = datetime.now() + timedelta(seconds=res['expires_in'] - 20)
+        self.provider.refresh(force=True)
 
     @property
     def token(self):
-        if self._expires < datetime.now():
-            self.renew_token()
-        return self._token
+        return self.provider.get_token()
+
+    async def atoken(self):
+        return await self.provider.aget_token()
@@ -1,22 +1,63 @@
-from asyncio import gather
+from asyncio import Lock, Semaphore, gather, sleep as asleep
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from importlib import import_module
+from importlib.util import find_spec
+from json import dumps
 from logging import getLogger
+from sys import modules
+from time import sleep
 
-import boto3
-from asgiref.sync import async_to_sync, sync_to_async
-from botocore import exceptions
+from asgiref.sync import sync_to_async
 
 logger = getLogger('sns-events')
 
+# boto3 is imported by the first client created (PEP 562), the clients and the error handlers read `boto3` and
+# `exceptions` from this module, so the patched ones (ex: `mock.patch('musa_django_utils.utils.sns.boto3')`) are used
+_lazy_modules = {'boto3': 'boto3', 'exceptions': 'botocore.exceptions'}
+
+
+def __getattr__(name):
+    if name not in _lazy_modules:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    return import_module(_lazy_modules[name])
+
+
+def _lazy(name):
+    # a patched attribute is in the module globals, otherwise `__getattr__` imports it
+    return getattr(modules[__name__], name)
+
+
+def create_client(max_pool_connections):
+    from botocore.config import Config
+
+    return _lazy('boto3').client('sns', config=Config(max_pool_connections=max_pool_connections))
+
 
 class SnsWrapper:
     """Encapsulates Amazon SNS topic and subscription functions."""
 
-    def __init__(self, topic_arn: str = None):
+    batch_size = 10  # max entries of a `PublishBatch` call
+    batch_max_bytes = 256 * 1024  # max aggregate payload of a `PublishBatch` call
+    batch_entry_keys = ('Subject', 'MessageStructure', 'MessageDeduplicationId', 'MessageGroupId')
+    # endpoints and phone numbers can't be targets of `PublishBatch`, published by `publish_message`
+    direct_keys = ('TargetArn', 'PhoneNumber')
+    # errors of the whole call retried even when the sender is blamed
+    retryable_errors = (
+        'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled', 'TooManyRequestsException',
+        'KMSThrottling', 'InternalError', 'InternalFailure', 'ServiceUnavailable',
+    )
+
+    def __init__(self, topic_arn: str = None, client=None, max_pool_connections: int = 10):
         """
         :param topic_arn: A SNS Topic arn.
+        :param client: A boto3 SNS client, ex: a stubbed client or a client of a local endpoint.
+        :param max_pool_connections: Size of the client connection pool, limits the concurrent batch calls.
         """
-        self.client = boto3.client('sns')
+        self.client = client or create_client(max_pool_connections)
         self.topic_arn = topic_arn
+        self.max_pool_connections = max_pool_connections
 
     @staticmethod
     def _parser_attributes(attributes):
@@ -50,15 +91,341 @@ class SnsWrapper:
                            must be either `str` or `bytes`.
         :return: The ID of the message.
         """
+        exceptions = _lazy('exceptions')
+
+        kwargs = self._publish_kwargs(message, attributes, kwargs)
+        try:
+            response = self.client.publish(Message=message, **kwargs)
+            message_id = response['MessageId']
+            logger.info('Published message in topic %s. with message_id %s', kwargs.get('TopicArn'), message_id)
+        except exceptions.ClientError:
+            logger.exception("Couldn't publish message to topic %s.", kwargs.get('TopicArn'))
+            raise
+        else:
+            return message_id
+
+    def validate_message(self, message, attributes=None, **kwargs):
+        """
+        Checks the `publish_message` arguments, without publishing.
+        """
         assert any([self.topic_arn, *[x in kwargs for x in ['topic', 'TopicArn', 'TargetArn', 'PhoneNumber']]])
         assert isinstance(attributes, dict) or attributes is None
         assert isinstance(message, (str, dict))
 
+    def _publish_kwargs(self, message, attributes, kwargs):
+        """
+        Validates the `publish_message` arguments.
+
+        :return: The kwargs of the `Publish` call, without the message.
+        """
+        self.validate_message(message, attributes, **kwargs)
+
         kwargs['TopicArn'] = kwargs.pop('topic', self.topic_arn)
         kwargs['MessageAttributes'] = self._parser_attributes(kwargs.get('MessageAttributes', attributes))
+        return kwargs
+
+    def _batch_entry(self, index, message, attributes=None, **kwargs):
+        """
+        Converts the `publish_message` arguments in a `PublishBatch` entry.
+
+        :return: The topic and the entry.
+        """
+        assert any([self.topic_arn, *[x in kwargs for x in ['topic', 'TopicArn']]])
+        assert isinstance(message, (str, dict))
+
+        entry = {'Id': str(index), 'Message': message if isinstance(message, str) else dumps(message)}
+        message_attributes = self._parser_attributes(kwargs.get('MessageAttributes', attributes))
+        if message_attributes:
+            entry['MessageAttributes'] = message_attributes
+        entry.update({key: kwargs[key] for key in self.batch_entry_keys if key in kwargs})
+
+        return kwargs.get('topic') or kwargs.get('TopicArn') or self.topic_arn, entry
+
+    def _publish_chunks(self, topic, chunks):
+        """
+        Publishes chunks of entries of a topic, one `PublishBatch` call per chunk.
+
+        :return: The successful (index => message id) and failed (index => error) entries.
+        """
+        exceptions = _lazy('exceptions')
+
+        successful, failed = {}, {}
+        for entries in chunks:
+            try:
+                response = self.client.publish_batch(TopicArn=topic, PublishBatchRequestEntries=entries)
+            except (exceptions.ClientError, exceptions.BotoCoreError) as err:
+                self._chunk_failed(topic, entries, err, failed)
+            else:
+                self._chunk_published(response, successful, failed)
+
+        logger.info('Published %s messages in topic %s. with %s failures', len(successful), topic, len(failed))
+        return successful, failed
+
+    @classmethod
+    def _call_error(cls, err):
+        """
+        Converts the error of a call in a `PublishBatch` failed entry. Connection errors, throttling and server
+        errors are retried, the other client errors (invalid parameters, authorization) are sender faults.
+        """
+        if not hasattr(err, 'response'):  # `BotoCoreError`, ex: `EndpointConnectionError`
+            return {'Code': type(err).__name__, 'Message': str(err), 'SenderFault': False}
+
+        error = dict(err.response.get('Error', {}))
+        status = err.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 500
+        if error.get('Code') in cls.retryable_errors:
+            sender_fault = False
+        elif 'Type' in error:
+            sender_fault = error['Type'] == 'Sender'
+        else:
+            sender_fault = 400 <= status < 500
+
+        return {**error, 'SenderFault': sender_fault}
+
+    @classmethod
+    def _chunk_failed(cls, topic, entries, err, failed):
+        logger.exception("Couldn't publish batch to topic %s.", topic)
+        error = cls._call_error(err)
+        failed.update({int(entry['Id']): {**error, 'Id': entry['Id']} for entry in entries})
+
+    @staticmethod
+    def _chunk_published(response, successful, failed):
+        successful.update({int(item['Id']): item['MessageId'] for item in response.get('Successful', [])})
+        failed.update({int(item['Id']): item for item in response.get('Failed', [])})
+
+    def _pending_entries(self, batch_message):
+        """
+        :return: The `PublishBatch` entries of each topic, and the `publish_message` kwargs (by index) of the messages
+                 sent to endpoints or phone numbers.
+        """
+        pending, direct = {}, {}
+        for index, kwargs in enumerate(batch_message):
+            if any(key in kwargs for key in self.direct_keys):
+                direct[index] = kwargs
+                continue
+
+            topic, entry = self._batch_entry(index, **kwargs)
+            pending.setdefault(topic, []).append(entry)
+
+        return pending, direct
+
+    @staticmethod
+    def _entry_size(entry):
+        """
+        :return: The payload size of an entry (message, subject and attributes), in bytes.
+        """
+        size = len(entry['Message'].encode()) + len(entry.get('Subject', '').encode())
+        for name, attribute in entry.get('MessageAttributes', {}).items():
+            value = attribute.get('StringValue', attribute.get('BinaryValue', b''))
+            size += len(name.encode()) + len(attribute['DataType'].encode())
+            size += len(value.encode() if isinstance(value, str) else value)
+
+        return size
+
+    def _chunks(self, entries):
+        """
+        Splits entries in chunks of up to `batch_size` entries and `batch_max_bytes` of payload, an entry larger than
+        the limit is sent alone (and rejected by SNS as the same `Publish` call).
+        """
+        chunks, chunk, chunk_bytes = [], [], 0
+        for entry in entries:
+            size = self._entry_size(entry)
+            if chunk and (len(chunk) == self.batch_size or chunk_bytes + size > self.batch_max_bytes):
+                chunks.append(chunk)
+                chunk, chunk_bytes = [], 0
+            chunk.append(entry)
+            chunk_bytes += size
+
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    @staticmethod
+    def _direct_kwargs(kwargs):
+        message = kwargs['message']
+        return {**kwargs, 'message': message if isinstance(message, str) else dumps(message)}
+
+    def _publish_direct(self, index, kwargs):
+        """
+        Publishes a message of a batch with `publish_message`.
+
+        :return: The successful and failed entry, as `_publish_chunks`.
+        """
+        exceptions = _lazy('exceptions')
 
         try:
-            response = self.client.publish(Message=message, **kwargs)
+            return {index: self.publish_message(**self._direct_kwargs(kwargs))}, {}
+        except (exceptions.ClientError, exceptions.BotoCoreError) as err:
+            return {}, {index: {**self._call_error(err), 'Id': str(index)}}
+
+    def _batch_tasks(self, pending):
+        """
+        Splits the entries of each topic in chunks, the chunks of FIFO topics are kept in one task to keep the order.
+
+        :return: A list of (topic, chunks).
+        """
+        tasks = []
+        for topic, entries in pending.items():
+            chunks = self._chunks(entries)
+            if topic.endswith('.fifo'):
+                tasks.append((topic, chunks))
+            else:
+                tasks.extend((topic, [chunk]) for chunk in chunks)
+
+        return tasks
+
+    @staticmethod
+    def _merge_results(tasks, results, successful, failed):
+        """
+        Merges the results of the tasks of an attempt.
+
+        :return: The entries to retry of each topic.
+        """
+        retry = {}
+        for (topic, chunks), (ok, errors) in zip(tasks, results):
+            successful.update(ok)
+            for entries in chunks:
+                for entry in entries:
+                    index = int(entry['Id'])
+                    failed.pop(index, None)
+                    if index in errors:
+                        failed[index] = errors[index]
+                        if not errors[index].get('SenderFault'):
+                            retry.setdefault(topic, []).append(entry)
+
+        return retry
+
+    def publish_batch(self, batch_message, max_retries: int = 2, retry_delay: float = 0.1):
+        """
+        Publishes messages with `PublishBatch` calls of up to 10 entries (and 256KB) per topic. The calls run
+        concurrently, limited by the client connection pool (calls of FIFO topics run in sequence to keep the order).
+        Failed entries are retried, except the sender faults. Messages with `TargetArn` or `PhoneNumber` are published
+        once by `publish_message`.
+
+        :param batch_message: A list of `publish_message` kwargs.
+        :param max_retries: Max retries of the failed entries.
+        :param retry_delay: Delay before the first retry, doubled on each retry.
+        :return: A dict with the `successful` (index => message id) and `failed` (index => error) entries.
+        """
+        pending, direct = self._pending_entries(batch_message)
+        successful, failed = {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_pool_connections) as executor:
+            direct_results = [executor.submit(self._publish_direct, index, kwargs) for index, kwargs in direct.items()]
+            for attempt in range(max_retries + 1):
+                tasks = self._batch_tasks(pending)
+                results = executor.map(lambda task: self._publish_chunks(*task), tasks)
+                retry = self._merge_results(tasks, results, successful, failed)
+
+                if not retry or attempt == max_retries:
+                    break
+
+                pending = retry
+                sleep(retry_delay * 2 ** attempt)
+
+            for future in direct_results:
+                ok, errors = future.result()
+                successful.update(ok)
+                failed.update(errors)
+
+        return {'successful': successful, 'failed': failed}
+
+    async def apublish_batch(self, batch_message, **kwargs):
+        return await sync_to_async(self.publish_batch, thread_sensitive=False)(batch_message, **kwargs)
+
+    @staticmethod
+    def _batch_message_ids(batch_message, result):
+        if result['failed']:
+            exceptions = _lazy('exceptions')
+
+            error = next(iter(result['failed'].values()))
+            raise exceptions.ClientError({'Error': error}, 'PublishBatch')
+
+        return [result['successful'][index] for index in range(len(batch_message))]
+
+    async def _apublish_batch_message(self, batch_message):
+        return self._batch_message_ids(batch_message, await self.apublish_batch(batch_message))
+
+    def publish_batch_message(self, batch_message):
+        return self._batch_message_ids(batch_message, self.publish_batch(batch_message))
+
+
+class AsyncSnsWrapper(SnsWrapper):
+    """
+    `SnsWrapper` of the event loop. With `aiobotocore` installed the calls are made by an async client, created on
+    the first call (or the `async_client` given), without it the calls run in threads as `SnsWrapper.apublish_batch`.
+    """
+
+    def __init__(self, topic_arn: str = None, client=None, async_client=None, max_pool_connections: int = 10):
+        """
+        :param topic_arn: A SNS Topic arn.
+        :param client: A boto3 SNS client, the calls run in threads when it is given.
+        :param async_client: An aiobotocore SNS client, ex: a client of a local endpoint.
+        :param max_pool_connections: Size of the client connection pool, limits the concurrent batch calls.
+        """
+        self.native = async_client is not None or (client is None and find_spec('aiobotocore') is not None)
+        if self.native:
+            self.client = None
+            self.topic_arn = topic_arn
+            self.max_pool_connections = max_pool_connections
+        else:
+            super().__init__(topic_arn, client, max_pool_connections)
+
+        self.async_client = async_client
+        self._exit_stack = None
+        self._client_lock = None
+
+    async def get_async_client(self):
+        if self.async_client is None:
+            if self._client_lock is None:
+                self._client_lock = Lock()
+
+            async with self._client_lock:
+                if self.async_client is None:
+                    from aiobotocore.config import AioConfig
+                    from aiobotocore.session import get_session
+
+                    config = AioConfig(max_pool_connections=self.max_pool_connections)
+                    self._exit_stack = AsyncExitStack()
+                    self.async_client = await self._exit_stack.enter_async_context(
+                        get_session().create_client('sns', config=config)
+                    )
+
+        return self.async_client
+
+    async def aclose(self):
+        """
+        Closes the async client created by the wrapper.
+        """
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._exit_stack = self.async_client = None
+
+    def _check_sync(self, method):
+        if self.native:
+            raise TypeError(f'`AsyncSnsWrapper` with an async client has no sync client, use `a{method}`')
+
+    def publish_message(self, message, attributes=None, **kwargs):
+        self._check_sync('publish_message')
+        return super().publish_message(message, attributes, **kwargs)
+
+    def publish_batch(self, batch_message, max_retries: int = 2, retry_delay: float = 0.1):
+        self._check_sync('publish_batch')
+        return super().publish_batch(batch_message, max_retries, retry_delay)
+
+    async def apublish_message(self, message, attributes=None, **kwargs):
+        """
+        `publish_message` of the event loop.
+
+        :return: The ID of the message.
+        """
+        if not self.native:
+            return await sync_to_async(self.publish_message, thread_sensitive=False)(message, attributes, **kwargs)
+
+        exceptions = _lazy('exceptions')
+
+        kwargs = self._publish_kwargs(message, attributes, kwargs)
+        client = await self.get_async_client()
+        try:
+            response = await client.publish(Message=message, **kwargs)
             message_id = response['MessageId']
             logger.info('Published message in topic %s. with message_id %s', kwargs.get('TopicArn'), message_id)
         except exceptions.ClientError:
@@ -67,10 +434,62 @@ class SnsWrapper:
         else:
             return message_id
 
-    async def _apublish_batch_message(self, batch_message):
-        _func = sync_to_async(self.publish_message)
-        tasks = [_func(**m) for m in batch_message]
-        return await gather(*tasks)
+    async def _apublish_chunks(self, client, topic, chunks):
+        exceptions = _lazy('exceptions')
 
-    def publish_batch_message(self, batch_message):
-        return async_to_sync(self._apublish_batch_message)(batch_message)
+        successful, failed = {}, {}
+        for entries in chunks:
+            try:
+                response = await client.publish_batch(TopicArn=topic, PublishBatchRequestEntries=entries)
+            except (exceptions.ClientError, exceptions.BotoCoreError) as err:
+                self._chunk_failed(topic, entries, err, failed)
+            else:
+                self._chunk_published(response, successful, failed)
+
+        logger.info('Published %s messages in topic %s. with %s failures', len(successful), topic, len(failed))
+        return successful, failed
+
+    async def _apublish_direct(self, index, kwargs):
+        exceptions = _lazy('exceptions')
+
+        try:
+            return {index: await self.apublish_message(**self._direct_kwargs(kwargs))}, {}
+        except (exceptions.ClientError, exceptions.BotoCoreError) as err:
+            return {}, {index: {**self._call_error(err), 'Id': str(index)}}
+
+    async def apublish_batch(self, batch_message, max_retries: int = 2, retry_delay: float = 0.1):
+        """
+        `publish_batch` of the event loop, the calls run concurrently limited by `max_pool_connections`.
+        """
+        if not self.native:
+            return await super().apublish_batch(batch_message, max_retries=max_retries, retry_delay=retry_delay)
+
+        client = await self.get_async_client()
+        semaphore = Semaphore(self.max_pool_connections)
+
+        async def publish(topic, chunks):
+            async with semaphore:
+                return await self._apublish_chunks(client, topic, chunks)
+
+        async def publish_direct(index, kwargs):
+            async with semaphore:
+                return await self._apublish_direct(index, kwargs)
+
+        pending, direct = self._pending_entries(batch_message)
+        successful, failed = {}, {}
+        for attempt in range(max_retries + 1):
+            tasks = self._batch_tasks(pending)
+            results = await gather(*(publish(*task) for task in tasks))
+            retry = self._merge_results(tasks, results, successful, failed)
+
+            if not retry or attempt == max_retries:
+                break
+
+            pending = retry
+            await asleep(retry_delay * 2 ** attempt)
+
+        for ok, errors in await gather(*(publish_direct(index, kwargs) for index, kwargs in direct.items())):
+            successful.update(ok)
+            failed.update(errors)
+
+        return {'successful': successful, 'failed': failed}
@@ -0,0 +1,271 @@
+from atexit import register
+from json import dumps, loads
+from logging import getLogger
+from os import getpid, remove, replace
+from os.path import exists
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+from time import time
+
+from django.db import transaction
+
+from .sns import SnsWrapper
+
+logger = getLogger('sns-events')
+
+
+class BufferedSnsPublisher:
+    """
+    Publishes the messages of a `SnsWrapper` from a background thread, `publish_message` enqueues and returns.
+
+    The queue is flushed with `publish_batch` when it has `flush_size` messages, each `flush_interval` seconds and
+    at exit. When the queue is full the `overflow` policy is applied:
+        - `block`: waits up to `block_timeout` seconds for space, then drops the message
+        - `drop`: drops the message
+        - `spill`: appends the message to the `spill_path` file (JSON lines), enqueued again when the queue has
+          space. Messages that aren't JSON serializable (ex: `bytes` attributes) are dropped. A spill file left by
+          another process or a previous run is drained when the worker starts
+    """
+    overflow_policies = ('block', 'drop', 'spill')
+
+    def __init__(self, wrapper: SnsWrapper = None, max_size: int = 10000, flush_size: int = 100,
+                 flush_interval: float = 1.0, overflow: str = 'block', block_timeout: float = 5.0,
+                 spill_path: str = None, max_retries: int = 2):
+        """
+        :param wrapper: The `SnsWrapper` used to publish, a new one is created by default.
+        :param max_size: Max messages in the queue.
+        :param flush_size: Messages in the queue that wake up the worker, and size of each `publish_batch`.
+        :param flush_interval: Max seconds between flushes.
+        :param overflow: Policy applied when the queue is full, `block`, `drop` or `spill`.
+        :param block_timeout: Max seconds to wait for space in the queue, with the `block` policy.
+        :param spill_path: File of the spilled messages, required by the `spill` policy.
+        :param max_retries: Retries of the failed entries of each batch.
+        """
+        assert overflow in self.overflow_policies
+        assert overflow != 'spill' or spill_path
+
+        self.wrapper = wrapper or SnsWrapper()
+        self.queue = Queue(max_size)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.spill_path = spill_path
+        self.max_retries = max_retries
+
+        self.counters = dict.fromkeys(('enqueued', 'published', 'failed', 'dropped', 'spilled'), 0)
+        self.latency = {'last_flush_ms': 0.0, 'total_ms': 0.0, 'max_ms': 0.0}
+        self.spilled_pending = 0
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._wakeup = Event()
+        self._stop = Event()
+        self._thread = None
+        self._pid = None
+        register(self.close)
+
+    def start(self):
+        with self._lock:
+            # the worker thread is not copied by `fork`, each process starts its own
+            if self._thread is not None and self._thread.is_alive() and self._pid == getpid():
+                return
+
+            self._stop.clear()
+            self._pid = getpid()
+            self._thread = Thread(target=self._run, name='sns-buffered-publisher', daemon=True)
+            self._thread.start()
+            if self.spill_path and exists(self.spill_path):
+                self._wakeup.set()
+
+    def close(self, timeout: float = 10.0):
+        """
+        Stops the worker, flushing the queue.
+        """
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == getpid():
+            self._thread.join(timeout)
+
+    def publish_message(self, message, attributes=None, **kwargs):
+        """
+        Enqueues a message, same arguments of `SnsWrapper.publish_message`, which are validated here.
+
+        :return: False when the message was dropped.
+        """
+        self.wrapper.validate_message(message, attributes, **kwargs)
+        if self._pid != getpid() or self._thread is None or not self._thread.is_alive():
+            self.start()
+
+        item = (time(), {'message': message, 'attributes': attributes, **kwargs})
+        try:
+            self.queue.put_nowait(item)
+        except Full:
+            return self._overflow(item)
+
+        self._count('enqueued')
+        if self.queue.qsize() >= self.flush_size:
+            self._wakeup.set()
+        return True
+
+    def publish_on_commit(self, message, attributes=None, using=None, **kwargs):
+        """
+        Enqueues the message when the current transaction commits, the worker is woken to flush it.
+        """
+        self.wrapper.validate_message(message, attributes, **kwargs)
+
+        def enqueue():
+            self.publish_message(message, attributes, **kwargs)
+            self._wakeup.set()
+
+        transaction.on_commit(enqueue, using=using)
+
+    def flush(self):
+        """
+        Publishes all messages of the queue (and spill file) in the current thread.
+        """
+        with self._flush_lock:
+            self._unspill()
+            while not self.queue.empty():
+                items = []
+                while len(items) < self.flush_size:
+                    try:
+                        items.append(self.queue.get_nowait())
+                    except Empty:
+                        break
+                self._publish(items)
+                self._unspill()
+
+    def metrics(self):
+        published = self.counters['published'] or 1
+        return {
+            'queue_depth': self.queue.qsize(),
+            'spilled_depth': self.spilled_pending,
+            **self.counters,
+            'last_flush_ms': self.latency['last_flush_ms'],
+            'avg_latency_ms': self.latency['total_ms'] / published,
+            'max_latency_ms': self.latency['max_ms'],
+        }
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Couldn't flush the buffered messages")
+
+        self.flush()
+
+    def _publish(self, items):
+        started_at = time()
+        try:
+            result = self.wrapper.publish_batch([kwargs for _, kwargs in items], max_retries=self.max_retries)
+        except Exception:
+            logger.exception("Couldn't publish a batch of %s buffered messages, publishing them one by one", len(items))
+            result = self._publish_each(items)
+        finished_at = time()
+
+        for index in result['failed']:
+            logger.error("Couldn't publish buffered message %s", items[index][1])
+
+        with self._lock:
+            self.counters['published'] += len(result['successful'])
+            self.counters['failed'] += len(result['failed'])
+            self.latency['last_flush_ms'] = (finished_at - started_at) * 1000
+            for index in result['successful']:
+                latency = (finished_at - items[index][0]) * 1000
+                self.latency['total_ms'] += latency
+                self.latency['max_ms'] = max(self.latency['max_ms'], latency)
+
+    def _publish_each(self, items):
+        """
+        Publishes each message in its own batch, a message that raises fails alone.
+        """
+        result = {'successful': {}, 'failed': {}}
+        for index, (_, kwargs) in enumerate(items):
+            try:
+                single = self.wrapper.publish_batch([kwargs], max_retries=self.max_retries)
+            except Exception as err:
+                logger.exception("Couldn't publish buffered message %s", kwargs)
+                result['failed'][index] = {
+                    'Id': str(index), 'Code': type(err).__name__, 'Message': str(err), 'SenderFault': True,
+                }
+                continue
+
+            for key in ('successful', 'failed'):
+                for value in single[key].values():
+                    result[key][index] = value
+        return result
+
+    def _overflow(self, item):
+        if self.overflow == 'block':
+            try:
+                self.queue.put(item, timeout=self.block_timeout)
+                self._count('enqueued')
+                return True
+            except Full:
+                pass
+
+        elif self.overflow == 'spill':
+            try:
+                self._spill([item])
+            except (TypeError, ValueError):
+                logger.exception("Couldn't spill the message %s", item[1])
+            else:
+                self._count('spilled')
+                return True
+
+        logger.warning('Buffered SNS queue is full, message dropped')
+        self._count('dropped')
+        return False
+
+    def _spill(self, items):
+        # encoded before opening the file, one write, the file can be shared by forked processes
+        lines = ''.join(f'{dumps(item)}\n' for item in items)
+        with self._lock:
+            with open(self.spill_path, 'a') as spill:
+                spill.write(lines)
+            self.spilled_pending += len(items)
+
+    def _unspill(self):
+        """
+        Moves spilled messages to the queue, up to the free space, the others are spilled again.
+
+        The spill file can be shared by forked processes (and left by a previous run), the process that renames it
+        enqueues all its messages.
+        """
+        if not self.spill_path or self.queue.full() or not exists(self.spill_path):
+            return
+
+        flushing = f'{self.spill_path}.{getpid()}.flushing'
+        with self._lock:
+            self.spilled_pending = 0
+            try:
+                replace(self.spill_path, flushing)
+            except FileNotFoundError:
+                # already taken by another process
+                return
+
+        items = []
+        with open(flushing) as spill:
+            for line in spill:
+                try:
+                    enqueued_at, kwargs = loads(line)
+                except (TypeError, ValueError):
+                    # ex: a line cut by a process killed while writing
+                    logger.error("Couldn't read the spilled message %s", line)
+                    continue
+                items.append((enqueued_at, kwargs))
+        remove(flushing)
+
+        for index, item in enumerate(items):
+            try:
+                self.queue.put_nowait(item)
+            except Full:
+                self._spill(items[index:])
+                break
@@ -14,12 +14,16 @@ setup(
     author='Shinneider Libanio da Silva',
     author_email='shinneider@musa.co',
     url='https://github.com/Musatech/django-utils',
-    packages=find_packages(exclude=['tests*']),
+    packages=find_packages(exclude=['tests*', 'benchmarks*']),
     include_package_data=True,
     python_requires=">=3.7",
     install_requires=[
         'django',
     ],
+    extras_require={
+        # faster `hash_algorithm = 'xxhash'` of the serializers, blake2b is used without it
+        'xxhash': ['xxhash'],
+    },
     classifiers=[
         'Development Status :: 4 - Beta',
         'Environment :: Web Environment',
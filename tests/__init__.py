@@ -0,0 +1,7 @@
+"""
+    Tests of the package, not shipped in the distribution
+
+    run from the repository root with `python -m pytest tests`, uses an in memory sqlite database by default, set
+    `TEST_DATABASE=postgres` (and the libpq `PG*` environment variables) to run against a local postgres, the postgres
+    only tests are skipped on sqlite
+"""
@@ -0,0 +1,40 @@
+from os import environ
+
+import django
+from django.conf import settings
+
+import pytest
+
+
+def pytest_configure():
+    if environ.get('TEST_DATABASE') == 'postgres':
+        database = {'ENGINE': 'django.db.backends.postgresql', 'NAME': environ.get('PGDATABASE', 'postgres')}
+    else:
+        database = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+
+    settings.configure(
+        SECRET_KEY='tests',
+        USE_TZ=True,
+        DATABASES={'default': database},
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes',
+            'django.contrib.auth',
+            'musa_django_utils.django',
+            'musa_django_utils.outbox',
+            'tests',
+        ],
+        DEFAULT_AUTO_FIELD='django.db.models.AutoField',
+    )
+    django.setup()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def test_database():
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    yield
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+    teardown_test_environment()
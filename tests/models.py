@@ -0,0 +1,57 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models
+
+from musa_django_utils.django.models import LiveSoftDeleteModel
+
+
+class Folder(LiveSoftDeleteModel):
+    name = models.CharField(max_length=20)
+
+    archive = True
+
+
+class Document(LiveSoftDeleteModel):
+    folder = models.ForeignKey(Folder, models.CASCADE, related_name='documents')
+    name = models.CharField(max_length=20)
+
+    archive = True
+
+
+class Drawer(LiveSoftDeleteModel):
+    archive = True
+
+
+class Sock(models.Model):
+    drawer = models.ForeignKey(Drawer, models.CASCADE, related_name='socks')
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=20)
+
+
+class Book(models.Model):
+    author = models.ForeignKey(Author, models.CASCADE, related_name='books')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=20)
+    authors = models.ManyToManyField(Author, related_name='tags')
+
+
+class Shelf(models.Model):
+    """
+        a mixed case table name, as set by the models of legacy databases
+    """
+
+    class Meta:
+        db_table = 'tests_Shelf'
+
+
+class Article(models.Model):
+    tags = ArrayField(models.CharField(max_length=20), default=list)
+
+    class Meta:
+        required_db_vendor = 'postgresql'
+        indexes = [GinIndex(fields=['tags'], name='tests_article_tags_gin')]
@@ -0,0 +1,110 @@
+from asyncio import gather, run, sleep
+from unittest import TestCase, mock
+
+from django.test import SimpleTestCase, override_settings
+
+from rest_framework.test import APIRequestFactory
+
+from musa_django_utils.drf.authentication.jwks import JwksCache
+from musa_django_utils.utils.http import get_async_client
+from musa_django_utils.utils.keycloak import KeyCloakTokenProvider
+from musa_django_utils.utils.sns import AsyncSnsWrapper
+
+from .test_jwks import JWK_URL, jwk
+from .test_jwt import KEYS, TokenAuthentication, token
+from .test_sns import TOPIC, BatchClient
+
+
+class AsyncBatchClient(BatchClient):
+
+    async def publish_batch(self, **kwargs):
+        await sleep(0)
+        return super().publish_batch(**kwargs)
+
+    async def publish(self, **kwargs):
+        return super().publish(**kwargs)
+
+
+class AsyncRefreshTestCase(TestCase):
+
+    def test_concurrent_jwks_requests_fetch_once_per_loop(self):
+        calls = []
+
+        async def afetch(jwk_url):
+            calls.append(jwk_url)
+            await sleep(0.01)
+            return [jwk('a')], None
+
+        async def get_keys(jwks):
+            return await gather(*(jwks.aget_key('a') for _ in range(10)))
+
+        jwks = JwksCache(JWK_URL)
+        with mock.patch('musa_django_utils.drf.authentication.jwks.afetch_well_know_keys', afetch):
+            # the lock of each event loop, ex: the loop of each test of an async test suite
+            for _ in range(2):
+                jwks.expires_at = 0
+                self.assertEqual(run(get_keys(jwks)), [jwk('a')] * 10)
+
+        self.assertEqual(len(calls), 2)
+
+    def test_concurrent_keycloak_requests_request_once(self):
+        calls = []
+
+        async def arequest_token():
+            calls.append(1)
+            await sleep(0.01)
+            return {'access_token': 'token', 'expires_in': 300}
+
+        async def get_tokens(provider):
+            return await gather(*(provider.aget_token() for _ in range(10)))
+
+        provider = KeyCloakTokenProvider('https://auth.example.com', 'realm', 'client', 'secret')
+        with mock.patch.object(provider, 'arequest_token', arequest_token):
+            self.assertEqual(run(get_tokens(provider)), ['token'] * 10)
+            self.assertEqual(run(get_tokens(provider)), ['token'] * 10)
+
+        self.assertEqual(len(calls), 1)
+
+    def test_async_client_of_each_loop(self):
+        async def client():
+            return get_async_client()
+
+        self.assertIsNot(run(client()), run(client()))
+
+
+@override_settings(AUTH_CONFIG={'jwt': {'KEYS': KEYS}})
+class AsyncAuthenticationTestCase(SimpleTestCase):
+
+    def test_aauthenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token()}')
+        self.assertEqual(run(TokenAuthentication().aauthenticate(request)), ('user', None))
+
+
+class AsyncSnsWrapperTestCase(TestCase):
+
+    def test_sync_calls_of_a_native_wrapper(self):
+        wrapper = AsyncSnsWrapper(TOPIC, async_client=AsyncBatchClient())
+        with self.assertRaisesRegex(TypeError, 'use `apublish_message`'):
+            wrapper.publish_message('a')
+        with self.assertRaisesRegex(TypeError, 'use `apublish_batch`'):
+            wrapper.publish_batch([{'message': 'a'}])
+
+    def test_native_publish_batch(self):
+        client = AsyncBatchClient({'internal': {'Code': 'InternalError', 'SenderFault': False}})
+        wrapper = AsyncSnsWrapper(TOPIC, async_client=client)
+        messages = [{'message': str(i)} for i in range(12)] + [
+            {'message': 'internal'}, {'message': 'direct', 'TargetArn': f'{TOPIC}-endpoint'},
+        ]
+        with self.assertLogs('sns-events', 'INFO'):
+            result = run(wrapper.apublish_batch(messages, retry_delay=0))
+
+        self.assertEqual(result['successful'], {**{i: f'id-{i}' for i in range(12)}, 13: 'direct-direct'})
+        self.assertEqual(list(result['failed']), [12])
+        self.assertEqual(sorted(len(messages) for _, messages in client.calls), [1, 1, 3, 10])
+
+    def test_sync_client_runs_in_threads(self):
+        client = BatchClient()
+        wrapper = AsyncSnsWrapper(TOPIC, client=client)
+        self.assertFalse(wrapper.native)
+        self.assertEqual(run(wrapper.apublish_message('a')), 'direct-a')
+        self.assertEqual(run(wrapper.apublish_batch([{'message': 'b'}]))['successful'], {0: 'id-b'})
@@ -0,0 +1,212 @@
+from asyncio import run
+from importlib.util import find_spec
+from time import time
+from unittest import TestCase, skipUnless
+
+from django.core.signing import JSONSerializer, Signer, b64_encode
+from django.test import SimpleTestCase, override_settings
+from django.utils.baseconv import base62
+
+from rest_framework import exceptions
+from rest_framework.test import APIRequestFactory
+
+from musa_django_utils.drf import authentication
+from musa_django_utils.drf.authentication.base import MultiProviderMixin
+from musa_django_utils.drf.authentication.dispatch import ProviderDispatchAuthentication, reset_routing
+from musa_django_utils.drf.authentication.old_django import OldDjangoCookieSessionAuthentication
+from musa_django_utils.utils.cache import get_lru_cache
+
+
+class PackageExportsTestCase(TestCase):
+
+    def test_public_classes(self):
+        from musa_django_utils.drf.authentication.jwt import JwtAuthentication
+
+        self.assertIs(authentication.JwtAuthentication, JwtAuthentication)
+
+    def test_names_of_the_star_imported_modules(self):
+        from musa_django_utils.drf.authentication import dispatch, jwt
+
+        self.assertIs(authentication.reset_routing, dispatch.reset_routing)
+        self.assertIs(authentication.get_unverified_header, jwt.get_unverified_header)
+
+    @skipUnless(find_spec('drf_spectacular'), 'drf-spectacular is not installed')
+    def test_drf_spectacular_extensions(self):
+        from musa_django_utils.drf.authentication.drf_spetacular import BaseRemoteAuthScheme
+
+        self.assertIs(authentication.BaseRemoteAuthScheme, BaseRemoteAuthScheme)
+
+    def test_unknown_names(self):
+        with self.assertRaises(AttributeError):
+            authentication.Unknown
+        with self.assertRaises(AttributeError):
+            authentication._private
+
+
+class CookieSessionAuthentication(OldDjangoCookieSessionAuthentication):
+    config_name = 'cookie'
+
+    def get_user(self, request, session_data):
+        return session_data
+
+
+def session_cookie(session_data, timestamp):
+    """
+        signed cookie of `django.contrib.sessions.backends.signed_cookies` in django 2.2 (sha1 signature)
+    """
+    payload = b64_encode(JSONSerializer().dumps(session_data)).decode()
+    signer = Signer('tests', salt='django.contrib.sessions.backends.signed_cookies', algorithm='sha1')
+    return signer.sign(f'{payload}:{base62.encode(int(timestamp))}')
+
+
+@override_settings(AUTH_CONFIG={'cookie': {'COOKIE_AGE': 60}}, SESSION_COOKIE_NAME='sessionid')
+class OldDjangoCookieSessionTestCase(SimpleTestCase):
+
+    def authenticate(self, cookie):
+        request = APIRequestFactory().get('/')
+        request.COOKIES['sessionid'] = cookie
+        return CookieSessionAuthentication().authenticate(request)
+
+    def test_valid_session(self):
+        user, _ = self.authenticate(session_cookie({'_auth_user_id': '1'}, time()))
+        self.assertEqual(user, {'_auth_user_id': '1'})
+
+    def test_expired_session(self):
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(session_cookie({'_auth_user_id': '1'}, time() - 61))
+
+    def test_invalid_signature(self):
+        cookie = session_cookie({'_auth_user_id': '1'}, time())
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(f'{cookie[:-1]}{"A" if cookie[-1] != "A" else "B"}')
+
+
+class User:
+
+    def __init__(self, identity):
+        self.identity = identity
+
+
+class CountingAuthentication(MultiProviderMixin):
+    config_name = 'users'
+    calls = 0
+
+    def get_user(self, request, data):
+        CountingAuthentication.calls += 1
+        return User(data['sub'])
+
+
+@override_settings(AUTH_CONFIG={'users': {'USER_CACHE_TTL': 60, 'USER_CACHE_ALIAS': 'default'}})
+class UserCacheTestCase(SimpleTestCase):
+
+    def setUp(self):
+        CountingAuthentication.calls = 0
+        get_lru_cache('musa-auth-user:users').clear()
+        CountingAuthentication.invalidate_user('a')
+
+    def resolve(self, **data):
+        return CountingAuthentication().resolve_user(None, {'sub': 'a', **data})
+
+    def test_users_are_resolved_once(self):
+        first, second = self.resolve(), self.resolve()
+        self.assertEqual((first.identity, second.identity), ('a', 'a'))
+        # each request gets its own copy of the user
+        self.assertIsNot(first, second)
+        self.assertEqual(CountingAuthentication.calls, 1)
+
+    def test_shared_cache_of_the_workers(self):
+        self.resolve()
+        # other worker, with an empty local cache
+        get_lru_cache('musa-auth-user:users').clear()
+        self.resolve()
+        self.assertEqual(CountingAuthentication.calls, 1)
+
+    def test_invalidate_user(self):
+        self.resolve()
+        CountingAuthentication.invalidate_user('a')
+        self.resolve()
+        self.assertEqual(CountingAuthentication.calls, 2)
+
+    def test_expired_tokens_are_not_cached(self):
+        self.resolve(exp=time() - 1)
+        self.resolve(exp=time() - 1)
+        self.assertEqual(CountingAuthentication.calls, 2)
+
+    @override_settings(AUTH_CONFIG={'users': {}})
+    def test_disabled_by_default(self):
+        self.resolve()
+        self.resolve()
+        self.assertEqual(CountingAuthentication.calls, 2)
+
+
+class NamedAuthentication(MultiProviderMixin):
+    instances = 0
+
+    def __init__(self):
+        super().__init__()
+        NamedAuthentication.instances += 1
+
+    def authenticate(self, request):
+        if not self.validate_provider(request) or request.headers.get('Decline') == self.config_name:
+            return None
+        return (self.config_name, None)
+
+
+class FirstAuthentication(NamedAuthentication):
+    config_name = 'first'
+
+
+class SecondAuthentication(NamedAuthentication):
+    config_name = 'second'
+
+
+class FallbackAuthentication(NamedAuthentication):
+    config_name = 'fallback'
+
+
+@override_settings(
+    AUTH_CONFIG={
+        'first': {'PROVIDER_HEADER_VALUE': 'first'},
+        'second': {'PROVIDER_HEADER_VALUE': 'second'},
+        'fallback': {},
+    },
+    AUTH_DISPATCH_CLASSES=[
+        'tests.test_authentication.FirstAuthentication',
+        SecondAuthentication,
+        FallbackAuthentication,
+    ],
+)
+class ProviderDispatchTestCase(SimpleTestCase):
+
+    def authenticate(self, **headers):
+        request = APIRequestFactory().get('/', **headers)
+        return ProviderDispatchAuthentication().authenticate(request)
+
+    def test_requests_are_routed_by_the_provider_header(self):
+        self.assertEqual(self.authenticate(HTTP_AUTHORIZATION_PROVIDER='second'), ('second', None))
+        self.assertEqual(self.authenticate(HTTP_AUTHORIZATION_PROVIDER='first'), ('first', None))
+
+    def test_fallbacks(self):
+        self.assertEqual(self.authenticate(), ('fallback', None))
+        self.assertEqual(self.authenticate(HTTP_AUTHORIZATION_PROVIDER='unknown'), ('fallback', None))
+        self.assertEqual(
+            self.authenticate(HTTP_AUTHORIZATION_PROVIDER='first', HTTP_DECLINE='first'), ('fallback', None)
+        )
+
+    def test_authenticators_are_created_once(self):
+        reset_routing('AUTH_DISPATCH_CLASSES')
+        NamedAuthentication.instances = 0
+        for provider in ('first', 'second', 'first'):
+            self.authenticate(HTTP_AUTHORIZATION_PROVIDER=provider)
+        # one of each class
+        self.assertEqual(NamedAuthentication.instances, 3)
+
+    def test_routing_is_built_again_when_the_settings_change(self):
+        self.authenticate()
+        with override_settings(AUTH_DISPATCH_CLASSES=[FirstAuthentication]):
+            self.assertIsNone(self.authenticate())
+            self.assertEqual(self.authenticate(HTTP_AUTHORIZATION_PROVIDER='first'), ('first', None))
+
+    def test_async_dispatch(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION_PROVIDER='second')
+        self.assertEqual(run(ProviderDispatchAuthentication().aauthenticate(request)), ('second', None))
@@ -0,0 +1,62 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from musa_django_utils.django.counts import CachedCount, EstimatedCount
+
+from .models import Folder, Shelf
+
+
+class CachedCountTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        Folder.objects.create(name='folder')
+
+    def test_saves_invalidate_the_registered_models(self):
+        strategy = CachedCount(models=['tests.Folder'])
+        self.assertEqual(strategy.count(Folder.objects.all()), (1, False))
+
+        # a new strategy, as created by each request from the settings, sees the invalidation
+        Folder.objects.create(name='other')
+        self.assertEqual(CachedCount().count(Folder.objects.all()), (2, False))
+
+    def test_updates_wait_the_invalidation(self):
+        strategy = CachedCount(models=[Folder])
+        queryset = Folder.objects.filter(name='folder')
+        self.assertEqual(strategy.count(queryset), (1, False))
+
+        Folder.objects.update(name='renamed')
+        self.assertEqual(strategy.count(queryset), (1, False))
+
+        strategy.invalidate(Folder)
+        self.assertEqual(strategy.count(queryset), (0, False))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'postgres only')
+class EstimatedCountTestCase(TestCase):
+
+    def setUp(self):
+        Folder.objects.create(name='folder')
+        Folder.objects.create(name='folder')
+
+    def assertEstimatedBy(self, queryset, sql):
+        with CaptureQueriesContext(connection) as queries:
+            EstimatedCount().estimate(queryset)
+        self.assertIn(sql, queries[-1]['sql'])
+
+    def test_reltuples_of_the_table(self):
+        self.assertEstimatedBy(Folder.all_objects.all(), 'reltuples')
+
+    def test_reltuples_of_a_mixed_case_table(self):
+        # an empty table, never analyzed, has no estimate
+        self.assertIsNone(EstimatedCount().estimate(Shelf.objects.all()))
+
+    def test_explain_of_groups_and_distinct_rows(self):
+        self.assertEstimatedBy(Folder.all_objects.values('name').annotate(total=Count('id')), 'EXPLAIN')
+        self.assertEstimatedBy(Folder.all_objects.annotate(total=Count('documents')), 'EXPLAIN')
+        self.assertEstimatedBy(Folder.all_objects.values('name').distinct(), 'EXPLAIN')
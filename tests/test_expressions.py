@@ -0,0 +1,134 @@
+from decimal import Decimal
+from json import loads
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import BooleanField, OuterRef
+from django.test import TestCase
+
+from musa_django_utils.django.expressions import (
+    ExistsMoreThan, LateralAvg, LateralCount, LateralSum, SubqueryAvg, SubqueryCount, SubqueryJson, SubqueryList,
+    SubquerySum, annotate_lateral,
+)
+
+from .models import Author, Book
+
+
+class ExpressionsTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Author.objects.bulk_create(Author(name=f'author {i}') for i in range(4))
+        # authors with 0 to 3 books
+        Book.objects.bulk_create(
+            Book(author=author, price=Decimal(i * 10 + author.pk % 7))
+            for index, author in enumerate(Author.objects.order_by('pk'))
+            for i in range(index)
+        )
+
+
+class ExistsMoreThanTestCase(ExpressionsTestCase):
+
+    def authors(self, value, operator='>'):
+        books = Book.objects.filter(author=OuterRef('pk')).values('id')
+        return Author.objects.annotate(
+            many=ExistsMoreThan(books, value=value, operator=operator, output_field=BooleanField()),
+        ).filter(many=True).order_by('pk')
+
+    def book_counts(self, queryset):
+        return [author.books.count() for author in queryset]
+
+    def test_limit_and_count_templates(self):
+        self.assertEqual(self.book_counts(self.authors(1)), [2, 3])
+        self.assertEqual(self.book_counts(self.authors(1.5)), [2, 3])
+        self.assertEqual(self.book_counts(self.authors(2, '=')), [2])
+
+    def test_the_value_is_a_parameter(self):
+        for value, operator in ((7, '>'), (7.5, '>'), (7, '=')):
+            sql, params = self.authors(value, operator).query.sql_with_params()
+            self.assertNotIn(str(value), sql)
+            self.assertIn(value, params)
+
+    def test_unknown_operators(self):
+        with self.assertRaisesMessage(Exception, 'operator must be one of'):
+            list(self.authors(1, '> 0 OR 1 ='))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'postgres only')
+class LateralTestCase(ExpressionsTestCase):
+
+    def subqueries(self):
+        books = Book.objects.filter(author=OuterRef('pk'))
+        return Author.objects.annotate(
+            book_count=SubqueryCount(books.values('id'), field='id'),
+            total=SubquerySum(books.values('price'), min=0),
+            avg_price=SubqueryAvg(books.values('price')),
+        ).order_by('pk')
+
+    def lateral(self):
+        return annotate_lateral(
+            Author.objects.all(),
+            Book.objects.filter(author=OuterRef('pk')),
+            book_count=LateralCount('id'),
+            total=LateralSum('price', min=0),
+            avg_price=LateralAvg('price'),
+        ).order_by('pk')
+
+    def test_one_lateral_join(self):
+        sql = str(self.lateral().query)
+        self.assertEqual(sql.count('LEFT OUTER JOIN LATERAL'), 1)
+        self.assertNotIn('LATERAL', str(self.subqueries().query))
+
+    def test_same_results_of_the_subqueries(self):
+        fields = ('pk', 'book_count', 'total', 'avg_price')
+        rows = list(self.lateral().values_list(*fields))
+        self.assertEqual(rows, list(self.subqueries().values_list(*fields)))
+        # the authors without books are kept
+        self.assertEqual([row[1] for row in rows], [0, 1, 2, 3])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'postgres only')
+class NestedSubqueriesTestCase(ExpressionsTestCase):
+
+    def books(self):
+        return Book.objects.filter(author=OuterRef('pk'))
+
+    def expected(self, fields, limit=None):
+        return [
+            list(author.books.order_by('-price').values(*fields)[:limit]) for author in Author.objects.order_by('pk')
+        ]
+
+    def test_subquery_list(self):
+        authors = Author.objects.annotate(
+            prices=SubqueryList(self.books().values('price'), ordering=('-price',), limit=2),
+        ).order_by('pk')
+        expected = [[book['price'] for book in books] for books in self.expected(('price',), limit=2)]
+        self.assertEqual([author.prices for author in authors], expected)
+
+    def test_subquery_json(self):
+        for function in SubqueryJson.functions:
+            with self.subTest(function):
+                authors = Author.objects.annotate(
+                    book_list=SubqueryJson(
+                        self.books().values('id', 'price'), ordering=('-price',), function=function,
+                    ),
+                ).order_by('pk')
+                expected = [
+                    [{'id': book['id'], 'price': float(book['price'])} for book in books]
+                    for books in self.expected(('id', 'price'))
+                ]
+                # the authors without books have an empty list
+                self.assertEqual([author.book_list for author in authors], expected)
+
+    def test_subquery_json_as_text(self):
+        books = SubqueryJson(self.books().values('id'), ordering=('id',), function='json_agg', as_text=True)
+        rows = Author.objects.annotate(book_list=books).order_by('pk').values_list('book_list', flat=True)
+        self.assertTrue(all(isinstance(row, str) for row in rows))
+        self.assertEqual([loads(row) for row in rows], [
+            [{'id': pk} for pk in author.books.order_by('id').values_list('id', flat=True)]
+            for author in Author.objects.order_by('pk')
+        ])
+
+    def test_unknown_functions(self):
+        with self.assertRaisesMessage(Exception, 'function must be one of'):
+            SubqueryJson(self.books().values('id'), function='array_agg')
@@ -0,0 +1,74 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from django_filters import FilterSet
+
+from musa_django_utils.django.operations import gin_index
+from musa_django_utils.django_filters.filters import ArrayMultipleChoiceFilter
+
+from .models import Article, Book, Tag
+
+CHOICES = [(tag, tag) for tag in ('a', 'b', 'c')]
+
+
+class ArticleFilter(FilterSet):
+    contains = ArrayMultipleChoiceFilter(field_name='tags', choices=CHOICES)
+    overlap = ArrayMultipleChoiceFilter(field_name='tags', choices=CHOICES, lookup_expr='overlap')
+    contained_by = ArrayMultipleChoiceFilter(field_name='tags', choices=CHOICES, lookup_expr='contained_by')
+
+    class Meta:
+        model = Article
+        fields = ()
+
+
+class ArrayFilterTestCase(SimpleTestCase):
+
+    def test_distinct_only_across_many_valued_relations(self):
+        self.assertFalse(ArrayMultipleChoiceFilter(field_name='tags').needs_distinct(Article))
+        self.assertFalse(ArrayMultipleChoiceFilter(field_name='author__name').needs_distinct(Book))
+        self.assertTrue(ArrayMultipleChoiceFilter(field_name='authors__tags').needs_distinct(Tag))
+
+    def test_gin_index_names(self):
+        operation = gin_index('VeryLongModelName', 'first_array_field', 'second')
+        self.assertEqual(operation.model_name, 'verylongmodelname')
+        self.assertEqual(operation.index.fields, ['first_array_field', 'second'])
+        self.assertLessEqual(len(operation.index.name), 30)
+        self.assertEqual(gin_index('book', 'tags', name='book_tags').index.name, 'book_tags')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'postgres only')
+class ArrayFilterModesTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for tags in (['a'], ['a', 'b'], ['b', 'c'], []):
+            Article.objects.create(tags=tags)
+
+    def filter(self, **params):
+        queryset = ArticleFilter({key: value.split(',') for key, value in params.items()}).qs.order_by('pk')
+        return [article.tags for article in queryset], str(queryset.query)
+
+    def test_modes(self):
+        self.assertEqual(self.filter(contains='a,b')[0], [['a', 'b']])
+        for params, tags, operator in (
+            ({'contains': 'a'}, [['a'], ['a', 'b']], '@>'),
+            ({'overlap': 'a,c'}, [['a'], ['a', 'b'], ['b', 'c']], '&&'),
+            ({'contained_by': 'a,b'}, [['a'], ['a', 'b'], []], '<@'),
+        ):
+            with self.subTest(params):
+                result, sql = self.filter(**params)
+                self.assertEqual(result, tags)
+                self.assertIn(operator, sql)
+                self.assertNotIn('DISTINCT', sql)
+
+    def test_modes_use_the_gin_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for params in ({'contains': 'a'}, {'overlap': 'a,c'}, {'contained_by': 'a,b'}):
+                queryset = ArticleFilter({key: value.split(',') for key, value in params.items()}).qs
+                sql, sql_params = queryset.query.sql_with_params()
+                cursor.execute(f'EXPLAIN {sql}', sql_params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                self.assertIn('tests_article_tags_gin', plan)
@@ -0,0 +1,139 @@
+from threading import Event
+from time import sleep
+from unittest import TestCase, mock
+
+from django.core.cache import cache
+
+from musa_django_utils.drf.authentication.jwks import JwksCache
+from musa_django_utils.drf.authentication.utils import parse_max_age
+
+JWK_URL = 'https://auth.example.com/.well-known/jwks.json'
+
+
+def jwk(kid):
+    return {'kid': kid, 'kty': 'RSA', 'alg': 'RS256'}
+
+
+class FakeClock:
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class JwksCacheTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        self.responses = [([jwk('a')], None)]
+        patches = (
+            mock.patch('musa_django_utils.drf.authentication.jwks.time', self.clock),
+            mock.patch('musa_django_utils.drf.authentication.jwks.fetch_well_know_keys', side_effect=self.fetch),
+        )
+        self.fetch_mock = patches[1].start()
+        patches[0].start()
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def fetch(self, jwk_url):
+        response = self.responses[0] if len(self.responses) == 1 else self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def test_keys_are_fetched_once_per_ttl(self):
+        jwks = JwksCache(JWK_URL, ttl=60)
+        self.assertEqual(jwks.get_key('a'), jwk('a'))
+        self.assertEqual(jwks.get_key('a'), jwk('a'))
+        self.assertEqual(self.fetch_mock.call_count, 1)
+
+        self.clock.now += 61
+        jwks.get_key('a')
+        self.assertEqual(self.fetch_mock.call_count, 2)
+
+    def test_max_age_limits_the_ttl(self):
+        self.responses = [([jwk('a')], 10)]
+        jwks = JwksCache(JWK_URL, ttl=60, min_refresh_interval=5)
+        jwks.get_key('a')
+        self.assertEqual(jwks.expires_at, self.clock.now + 10)
+
+        # `no-cache` responses are kept for the `min_refresh_interval`
+        self.responses = [([jwk('a')], 0)]
+        self.clock.now += 11
+        jwks.get_key('a')
+        self.assertEqual(jwks.expires_at, self.clock.now + 5)
+
+    def test_unknown_kid_refreshes_once_per_interval(self):
+        jwks = JwksCache(JWK_URL, min_refresh_interval=30)
+        jwks.get_key('a')
+
+        for _ in range(5):
+            self.assertIsNone(jwks.get_key('rotated'))
+        self.assertEqual(self.fetch_mock.call_count, 1)
+
+        self.responses = [([jwk('a'), jwk('rotated')], None)]
+        self.clock.now += 31
+        self.assertEqual(jwks.get_key('rotated'), jwk('rotated'))
+        self.assertEqual(self.fetch_mock.call_count, 2)
+
+    def test_static_keys_are_never_fetched(self):
+        jwks = JwksCache(keys=[jwk('a')])
+        self.assertEqual(jwks.get_key('a'), jwk('a'))
+        self.assertIsNone(jwks.get_key('b'))
+        self.fetch_mock.assert_not_called()
+
+    def test_stale_keys_are_kept_when_the_refresh_fails(self):
+        jwks = JwksCache(JWK_URL, ttl=60, min_refresh_interval=30)
+        jwks.get_key('a')
+
+        self.responses = [Exception('down')]
+        self.clock.now += 61
+        with self.assertLogs('jwks', 'ERROR'):
+            self.assertEqual(jwks.get_key('a'), jwk('a'))
+        self.assertEqual(jwks.expires_at, self.clock.now + 30)
+
+    def test_the_first_fetch_errors_are_raised(self):
+        self.responses = [Exception('down')]
+        with self.assertRaises(Exception):
+            JwksCache(JWK_URL).get_key('a')
+
+    def test_background_refresh_serves_the_stale_keys(self):
+        jwks = JwksCache(JWK_URL, ttl=60, background_refresh=True)
+        jwks.get_key('a')
+
+        # the refresh waits until the stale key is served
+        served = Event()
+        self.fetch_mock.side_effect = lambda jwk_url: served.wait(5) and ([jwk('b')], None)
+        self.clock.now += 61
+        self.assertEqual(jwks.get_key('a'), jwk('a'))
+        served.set()
+
+        for _ in range(100):
+            if 'b' in jwks.keys:
+                break
+            sleep(0.01)
+        self.assertEqual(jwks.keys, {'b': jwk('b')})
+        self.assertEqual(self.fetch_mock.call_count, 2)
+
+    def test_keys_shared_by_the_django_cache(self):
+        JwksCache(JWK_URL, cache_alias='default').get_key('a')
+        self.assertEqual(JwksCache(JWK_URL, cache_alias='default').get_key('a'), jwk('a'))
+        self.assertEqual(self.fetch_mock.call_count, 1)
+
+    def test_instances_by_name(self):
+        instance = JwksCache.get_instance('tests:jwks', jwk_url=JWK_URL)
+        self.assertIs(JwksCache.get_instance('tests:jwks', jwk_url='other'), instance)
+        self.assertEqual(instance.jwk_url, JWK_URL)
+
+
+class ParseMaxAgeTestCase(TestCase):
+
+    def test_cache_control(self):
+        self.assertEqual(parse_max_age('public, max-age=300'), 300)
+        self.assertEqual(parse_max_age('no-cache'), 0)
+        self.assertEqual(parse_max_age('max-age=300, no-store'), 0)
+        self.assertIsNone(parse_max_age('public'))
+        self.assertIsNone(parse_max_age(None))
@@ -0,0 +1,76 @@
+from json import loads
+from time import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt import decode, encode
+from jwt.algorithms import RSAAlgorithm
+from rest_framework import exceptions
+from rest_framework.test import APIRequestFactory
+
+from musa_django_utils.drf.authentication.jwt import JwtAuthentication
+from musa_django_utils.utils.cache import get_lru_cache
+
+PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+KEYS = [{**loads(RSAAlgorithm.to_jwk(PRIVATE_KEY.public_key())), 'kid': 'key', 'alg': 'RS256'}]
+
+
+def token(**claims):
+    return encode({'sub': 'user', 'exp': int(time()) + 600, **claims}, PRIVATE_KEY, 'RS256', {'kid': 'key'})
+
+
+class TokenAuthentication(JwtAuthentication):
+    config_name = 'jwt'
+
+    def get_user(self, request, token_data):
+        return token_data['sub']
+
+
+@override_settings(AUTH_CONFIG={'jwt': {'KEYS': KEYS, 'TOKEN_CACHE_SIZE': 10, 'TOKEN_CACHE_TTL': 60}})
+class JwtAuthenticationTestCase(SimpleTestCase):
+
+    def setUp(self):
+        get_lru_cache('jwt-tokens:jwt').clear()
+        TokenAuthentication().get_jwks().public_keys.clear()
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return TokenAuthentication().authenticate(request)
+
+    def test_valid_token(self):
+        self.assertEqual(self.authenticate(token()), ('user', None))
+
+    def test_expired_and_unknown_keys_fail(self):
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(token(exp=int(time()) - 10))
+
+        other = encode({'sub': 'user'}, PRIVATE_KEY, 'RS256', {'kid': 'other'})
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(other)
+
+    def test_public_key_is_parsed_once(self):
+        with mock.patch.object(RSAAlgorithm, 'from_jwk', wraps=RSAAlgorithm.from_jwk) as from_jwk:
+            self.authenticate(token(sub='first'))
+            self.authenticate(token(sub='second'))
+
+        self.assertEqual(from_jwk.call_count, 1)
+
+    def test_verified_tokens_are_cached(self):
+        value = token()
+        with mock.patch('musa_django_utils.drf.authentication.jwt.decode', wraps=decode) as wrapped:
+            for _ in range(3):
+                self.assertEqual(self.authenticate(value), ('user', None))
+
+        self.assertEqual(wrapped.call_count, 1)
+
+    def test_cached_tokens_are_kept_until_the_exp(self):
+        TokenAuthentication().decode_token(token(exp=int(time()) + 30))
+        (_, (_, expires_at)), = get_lru_cache('jwt-tokens:jwt').data.items()
+        self.assertLessEqual(expires_at, time() + 30)
+
+    def test_cached_data_is_a_copy(self):
+        value = token()
+        TokenAuthentication().decode_token(value)['sub'] = 'changed'
+        self.assertEqual(TokenAuthentication().decode_token(value)['sub'], 'user')
@@ -0,0 +1,111 @@
+from threading import Event
+from time import sleep
+from unittest import TestCase, mock
+
+from django.core.cache import cache
+
+from musa_django_utils.utils.keycloak import KeyCloakAppAuth, KeyCloakTokenProvider
+
+from .test_jwks import FakeClock
+
+CONFIG = {'keycloak_base_url': 'https://auth.example.com', 'realm': 'realm', 'client_id': 'client'}
+
+
+class KeyCloakTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.clock = FakeClock()
+        self.tokens = 0
+        self.failure = None
+        self.gate = None
+        for patch in (
+            mock.patch('musa_django_utils.utils.keycloak.time', self.clock),
+            mock.patch.object(KeyCloakTokenProvider, 'request_token', self.request_token),
+            mock.patch.object(KeyCloakTokenProvider, '_instances', {}),
+            mock.patch.object(KeyCloakTokenProvider, '_default', None),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def request_token(self):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.failure is not None:
+            raise self.failure
+        self.tokens += 1
+        return {'access_token': f'token {self.tokens}', 'expires_in': 300}
+
+    def provider(self, **kwargs):
+        return KeyCloakTokenProvider('https://auth.example.com', 'realm', 'client', 'secret', **kwargs)
+
+
+class KeyCloakTokenProviderTestCase(KeyCloakTestCase):
+
+    def test_token_is_requested_once_until_it_expires(self):
+        provider = self.provider(leeway=20, refresh_ahead=60, background_refresh=False)
+        self.assertEqual(provider.get_token(), 'token 1')
+        self.assertEqual(provider.get_token(), 'token 1')
+        # the leeway is removed from `expires_in`, the refresh starts `refresh_ahead` before
+        self.assertEqual((provider.expires_at, provider.refresh_at), (self.clock.now + 280, self.clock.now + 220))
+
+        self.clock.now += 221
+        self.assertEqual(provider.get_token(), 'token 2')
+
+    def test_background_refresh_serves_the_current_token(self):
+        provider = self.provider()
+        provider.get_token()
+
+        # the refresh waits until the current token is served
+        self.gate = Event()
+        self.clock.now += 221
+        self.assertEqual(provider.get_token(), 'token 1')
+        self.gate.set()
+
+        for _ in range(100):
+            if provider.access_token == 'token 2':
+                break
+            sleep(0.01)
+        self.assertEqual(provider.access_token, 'token 2')
+
+    def test_current_token_is_kept_when_the_refresh_fails(self):
+        provider = self.provider(background_refresh=False)
+        provider.get_token()
+
+        self.failure = Exception('down')
+        self.clock.now += 221
+        with self.assertLogs('keycloak', 'ERROR'):
+            self.assertEqual(provider.get_token(), 'token 1')
+
+        self.clock.now += 60
+        with self.assertRaises(Exception):
+            provider.get_token()
+
+    def test_token_shared_by_the_django_cache(self):
+        self.provider(cache_alias='default').get_token()
+        self.assertEqual(self.provider(cache_alias='default').get_token(), 'token 1')
+        self.assertEqual(self.tokens, 1)
+
+
+class KeyCloakAppAuthTestCase(KeyCloakTestCase):
+
+    def test_instances_of_a_client_share_the_token(self):
+        first = KeyCloakAppAuth(**CONFIG, client_secret='secret')
+        second = KeyCloakAppAuth(**{key.upper(): value for key, value in CONFIG.items()}, CLIENT_SECRET='secret')
+        self.assertIs(first.provider, second.provider)
+
+        first.token
+        self.assertEqual(second.token, 'token 1')
+
+    def test_instances_without_the_client_use_the_first_client(self):
+        with self.assertRaises(Exception):
+            KeyCloakAppAuth()
+
+        auth = KeyCloakAppAuth(**CONFIG, client_secret='secret')
+        self.assertIs(KeyCloakAppAuth().provider, auth.provider)
+
+    def test_renew_token(self):
+        auth = KeyCloakAppAuth(**CONFIG, client_secret='secret')
+        self.assertEqual(auth.token, 'token 1')
+        auth.renew_token()
+        self.assertEqual(auth.token, 'token 2')
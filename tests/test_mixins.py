@@ -0,0 +1,198 @@
+from json import loads
+
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import generics, serializers
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.test import APIRequestFactory
+
+from musa_django_utils.drf.mixins import CollectionETagMixin, KeepRelatedMixin, StreamingListMixin
+from musa_django_utils.drf.pagination import KeysetPagination, StandardPagination
+from musa_django_utils.drf.serializers import Md5VersionSerializer
+
+from .models import Author, Book, Folder, Tag
+
+
+class FolderSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Folder
+        fields = ('id', 'name')
+
+
+class VersionFolderSerializer(Md5VersionSerializer, FolderSerializer):
+
+    class Meta(FolderSerializer.Meta):
+        pass
+
+
+class HashFieldsFolderSerializer(VersionFolderSerializer):
+    hash_fields = ('pk', 'name')
+
+
+class ListView(generics.ListAPIView):
+    queryset = Folder.objects.order_by('pk')
+    pagination_class = StandardPagination
+    authentication_classes = []
+    permission_classes = []
+
+
+class FolderETagList(CollectionETagMixin, ListView):
+    serializer_class = FolderSerializer
+
+
+class CollectionETagTestCase(TestCase):
+
+    def setUp(self):
+        self.folder = Folder.objects.create(name='folder')
+        Folder.objects.create(name='other')
+
+    def get(self, serializer_class, params=None, **headers):
+        view = FolderETagList.as_view(serializer_class=serializer_class)
+        response = view(APIRequestFactory().get('/folders/', params or {}, **headers))
+        return response.render()
+
+    def test_not_modified_until_the_data_changes(self):
+        serializer_classes = (FolderSerializer, VersionFolderSerializer, HashFieldsFolderSerializer)
+        for index, serializer_class in enumerate(serializer_classes):
+            with self.subTest(serializer_class.__name__):
+                response = self.get(serializer_class)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), 2)
+                etag = response['ETag']
+
+                response = self.get(serializer_class, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual((response.status_code, response['ETag'], response.content), (304, etag, b''))
+                self.assertEqual(response['Vary'], 'Accept')
+
+                Folder.objects.filter(pk=self.folder.pk).update(name=f'renamed {index}')
+                response = self.get(serializer_class, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_the_query_params_change_the_etag(self):
+        etag = self.get(HashFieldsFolderSerializer)['ETag']
+        response = self.get(HashFieldsFolderSerializer, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    books = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = Author
+        fields = ('id', 'name', 'tags', 'books')
+
+
+class PrefetchTagsBackend(BaseFilterBackend):
+    """
+        scoping of the filter backends, ex: a tenant filter
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return queryset.prefetch_related('tags')
+
+
+class AuthorUpdate(KeepRelatedMixin, generics.UpdateAPIView):
+    queryset = Author.objects.prefetch_related('books')
+    serializer_class = AuthorSerializer
+    filter_backends = [PrefetchTagsBackend]
+    authentication_classes = []
+    permission_classes = []
+
+
+class KeepRelatedTestCase(TestCase):
+
+    def setUp(self):
+        self.author = Author.objects.create(name='author')
+        Book.objects.create(author=self.author, price=10)
+        self.tags = [Tag.objects.create(name=f'tag {i}') for i in range(3)]
+        self.author.tags.set(self.tags[:1])
+
+    def patch(self, data, **initkwargs):
+        request = APIRequestFactory().patch('/authors/', data, format='json')
+        with CaptureQueriesContext(connection) as queries:
+            response = AuthorUpdate.as_view(**initkwargs)(request, pk=self.author.pk)
+        return response, [query['sql'] for query in queries]
+
+    def test_written_relations_are_prefetched_again(self):
+        response, queries = self.patch({'tags': [tag.pk for tag in self.tags[1:]]})
+        self.assertEqual(response.data['tags'], [tag.pk for tag in self.tags[1:]])
+
+        # the books are kept, only the tags (prefetched by the filter backend) are read again after the update
+        after_update = queries[[index for index, sql in enumerate(queries) if 'INSERT' in sql][-1] + 1:]
+        self.assertEqual(len(after_update), 1)
+        self.assertIn(f'"{Tag._meta.db_table}"', after_update[0])
+        self.assertIn(' IN (', after_update[0])
+
+    def test_other_fields_keep_the_prefetches(self):
+        response, queries = self.patch({'name': 'renamed'})
+        self.assertEqual(response.data['name'], 'renamed')
+        self.assertEqual(len(response.data['books']), 1)
+        self.assertIn('UPDATE', queries[-1])
+
+    def test_refetch_after_update_uses_the_filtered_queryset(self):
+        response, queries = self.patch({'tags': [self.tags[2].pk]}, refetch_after_update=True)
+        self.assertEqual(response.data['tags'], [self.tags[2].pk])
+        self.assertEqual(len(response.data['books']), 1)
+        # the tags are prefetched by the filter backend (`IN`), not read one instance at a time
+        tags_queries = [sql for sql in queries if sql.startswith('SELECT') and f'"{Tag._meta.db_table}"' in sql]
+        self.assertIn(' IN (', tags_queries[-1])
+
+
+class AuthorStreamList(StreamingListMixin, generics.ListAPIView):
+    queryset = Author.objects.prefetch_related('books', 'tags').order_by('pk')
+    serializer_class = AuthorSerializer
+    pagination_class = StandardPagination
+    stream_chunk_size = 2
+    authentication_classes = []
+    permission_classes = []
+
+
+class StreamingListTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Author.objects.bulk_create(Author(name=f'author {i}') for i in range(5))
+        Book.objects.bulk_create(Book(author=author, price=10) for author in Author.objects.all())
+        tag = Tag.objects.create(name='tag')
+        tag.authors.set(Author.objects.all()[:3])
+
+    def get(self, params, **initkwargs):
+        response = AuthorStreamList.as_view(**initkwargs)(APIRequestFactory().get('/authors/', params))
+        if isinstance(response, StreamingHttpResponse):
+            return response, b''.join(response.streaming_content)
+        return response, response.render().content
+
+    def test_json_stream_is_the_page_of_list(self):
+        for params in ({'page_size': 3}, {'page_size': 3, 'page': 2}):
+            with self.subTest(params):
+                streamed, content = self.get({**params, 'stream': 'json'})
+                self.assertIsInstance(streamed, StreamingHttpResponse)
+                self.assertEqual(loads(content), loads(self.get(params)[1]))
+
+    def test_prefetches_by_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get({'page_size': 5, 'stream': 'json'})
+        # count, the authors read by chunk, and the books and tags of each of the 3 chunks
+        self.assertEqual(len(queries), 2 + 3 * 2)
+
+    def test_other_paginators_fall_back_to_list(self):
+        response, content = self.get({'stream': 'json'}, pagination_class=KeysetPagination)
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(len(loads(content)['results']), 5)
+
+    def test_ndjson_is_opt_in(self):
+        response, _ = self.get({'stream': 'ndjson'})
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+
+        response, content = self.get({'stream': 'ndjson'}, stream_formats=('json', 'ndjson'))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['name'] for row in rows], [f'author {i}' for i in range(5)])
+        self.assertEqual([len(row['tags']) for row in rows], [1, 1, 1, 0, 0])
@@ -0,0 +1,51 @@
+from django.test import TestCase
+
+from .models import Document, Drawer, Folder, Sock
+
+
+class ArchiveTestCase(TestCase):
+
+    def setUp(self):
+        self.folder = Folder.objects.create(name='folder')
+        self.other = Folder.objects.create(name='other')
+        Document.objects.bulk_create([
+            Document(folder=self.folder, name='a'), Document(folder=self.folder, name='b'),
+            Document(folder=self.other, name='c'),
+        ])
+
+    def assertRows(self, folders, documents, archived_folders, archived_documents):
+        self.assertEqual(Folder.all_objects.count(), folders)
+        self.assertEqual(Document.all_objects.count(), documents)
+        self.assertEqual(Folder.archive_model.objects.count(), archived_folders)
+        self.assertEqual(Document.archive_model.objects.count(), archived_documents)
+
+    def test_soft_delete_archives_the_children(self):
+        self.assertEqual(Folder.objects.filter(pk=self.folder.pk).soft_delete(), 1)
+        self.assertRows(1, 1, 1, 2)
+        self.assertTrue(all(Document.archive_model.objects.values_list('deleted', flat=True)))
+
+    def test_children_survive_a_round_trip(self):
+        Folder.objects.filter(pk=self.folder.pk).soft_delete()
+        self.assertEqual(Folder.archive_model.objects.filter(pk=self.folder.pk).restore(), 1)
+
+        self.assertRows(2, 3, 0, 0)
+        self.assertEqual(sorted(self.folder.documents.values_list('name', flat=True)), ['a', 'b'])
+        self.assertFalse(any(Document.all_objects.values_list('deleted', flat=True)))
+
+    def test_instance_delete_round_trip(self):
+        self.folder.delete()
+        self.assertRows(1, 1, 1, 2)
+
+        Folder.archive_model.objects.all().restore()
+        self.assertRows(2, 3, 0, 0)
+
+    def test_not_archived_cascade_is_refused(self):
+        drawer = Drawer.objects.create()
+        Sock.objects.create(drawer=drawer)
+
+        with self.assertRaisesMessage(Exception, '`Sock.drawer`'):
+            drawer.delete()
+
+        self.assertEqual(Drawer.all_objects.count(), 1)
+        self.assertEqual(Drawer.archive_model.objects.count(), 0)
+        self.assertEqual(Sock.objects.count(), 1)
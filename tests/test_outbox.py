@@ -0,0 +1,35 @@
+from django.test import TestCase
+
+from musa_django_utils.outbox.models import SnsOutboxEvent
+from musa_django_utils.outbox.relay import OutboxRelay
+
+
+class Wrapper:
+    """
+        `SnsWrapper` stand-in, raising for the batches with a `bad` message
+    """
+
+    def __init__(self):
+        self.published = []
+
+    def publish_batch(self, batch_message):
+        if any(kwargs['message'] == 'bad' for kwargs in batch_message):
+            raise ValueError('bad message')
+
+        self.published.extend(kwargs['message'] for kwargs in batch_message)
+        return {'successful': {index: str(index) for index in range(len(batch_message))}, 'failed': {}}
+
+
+class OutboxRelayTestCase(TestCase):
+
+    def test_a_raising_event_fails_alone(self):
+        SnsOutboxEvent.objects.bulk_create(
+            SnsOutboxEvent(topic_arn='arn:aws:sns:us-east-1:0:topic', message=message) for message in ('a', 'bad', 'b')
+        )
+        wrapper = Wrapper()
+
+        self.assertEqual(OutboxRelay(wrapper).relay_batch(), (2, 1))
+        self.assertEqual(wrapper.published, ['a', 'b'])
+
+        event = SnsOutboxEvent.objects.get()
+        self.assertEqual((event.message, event.attempts, event.last_error), ('bad', 1, 'ValueError: bad message'))
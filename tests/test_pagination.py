@@ -0,0 +1,86 @@
+from base64 import urlsafe_b64encode
+from json import dumps
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase
+
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from musa_django_utils.drf.pagination import KeysetPagination
+
+from .models import Document, Folder
+
+
+def cursor(position, reverse=False):
+    return urlsafe_b64encode(dumps({'r': int(reverse), 'p': position}).encode()).strip(b'=').decode('ascii')
+
+
+def link_cursor(link):
+    return parse_qs(urlparse(link).query)['cursor'][0]
+
+
+class KeysetPaginationTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Folder.objects.bulk_create(Folder(name=f'folder {i}') for i in range(3))
+        folders = list(Folder.objects.order_by('pk'))
+        # folders and names out of the pk order, with ties
+        Document.objects.bulk_create(
+            Document(folder=folders[(i * 2) % 3], name=f'document {i % 4}') for i in range(11)
+        )
+
+    def paginate(self, queryset, ordering, **params):
+        paginator = KeysetPagination()
+        paginator.ordering = ordering
+        request = Request(APIRequestFactory().get('/documents/', {'page_size': 3, **params}))
+        page = paginator.paginate_queryset(queryset, request)
+        return paginator, [instance.pk for instance in page]
+
+    def walk(self, queryset, ordering, **params):
+        """
+            pks of the pages following the next links, then the pages following the previous links back
+        """
+        forward, backward = [], []
+        paginator, page = self.paginate(queryset, ordering, **params)
+        forward.append(page)
+        while paginator.get_next_link():
+            paginator, page = self.paginate(queryset, ordering, cursor=link_cursor(paginator.get_next_link()))
+            forward.append(page)
+
+        backward.append(page)
+        while paginator.get_previous_link():
+            paginator, page = self.paginate(queryset, ordering, cursor=link_cursor(paginator.get_previous_link()))
+            backward.append(page)
+
+        return forward, backward[::-1]
+
+    def assertWalks(self, queryset, ordering, expected):
+        forward, backward = self.walk(queryset, ordering)
+        self.assertEqual(sum(forward, []), expected)
+        self.assertTrue(all(len(page) == 3 for page in forward[:-1]))
+        self.assertEqual(backward, forward)
+
+    def test_foreign_key_ordering(self):
+        expected = list(Document.objects.order_by('folder_id', 'pk').values_list('pk', flat=True))
+        self.assertWalks(Document.objects.all(), ('folder', 'pk'), expected)
+
+    def test_descending_multi_column_ordering(self):
+        expected = list(Document.objects.order_by('-folder_id', '-name', '-pk').values_list('pk', flat=True))
+        self.assertWalks(Document.objects.all(), ('-folder', '-name'), expected)
+
+    def test_mixed_directions(self):
+        expected = list(Document.objects.order_by('name', '-pk').values_list('pk', flat=True))
+        self.assertWalks(Document.objects.all(), ('name', '-pk'), expected)
+
+    def test_positions_are_coerced_by_the_fields(self):
+        pks = list(Folder.objects.order_by('-pk').values_list('pk', flat=True))
+        _, page = self.paginate(Folder.objects.all(), ('-pk',), cursor=cursor([str(pks[0])]))
+        self.assertEqual(page, pks[1:])
+
+    def test_invalid_positions_are_not_found(self):
+        for position in (['abc'], [{'pk': 1}], [1, 2]):
+            with self.assertRaises(NotFound):
+                self.paginate(Folder.objects.all(), ('-pk',), cursor=cursor(position))
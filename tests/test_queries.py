@@ -0,0 +1,124 @@
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from musa_django_utils.django.queries import (
+    QueryBudgetExceeded, QueryBudgetMiddleware, QueryBudgetMixin, QueryRecorder, assert_max_queries,
+    assert_no_n_plus_one, normalize_sql,
+)
+
+from .models import Author, Book
+
+
+class QueriesTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Author.objects.bulk_create(Author(name=f'author {i}') for i in range(6))
+        Book.objects.bulk_create(Book(author=author, price=10) for author in Author.objects.all())
+
+    def book_counts(self, prefetch=False):
+        authors = Author.objects.prefetch_related('books') if prefetch else Author.objects.all()
+        return [len(author.books.all()) for author in authors]
+
+
+class QueryRecorderTestCase(QueriesTestCase):
+
+    def test_normalized_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE a = 'x''y' AND b IN (%s, %s,  %s) AND c > 10.5"),
+            'SELECT * FROM t WHERE a = %s AND b IN (%s...) AND c > %s',
+        )
+
+    def test_counts_duplicates_and_n_plus_one(self):
+        with QueryRecorder() as recorder:
+            self.book_counts()
+            Author.objects.count()
+            Author.objects.count()
+
+        self.assertEqual(recorder.count, 9)
+        self.assertEqual(recorder.duplicates, 1)
+        (sql, executions), = recorder.n_plus_one()
+        self.assertEqual(executions, 6)
+        self.assertIn(Book._meta.db_table, sql)
+        self.assertEqual(recorder.summary()['queries'], 9)
+
+    def test_prefetches_are_not_n_plus_one(self):
+        with QueryRecorder() as recorder:
+            self.book_counts(prefetch=True)
+        self.assertEqual((recorder.count, recorder.n_plus_one()), (2, []))
+
+    def test_queries_after_the_block_are_not_recorded(self):
+        with QueryRecorder() as recorder:
+            Author.objects.count()
+        Author.objects.count()
+        self.assertEqual(recorder.count, 1)
+
+
+class AssertionsTestCase(QueriesTestCase):
+
+    def test_assert_max_queries(self):
+        with assert_max_queries(2):
+            self.book_counts(prefetch=True)
+
+        with self.assertRaisesMessage(AssertionError, '7 queries executed, expected at most 2'):
+            with assert_max_queries(2):
+                self.book_counts()
+
+    def test_assert_no_n_plus_one(self):
+        with assert_no_n_plus_one():
+            self.book_counts(prefetch=True)
+
+        with self.assertRaisesMessage(AssertionError, 'N+1 queries detected'):
+            with assert_no_n_plus_one():
+                self.book_counts()
+
+        with assert_no_n_plus_one(threshold=10):
+            self.book_counts()
+
+
+class AuthorCount(QueryBudgetMixin, APIView):
+    authentication_classes = []
+    permission_classes = []
+    query_budget = 1
+
+    def get(self, request):
+        return Response({'authors': Author.objects.count(), 'books': Book.objects.count()})
+
+
+class QueryBudgetTestCase(QueriesTestCase):
+
+    def get(self):
+        return AuthorCount.as_view()(APIRequestFactory().get('/authors/'))
+
+    def test_headers_and_log_of_the_exceeded_budget(self):
+        with self.assertLogs('queries', 'WARNING'):
+            response = self.get()
+        self.assertEqual((response['X-Query-Count'], response['X-Query-N-Plus-One']), ('2', '0'))
+
+    @override_settings(QUERY_INSTRUMENTATION={'BUDGET_ACTION': 'raise'})
+    def test_exceeded_budget_raises(self):
+        with self.assertLogs('queries', 'WARNING'), self.assertRaises(QueryBudgetExceeded):
+            self.get()
+
+    @override_settings(QUERY_INSTRUMENTATION={'ENABLED': False})
+    def test_disabled(self):
+        self.assertNotIn('X-Query-Count', self.get())
+
+    def test_middleware_reads_the_budget_of_the_view(self):
+        view = AuthorCount.as_view()
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            Author.objects.count()
+            Book.objects.count()
+            return HttpResponse()
+
+        middleware = QueryBudgetMiddleware(get_response)
+        with self.assertLogs('queries', 'WARNING') as logs:
+            response = middleware(APIRequestFactory().get('/authors/'))
+        self.assertEqual(response['X-Query-Count'], '2')
+        self.assertEqual(logs.records[0].query_budget, 1)
@@ -0,0 +1,35 @@
+from json import loads
+
+from django.test import SimpleTestCase
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from musa_django_utils.drf.fields import RawJSONField
+from musa_django_utils.drf.renderers import RawJSON, RawJSONRenderer
+
+
+class AuthorSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    books = RawJSONField()
+
+
+class RawJSONRendererTestCase(SimpleTestCase):
+
+    def test_raw_values_are_written_as_is(self):
+        data = AuthorSerializer([{'name': 'a', 'books': '[{"id": 1}, {"id":2}]'}], many=True).data
+        rendered = RawJSONRenderer().render(data)
+        # the spacing of the raw text is kept, it isn't decoded and encoded again
+        self.assertIn(b'[{"id": 1}, {"id":2}]', rendered)
+        self.assertEqual(loads(rendered), [{'name': 'a', 'books': [{'id': 1}, {'id': 2}]}])
+
+    def test_placeholders_in_the_data_are_not_replaced(self):
+        data = {'text': '@raw-json:0000000000000000:0@', 'raw': RawJSON('[1]')}
+        self.assertEqual(loads(RawJSONRenderer().render(data)), {'text': '@raw-json:0000000000000000:0@', 'raw': [1]})
+
+    def test_other_renderers_decode_the_raw_values(self):
+        self.assertEqual(loads(JSONRenderer().render({'raw': RawJSON(b'{"a": 1}')})), {'raw': {'a': 1}})
+
+    def test_decoded_values_are_kept(self):
+        data = AuthorSerializer({'name': 'a', 'books': [{'id': 1}]}).data
+        self.assertEqual(loads(RawJSONRenderer().render(data)), {'name': 'a', 'books': [{'id': 1}]})
@@ -0,0 +1,147 @@
+from threading import Lock
+from unittest import TestCase, mock
+
+from botocore.exceptions import ClientError
+
+from musa_django_utils.utils import sns
+from musa_django_utils.utils.sns import SnsWrapper
+
+TOPIC = 'arn:aws:sns:us-east-1:000000000000:topic'
+
+
+class PatchedModulesTestCase(TestCase):
+
+    def test_patched_boto3_builds_the_client(self):
+        with mock.patch('musa_django_utils.utils.sns.boto3') as boto3:
+            wrapper = SnsWrapper(TOPIC)
+
+        boto3.client.assert_called_once()
+        self.assertEqual(boto3.client.call_args.args, ('sns',))
+        self.assertIs(wrapper.client, boto3.client.return_value)
+
+    def test_patched_exceptions_are_handled(self):
+        class PatchedError(Exception):
+            pass
+
+        client = mock.Mock()
+        client.publish.side_effect = PatchedError()
+        with mock.patch('musa_django_utils.utils.sns.exceptions') as exceptions:
+            exceptions.ClientError = PatchedError
+            with self.assertLogs('sns-events', 'ERROR'), self.assertRaises(PatchedError):
+                SnsWrapper(TOPIC, client=client).publish_message('message')
+
+    def test_lazy_modules_after_the_patch(self):
+        with mock.patch('musa_django_utils.utils.sns.boto3'):
+            pass
+
+        self.assertIs(sns.exceptions.ClientError, ClientError)
+        self.assertEqual(sns.boto3.__name__, 'boto3')
+
+
+class BatchClient:
+    """
+        SNS client stand-in recording the calls, `failures` are popped by the message of the entries
+    """
+
+    def __init__(self, failures=None):
+        self.lock = Lock()
+        self.calls = []
+        self.published = []
+        self.failures = failures or {}
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        with self.lock:
+            self.calls.append((TopicArn, [entry['Message'] for entry in PublishBatchRequestEntries]))
+            failure = self.failures.get(PublishBatchRequestEntries[0]['Message'])
+            if isinstance(failure, list) and failure:
+                raise failure.pop(0)
+
+            successful, failed = [], []
+            for entry in PublishBatchRequestEntries:
+                error = self.failures.get(entry['Message'])
+                if isinstance(error, dict):
+                    failed.append({'Id': entry['Id'], **error})
+                else:
+                    successful.append({'Id': entry['Id'], 'MessageId': f'id-{entry["Message"]}'})
+
+            return {'Successful': successful, 'Failed': failed}
+
+    def publish(self, Message, **kwargs):
+        with self.lock:
+            self.published.append((Message, kwargs))
+        return {'MessageId': f'direct-{Message}'}
+
+
+def throttling():
+    return ClientError({'Error': {'Code': 'Throttling', 'Type': 'Sender'}}, 'PublishBatch')
+
+
+class PublishBatchTestCase(TestCase):
+
+    def publish(self, client, messages, **kwargs):
+        return SnsWrapper(TOPIC, client=client).publish_batch(messages, retry_delay=0, **kwargs)
+
+    def test_chunks_of_ten_entries(self):
+        client = BatchClient()
+        result = self.publish(client, [{'message': str(i)} for i in range(25)])
+
+        self.assertEqual(sorted(len(messages) for _, messages in client.calls), [5, 10, 10])
+        self.assertEqual(result, {'successful': {i: f'id-{i}' for i in range(25)}, 'failed': {}})
+
+    def test_chunks_by_the_payload_size(self):
+        client = BatchClient()
+        body = 'x' * 100 * 1024
+        self.publish(client, [{'message': f'{i}{body}'} for i in range(3)])
+        self.assertEqual(sorted(len(messages) for _, messages in client.calls), [1, 2])
+
+    def test_entries_of_each_topic(self):
+        client = BatchClient()
+        other = f'{TOPIC}-other'
+        self.publish(client, [{'message': 'a'}, {'message': 'b', 'topic': other}, {'message': 'c'}])
+        self.assertEqual(sorted(client.calls), [(TOPIC, ['a', 'c']), (other, ['b'])])
+
+    def test_failed_entries_are_retried_except_sender_faults(self):
+        client = BatchClient({
+            'invalid': {'Code': 'InvalidParameter', 'SenderFault': True},
+            'internal': {'Code': 'InternalError', 'SenderFault': False},
+        })
+        with self.assertLogs('sns-events', 'INFO'):
+            result = self.publish(client, [{'message': 'ok'}, {'message': 'invalid'}, {'message': 'internal'}])
+
+        self.assertEqual(result['successful'], {0: 'id-ok'})
+        self.assertEqual({index: error['Code'] for index, error in result['failed'].items()},
+                         {1: 'InvalidParameter', 2: 'InternalError'})
+        # the first call, and the retries of the server error
+        self.assertEqual(client.calls[1:], [(TOPIC, ['internal'])] * 2)
+
+    def test_throttled_calls_are_retried(self):
+        client = BatchClient({'a': [throttling(), throttling()]})
+        with self.assertLogs('sns-events', 'ERROR'):
+            result = self.publish(client, [{'message': 'a'}, {'message': 'b'}])
+
+        self.assertEqual(result, {'successful': {0: 'id-a', 1: 'id-b'}, 'failed': {}})
+        self.assertEqual(len(client.calls), 3)
+
+    def test_direct_targets_are_published_once(self):
+        client = BatchClient()
+        result = self.publish(client, [
+            {'message': 'a'},
+            {'message': {'b': 1}, 'TargetArn': 'arn:aws:sns:us-east-1:000000000000:endpoint/APNS/app/1'},
+        ])
+
+        self.assertEqual(result['successful'], {0: 'id-a', 1: 'direct-{"b": 1}'})
+        self.assertEqual(client.calls, [(TOPIC, ['a'])])
+        self.assertEqual(client.published[0][1]['TargetArn'], 'arn:aws:sns:us-east-1:000000000000:endpoint/APNS/app/1')
+
+    def test_fifo_chunks_are_published_in_order(self):
+        client = BatchClient()
+        fifo = f'{TOPIC}.fifo'
+        self.publish(client, [{'message': str(i), 'topic': fifo, 'MessageGroupId': 'g'} for i in range(25)])
+        self.assertEqual(sum((messages for _, messages in client.calls), []), [str(i) for i in range(25)])
+
+    def test_publish_batch_message_raises_the_failures(self):
+        client = BatchClient({'invalid': {'Code': 'InvalidParameter', 'SenderFault': True}})
+        wrapper = SnsWrapper(TOPIC, client=client)
+        self.assertEqual(wrapper.publish_batch_message([{'message': 'a'}]), ['id-a'])
+        with self.assertLogs('sns-events', 'INFO'), self.assertRaises(ClientError):
+            wrapper.publish_batch_message([{'message': 'a'}, {'message': 'invalid'}])
@@ -0,0 +1,134 @@
+from json import dumps, loads
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from threading import Lock
+from time import sleep, time
+from unittest import TestCase
+
+from musa_django_utils.utils.sns import SnsWrapper
+from musa_django_utils.utils.sns_buffer import BufferedSnsPublisher
+
+TOPIC = 'arn:aws:sns:us-east-1:000000000000:topic'
+
+
+class StubClient:
+    """
+        boto3 SNS client stand-in, the `fail` messages are sender faults
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.messages = []
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        successful, failed = [], []
+        for entry in PublishBatchRequestEntries:
+            if entry['Message'] == 'fail':
+                failed.append({'Id': entry['Id'], 'Code': 'InvalidParameter', 'Message': 'bad', 'SenderFault': True})
+            else:
+                successful.append({'Id': entry['Id'], 'MessageId': entry['Id']})
+                with self.lock:
+                    self.messages.append(entry['Message'])
+
+        return {'Successful': successful, 'Failed': failed}
+
+
+class BufferedSnsPublisherTestCase(TestCase):
+
+    def setUp(self):
+        self.client = StubClient()
+        self.directory = TemporaryDirectory()
+        self.spill_path = join(self.directory.name, 'spill.jsonl')
+        self.publishers = []
+
+    def tearDown(self):
+        for publisher in self.publishers:
+            publisher.close()
+        self.directory.cleanup()
+
+    def publisher(self, **kwargs):
+        # the worker is only woken by `flush_size` messages, the tests flush
+        options = {'flush_size': 1000, 'flush_interval': 60, 'max_size': 1, **kwargs}
+        publisher = BufferedSnsPublisher(SnsWrapper(TOPIC, client=self.client), **options)
+        self.publishers.append(publisher)
+        return publisher
+
+    def wait_published(self, publisher, count, timeout=5):
+        deadline = time() + timeout
+        while publisher.metrics()['published'] < count and time() < deadline:
+            sleep(0.01)
+
+    def test_block_policy_drops_after_the_timeout(self):
+        publisher = self.publisher(overflow='block', block_timeout=0.01)
+        self.assertTrue(publisher.publish_message('a'))
+        self.assertFalse(publisher.publish_message('b'))
+
+        publisher.flush()
+        self.assertEqual(self.client.messages, ['a'])
+        self.assertEqual((publisher.metrics()['dropped'], publisher.metrics()['enqueued']), (1, 1))
+
+    def test_drop_policy(self):
+        publisher = self.publisher(overflow='drop')
+        self.assertTrue(publisher.publish_message('a'))
+        self.assertFalse(publisher.publish_message('b'))
+        self.assertEqual(publisher.metrics()['dropped'], 1)
+
+    def test_spill_policy(self):
+        publisher = self.publisher(overflow='spill', spill_path=self.spill_path)
+        for message in ('a', 'b', 'c'):
+            self.assertTrue(publisher.publish_message(message, {'event': 'created'}))
+
+        with open(self.spill_path) as spill:
+            self.assertEqual([loads(line)[1]['message'] for line in spill], ['b', 'c'])
+        self.assertEqual(publisher.metrics()['spilled_depth'], 2)
+
+        publisher.flush()
+        self.assertEqual(self.client.messages, ['a', 'b', 'c'])
+        self.assertFalse(exists(self.spill_path))
+        self.assertEqual(publisher.metrics()['published'], 3)
+
+    def test_messages_that_cannot_be_spilled_are_dropped(self):
+        publisher = self.publisher(overflow='spill', spill_path=self.spill_path)
+        publisher.publish_message('a')
+        with self.assertLogs('sns-events', 'ERROR'):
+            self.assertFalse(publisher.publish_message('b', {'data': b'binary'}))
+        self.assertEqual(publisher.metrics()['dropped'], 1)
+
+    def test_spill_file_of_a_previous_run_is_drained_on_start(self):
+        with open(self.spill_path, 'w') as spill:
+            spill.write(f'{dumps([time(), {"message": "a", "attributes": None}])}\n')
+            spill.write('[1, {"message": "cut\n')
+            spill.write(f'{dumps([time(), {"message": "b", "attributes": None}])}\n')
+
+        publisher = self.publisher(max_size=10, overflow='spill', spill_path=self.spill_path)
+        with self.assertLogs('sns-events', 'ERROR'):
+            publisher.start()
+            self.wait_published(publisher, 2)
+
+        self.assertEqual(self.client.messages, ['a', 'b'])
+        self.assertFalse(exists(self.spill_path))
+
+    def test_invalid_messages_are_rejected_by_the_caller(self):
+        publisher = self.publisher()
+        with self.assertRaises(AssertionError):
+            publisher.publish_message(123)
+        with self.assertRaises(AssertionError):
+            publisher.publish_message('a', attributes='not a dict')
+        self.assertEqual(publisher.metrics()['enqueued'], 0)
+
+    def test_metrics(self):
+        publisher = self.publisher(max_size=10)
+        for message in ('a', 'fail', 'b'):
+            publisher.publish_message(message)
+        self.assertEqual(publisher.metrics()['queue_depth'], 3)
+
+        with self.assertLogs('sns-events', 'ERROR'):
+            publisher.flush()
+
+        metrics = publisher.metrics()
+        self.assertEqual(
+            {key: metrics[key] for key in ('queue_depth', 'enqueued', 'published', 'failed', 'dropped', 'spilled')},
+            {'queue_depth': 0, 'enqueued': 3, 'published': 2, 'failed': 1, 'dropped': 0, 'spilled': 0},
+        )
+        self.assertGreaterEqual(metrics['max_latency_ms'], metrics['avg_latency_ms'])
+        self.assertGreater(metrics['avg_latency_ms'], 0)
@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from musa_django_utils.drf.serializers import BatchValidatedListSerializer
+from musa_django_utils.drf.validators import DependsAnotherField, NoAcceptSpace
+
+
+class AccountSerializer(serializers.Serializer):
+    username = serializers.CharField(validators=[NoAcceptSpace()])
+    age = serializers.IntegerField(required=False)
+    password = serializers.CharField(required=False)
+    old_password = serializers.CharField(required=False)
+
+    class Meta:
+        validators = [DependsAnotherField(['password', 'old_password'])]
+
+
+class BatchAccountSerializer(AccountSerializer):
+
+    class Meta(AccountSerializer.Meta):
+        list_serializer_class = BatchValidatedListSerializer
+
+
+PAYLOAD = [
+    {'username': 'valid'},
+    {'username': 'with space'},
+    {'username': 'password', 'password': 'new'},
+    {'username': 'both', 'password': 'new', 'old_password': 'old'},
+    {'username': 'bad age and space', 'age': 'x'},
+    {'username': 'bad age', 'age': 'x', 'old_password': 'old'},
+    {'age': 1},
+    'not a dict',
+    {'username': 'old password', 'old_password': 'old'},
+]
+
+
+class ValidatorsTestCase(SimpleTestCase):
+
+    def test_no_accept_space(self):
+        self.assertEqual(NoAcceptSpace().validate_many(['a', 'a b', None, 'c d']), {
+            1: ['This field cannot contain spaces'], 3: ['This field cannot contain spaces'],
+        })
+        with self.assertRaises(ValidationError):
+            NoAcceptSpace()('a b')
+
+    def test_depends_another_field(self):
+        validator = DependsAnotherField(['password', 'old_password'])
+        errors = validator.validate_many([{}, {'password': 1}, {'password': 1, 'old_password': 2}, {'password': 3}])
+        self.assertEqual(list(errors), [1, 3])
+        self.assertEqual(errors[1], {'old_password': ['This field is required.']})
+        # the items missing the same fields share the error
+        self.assertIs(errors[1], errors[3])
+
+
+class BatchValidatedListSerializerTestCase(SimpleTestCase):
+
+    def errors(self, serializer_class, data):
+        serializer = serializer_class(data=data, many=True)
+        self.assertFalse(serializer.is_valid())
+        return serializer.errors
+
+    def test_same_errors_of_the_validation_by_item(self):
+        expected = self.errors(AccountSerializer, PAYLOAD)
+        errors = self.errors(BatchAccountSerializer, PAYLOAD)
+        self.assertEqual(errors, {index: error for index, error in enumerate(expected) if error})
+
+    def test_valid_payload(self):
+        data = [item for index, item in enumerate(PAYLOAD) if index in (0, 3)]
+        serializer = BatchAccountSerializer(data=data, many=True)
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data, data)
+
+    def test_batch_validators_run_once(self):
+        data = [{'username': f'user{i}', 'password': 'new', 'old_password': 'old'} for i in range(50)]
+        with mock.patch.object(NoAcceptSpace, '__call__') as call, \
+                mock.patch.object(NoAcceptSpace, 'validate_many', return_value={}) as validate_many:
+            self.assertTrue(BatchAccountSerializer(data=data, many=True).is_valid())
+
+        call.assert_not_called()
+        validate_many.assert_called_once()
+
+    def test_list_checks(self):
+        self.assertEqual(
+            self.errors(BatchAccountSerializer, {'username': 'a'}),
+            {'non_field_errors': ['Expected a list of items but got type "dict".']},
+        )